@@ -0,0 +1,55 @@
+"""
+Synthetic corpora: documents of tokenized sentences over a Zipf distributed vocabulary of pseudo-words.
+"""
+import os
+import random
+from typing import List
+
+_syllables = ["ka", "lo", "mi", "ne", "tu", "ra", "si", "po", "de", "ga", "vo", "li", "ber", "tan", "sol"]
+
+
+def vocabulary(size: int, seed=0) -> List[str]:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def documents(count=100, sentences=20, words=12, vocabulary_size=5000, seed=0) -> List[str]:
+    """
+    :param count: Number of documents.
+    :param sentences: Number of sentences per document.
+    :param words: Mean number of words per sentence.
+    :param vocabulary_size: Number of distinct words.
+    :param seed: Seed, equal arguments give equal corpora.
+    :return: Texts of the documents, tokens separated by spaces and sentences ending with " .".
+    """
+    rng = random.Random(seed)
+    vocab = vocabulary(vocabulary_size, seed)
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+    texts = []
+    for _ in range(count):
+        text = []
+        for _ in range(sentences):
+            sentence = rng.choices(vocab, weights, k=max(3, int(rng.gauss(words, words / 4))))
+            text.append(" ".join([sentence[0].capitalize()] + sentence[1:] + ["."]))
+        texts.append(" ".join(text))
+    return texts
+
+
+def generate(path: str, **kwargs) -> List[str]:
+    """
+    Writes a synthetic corpus to a directory, one file per document.
+
+    :param path: Directory to write to, created if it does not exist.
+    :param kwargs: See `documents`.
+    :return: The paths of the files written.
+    """
+    os.makedirs(path, exist_ok=True)
+    paths = []
+    for i, text in enumerate(documents(**kwargs)):
+        paths.append(os.path.join(path, "doc{:06d}.txt".format(i)))
+        with open(paths[-1], "w") as f:
+            f.write(text)
+    return paths
@@ -0,0 +1,150 @@
+"""
+Local stand-ins for the Graphene and Indra services, answering like the real ones after a configurable delay.
+
+- ``/relationExtraction/text``: every sentence yields a fact with a temporal simple context and a background fact.
+- ``/vectors``: deterministic pseudo-random vectors per term, some terms are unknown.
+- ``/relatedness``: cosine of the (mean) vectors of both texts.
+"""
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_sentence_end = re.compile(r"(?<=[.!?]) +")
+
+
+def vector(term: str, size: int):
+    """
+    :return: The stand-in vector of a term, None for about every 20th term (unknown words).
+    """
+    seed = zlib.crc32(term.encode("utf-8"))
+    if seed % 20 == 0:
+        return None
+    return np.random.RandomState(seed).standard_normal(size).astype(np.float32)
+
+
+def _text_vector(text: str, size: int):
+    vectors = [v for v in (vector(t, size) for t in text.split()) if v is not None]
+    return np.mean(vectors, axis=0) if vectors else np.zeros(size, dtype=np.float32)
+
+
+def extractions(text: str):
+    sentences = [s for s in _sentence_end.split(text.strip()) if s]
+    result = []
+    for idx, sentence in enumerate(sentences):
+        words = sentence.split(" ")
+        main, context = "{}-0".format(idx), "{}-1".format(idx)
+        result.append({
+            "id": main, "type": "VERB_BASED", "sentenceIdx": idx, "contextLayer": 0,
+            "arg1": words[0], "relation": " ".join(words[1:2]), "arg2": " ".join(words[2:]),
+            "simpleContexts": [{"text": " ".join(words[-3:]), "classification": "TEMPORAL"}],
+            "linkedContexts": [{"targetID": context, "classification": "BACKGROUND"}]
+        })
+        result.append({
+            "id": context, "type": "VERB_BASED", "sentenceIdx": idx, "contextLayer": 1,
+            "arg1": words[-1], "relation": "is", "arg2": " ".join(words[:3]),
+            "simpleContexts": [], "linkedContexts": []
+        })
+    return {"sentences": [{"originalSentence": s, "sentenceIdx": i} for i, s in enumerate(sentences)],
+            "extractions": result}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services behind a connection pool
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server: StandInServer = self.server
+        server.count(self.path)
+        if server.latency or server.jitter:
+            time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+        if self.path == "/relationExtraction/text":
+            response = extractions(payload["text"])
+        elif self.path == "/vectors":
+            response = {"terms": {t: None if v is None else v.tolist()
+                                  for t, v in ((t, vector(t, server.size)) for t in payload["terms"])}}
+        elif self.path == "/relatedness":
+            for pair in payload["pairs"]:
+                a, b = _text_vector(pair["t1"], server.size), _text_vector(pair["t2"], server.size)
+                norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+                pair["score"] = float(a.dot(b)) / norm if norm else 0.0
+            response = {"pairs": payload["pairs"]}
+        else:
+            self.send_error(404)
+            return
+        body = json.dumps(response).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Serves all stand-in endpoints on one port, in a background thread. Use as a context manager.
+    """
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, jitter=0.0, size=300, port=0):
+        """
+        :param latency: Mean delay of every response in seconds.
+        :param jitter: Standard deviation of the delay in seconds.
+        :param size: Dimension of the vectors.
+        :param port: Port to listen on, any free port if 0.
+        """
+        super().__init__(("localhost", port), StandInHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.size = size
+        self.requests = dict()
+        self._lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+def _serve(port_queue, latency, jitter, size):
+    server = StandInServer(latency, jitter, size)
+    port_queue.put(server.port)
+    server.serve_forever()
+
+
+@contextmanager
+def serve_in_process(latency=0.0, jitter=0.0, size=300):
+    """
+    Runs a `StandInServer` in a process of its own, so that it does not take part in time and memory measurements.
+
+    :return: Context manager giving the port of the server.
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(queue, latency, jitter, size), daemon=True)
+    process.start()
+    try:
+        yield queue.get(timeout=30)
+    finally:
+        process.terminate()
+        process.join()
@@ -0,0 +1,67 @@
+"""
+Measures how long it takes to import estrella and to construct `Estrella`, each in fresh interpreters.
+
+Usage: ``python -m benchmarks.startup [--runs 10] [--config path/to/config.conf]``
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_import_snippet = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+_construct_snippet = """
+import time
+from estrella.main import Estrella
+times = []
+for _ in range(2):
+    start = time.perf_counter()
+    Estrella({config!r})
+    times.append(time.perf_counter() - start)
+print(*times)
+"""
+
+
+def _run(snippet: str) -> list:
+    output = subprocess.run([sys.executable, "-c", snippet], check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    return [float(t) for t in output.split()]
+
+
+def _summary(times: list) -> dict:
+    return {"median": statistics.median(times), "min": min(times), "max": max(times)}
+
+
+def measure(runs=10, config=None) -> dict:
+    """
+    :param runs: Number of fresh interpreters to measure in.
+    :param config: Config to construct `Estrella` with, the packaged default if not given.
+    :return: Timings in seconds: importing `estrella`, importing `estrella.main`, constructing `Estrella` the first
+        time and again in the same process.
+    """
+    construct = [_run(_construct_snippet.format(config=config)) for _ in range(runs)]
+    return {
+        "import estrella": _summary([_run(_import_snippet.format(module="estrella"))[0] for _ in range(runs)]),
+        "import estrella.main": _summary(
+            [_run(_import_snippet.format(module="estrella.main"))[0] for _ in range(runs)]),
+        "Estrella() first": _summary([t[0] for t in construct]),
+        "Estrella() again": _summary([t[1] for t in construct]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters to measure in.")
+    parser.add_argument("--config", default=None, help="Config to construct Estrella with.")
+    args = parser.parse_args(argv)
+    print(json.dumps(measure(args.runs, args.config), indent=4))
+
+
+if __name__ == "__main__":
+    main()
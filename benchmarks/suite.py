@@ -0,0 +1,210 @@
+"""
+Runs every stage of an extended pipeline on a synthetic corpus against local service stand-ins, measuring throughput,
+latency percentiles and peak memory per stage, and compares the results with a stored baseline.
+
+Usage: ``python -m benchmarks.suite [--documents 100] [--latency 0.02] [--baseline baseline.json]``
+
+Stages: ``FileReader.load``, ``RawTextReader`` (per document), every enricher (per document), `View` operations
+(per call), the binary serializer (per document) and ``simple_print`` (per document).
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from benchmarks import corpus
+from benchmarks.servers import serve_in_process
+
+# stats where smaller is better, every other stat is better when larger
+_lower_is_better = {"p50", "p90", "p99", "peak_memory"}
+# stats compared with the baseline, latency percentiles vary too much between runs
+_compared = ("throughput", "peak_memory")
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def measure(func: Callable, items: Sequence, count: int = None, memory=True) -> Tuple[List, Dict[str, float]]:
+    """
+    Calls a function on every item, measuring the latency of every call and the peak memory allocated meanwhile.
+
+    :param func: Function to measure.
+    :param items: Arguments to call the function with, one call each.
+    :param count: Number of items processed by all calls together, for the throughput. Defaults to the number of calls.
+    :param memory: Whether to trace memory allocations, which slows down the calls.
+    :return: The results of the calls and the stats: items, seconds, throughput (items per second), latency percentiles
+        p50, p90 and p99 (seconds per call) and peak memory (bytes, if traced).
+    """
+    results, latencies = [], []
+    if memory:
+        tracemalloc.start()
+    try:
+        for item in items:
+            start = time.perf_counter()
+            results.append(func(item))
+            latencies.append(time.perf_counter() - start)
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    seconds = sum(latencies)
+    count = len(items) if count is None else count
+    latencies.sort()
+    stats = {
+        "items": count,
+        "seconds": seconds,
+        "throughput": count / seconds if seconds else float("inf"),
+        "p50": _percentile(latencies, 0.5),
+        "p90": _percentile(latencies, 0.9),
+        "p99": _percentile(latencies, 0.99),
+    }
+    if memory:
+        stats["peak_memory"] = peak
+    return results, stats
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    """
+    Runs all stages.
+
+    :param args: Parsed command line arguments, see `main`.
+    :return: Stats per stage, see `measure`.
+    """
+    from estrella.enrich.latent import EmbeddingEnricher, FactEmbeddingEnricher
+    from estrella.enrich.meta import StaticDocumentEnricher
+    from estrella.enrich.semantic import GrapheneEnricher
+    from estrella.input.format.raw_text import RawTextReader
+    from estrella.input.normalizers import DefaultNormalizer
+    from estrella.input.source.file import FileReader
+    from estrella.input.tokenizers import NLTKTokenizer, RegexTokenizer
+    from estrella.model.oie import ContextLabel
+    from estrella.operate.embedding import Indra
+    from estrella.operate.graph import FactGraph
+    from estrella.operate.view import View
+    from estrella.serialize.binary import oie as binary
+    from estrella.serialize.readable.oie import simple_print
+
+    stages = dict()
+
+    def stage(name, func, items, count=None):
+        results, stages[name] = measure(func, items, count, not args.no_memory)
+        print("{:<24} {:>8.1f} items/s".format(name, stages[name]["throughput"]), file=sys.stderr)
+        return results
+
+    with tempfile.TemporaryDirectory() as directory, \
+            serve_in_process(args.latency, args.jitter, args.size) as port:
+        corpus.generate(os.path.join(directory, "corpus"), count=args.documents, sentences=args.sentences,
+                        words=args.words, vocabulary_size=args.vocabulary, seed=args.seed)
+
+        resources = stage("FileReader.load", FileReader().load, [os.path.join(directory, "corpus")],
+                          args.documents)[0]
+        tokenizer = NLTKTokenizer() if args.tokenizer == "nltk" else RegexTokenizer()
+        reader = RawTextReader(DefaultNormalizer(), keep_original_text=False, columnar=args.columnar,
+                               tokenizer=tokenizer)
+        docs = stage("RawTextReader", reader.create_doc, resources)
+
+        indra = Indra(server="localhost", port=port)
+        enrichers = [
+            StaticDocumentEnricher({"language": "en"}, {"English": "en"}),
+            GrapheneEnricher(server_address="localhost", server_port=port),
+            EmbeddingEnricher(indra),
+            FactEmbeddingEnricher(indra),
+        ]
+        for enricher in enrichers:
+            stage(type(enricher).__name__, enricher.enrich, docs)
+
+        calls = [None] * args.repeat
+        facts = View(docs).hop("facts")
+        graph = FactGraph(facts)
+        stage("View.filter", lambda _: facts.copy().filter(context_level=0), calls)
+        stage("View.hop", lambda _: facts.copy().hop("links", lambda l: l.label == ContextLabel.Background), calls)
+        stage("View.traverse", lambda _: facts.copy().traverse(graph, labels=[ContextLabel.Background]), calls)
+        subjects = facts.copy().hop("subject")
+        index = subjects.build_index()
+        stage("View.nearest", lambda _: subjects.copy().nearest(subjects[0], k=10, index=index), calls)
+
+        path = os.path.join(directory, "binary")
+        stage("binary.save", lambda _: binary.save(docs, path), [None], len(docs))
+        stage("binary.load", lambda _: [len(d.facts) for d in binary.load(path)], [None], len(docs))
+        stage("simple_print", simple_print, docs)
+    return stages
+
+
+def compare(stages: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """
+    :param stages: Stats per stage of this run.
+    :param baseline: Stats per stage of the baseline.
+    :param tolerance: Relative deviation from the baseline that is not considered a regression.
+    :return: Descriptions of all regressions.
+    """
+    regressions = []
+    for name, stats in stages.items():
+        for stat in _compared:
+            if stat not in stats or stat not in baseline.get(name, {}):
+                continue
+            old, new = baseline[name][stat], stats[stat]
+            worse = new > old * (1 + tolerance) if stat in _lower_is_better else new < old * (1 - tolerance)
+            if worse:
+                regressions.append("{} {}: {:.4g} (baseline {:.4g})".format(name, stat, new, old))
+    return regressions
+
+
+def format_stages(stages: Dict[str, Dict[str, float]]) -> str:
+    lines = ["{:<24} {:>8} {:>12} {:>9} {:>9} {:>9} {:>10}".format(
+        "stage", "items", "items/s", "p50 ms", "p90 ms", "p99 ms", "peak MiB")]
+    for name, s in stages.items():
+        memory = s["peak_memory"] / 2 ** 20 if "peak_memory" in s else float("nan")
+        lines.append("{:<24} {:>8} {:>12.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>10.2f}".format(
+            name, s["items"], s["throughput"], s["p50"] * 1000, s["p90"] * 1000, s["p99"] * 1000, memory))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    corpus_args = parser.add_argument_group("corpus")
+    corpus_args.add_argument("--documents", type=int, default=100, help="Number of documents.")
+    corpus_args.add_argument("--sentences", type=int, default=20, help="Sentences per document.")
+    corpus_args.add_argument("--words", type=int, default=12, help="Mean number of words per sentence.")
+    corpus_args.add_argument("--vocabulary", type=int, default=5000, help="Number of distinct words.")
+    corpus_args.add_argument("--seed", type=int, default=0, help="Seed of the corpus.")
+    service_args = parser.add_argument_group("services")
+    service_args.add_argument("--latency", type=float, default=0.02, help="Mean service latency in seconds.")
+    service_args.add_argument("--jitter", type=float, default=0.005, help="Deviation of the latency in seconds.")
+    service_args.add_argument("--size", type=int, default=300, help="Dimension of the embeddings.")
+    parser.add_argument("--tokenizer", choices=("regex", "nltk"), default="regex")
+    parser.add_argument("--columnar", action="store_true", help="Read columnar documents.")
+    parser.add_argument("--repeat", type=int, default=20, help="Calls per View operation.")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace memory, which slows down every stage.")
+    parser.add_argument("--output", help="File to write the results to, e.g. to use them as baseline.")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative deviation from the baseline that is not considered a regression.")
+    args = parser.parse_args(argv)
+
+    stages = run(args)
+    print(format_stages(stages))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "stages": stages}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        ignored = ("output", "baseline", "tolerance")
+        differing = [k for k, v in baseline["settings"].items() if k not in ignored and vars(args).get(k) != v]
+        if differing:
+            print("Settings differ from the baseline: {}".format(", ".join(differing)), file=sys.stderr)
+        regressions = compare(stages, baseline["stages"], args.tolerance)
+        for regression in regressions:
+            print("Regression: " + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
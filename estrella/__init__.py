@@ -1 +1,9 @@
-from estrella.main import Estrella
+__all__ = ["Estrella"]
+
+
+def __getattr__(name):
+    # importing estrella.main pulls in the whole library, so it is deferred until Estrella is actually used
+    if name == "Estrella":
+        from estrella.main import Estrella
+        return Estrella
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
@@ -1,6 +1,6 @@
 import logging
 from abc import ABCMeta, abstractmethod
-from typing import List
+from typing import List, Optional, Tuple
 
 import estrella.interfaces
 from estrella import util
@@ -8,6 +8,15 @@ from estrella.model.basic import Document
 
 
 class Enricher(estrella.interfaces.Loggable, metaclass=ABCMeta):
+    # Document attributes the enricher needs and the ones it sets. The pipeline runs enrichers that do not depend on
+    # each other concurrently. None if unknown: the enricher then runs after every enricher configured before it and
+    # before every enricher configured after it.
+    reads: Optional[Tuple[str, ...]] = None
+    produces: Optional[Tuple[str, ...]] = None
+    # Part of the keys of stored documents (see `Pipeline.config_key`). Increase it whenever a change of the enricher
+    # changes its results, so documents stored by older versions are enriched again.
+    version = 1
+
     def __init__(self):
         super().__init__()
 
@@ -5,6 +5,7 @@ from typing import Dict, Iterable
 from estrella import util
 from estrella.enrich import Enricher
 from estrella.model.basic import Document
+from estrella.model.embedding import EmbeddingTable
 
 import numpy as np
 
@@ -28,33 +29,62 @@ class EmbeddingProvider(metaclass=ABCMeta):
 
 
 class EmbeddingEnricher(Enricher):
-    def __init__(self, embedding_provider: EmbeddingProvider, random_seed=1337):
+    reads = ("words",)
+    produces = ("word_embeddings",)
+
+    def __init__(self, embedding_provider: EmbeddingProvider, random_seed=1337, shared=False):
+        """
+        :param embedding_provider: Config or actual instance of an embedding provider.
+        :param random_seed: Seed for the embedding of unknown words.
+        :param shared: Whether all documents share one embedding table, which stores every distinct word only once
+            for the whole collection. Otherwise, every document has its own table.
+        """
         super().__init__()
         self.rdm_seed = random_seed  # should be moved to one place at some point
         self.embedding_provider: EmbeddingProvider = util.safe_construct(embedding_provider,
                                                                          restrict_to=EmbeddingProvider,
                                                                          relative_import="estrella.operate.embedding")
+        self.table = EmbeddingTable() if shared else None
 
     def enrich(self, document: Document):
-        # possibly with cache
-        vocab = set(word.normalized_text for word in document.words)
+        # cache by wrapping the provider, see estrella.operate.cache
+        words = document.words
+        vocab = set(word.normalized_text for word in words)
         embeddings = self.embedding_provider.get_embeddings(vocab)
         try:
-            oov_size = len(next(emb for emb in embeddings.values() if emb))
+            oov_size = len(next(emb for emb in embeddings.values() if emb is not None))
         except StopIteration:
             raise ValueError("Document has not a single word with a known embedding!")
-        oov_vector = oov_embedding(self.rdm_seed, oov_size)
-        for word in document.words:
-            word.embedding = np.array(embeddings[word.normalized_text] or oov_vector, dtype=np.float32)
+        # every distinct word is stored once, words refer to its row
+        table = self.table if self.table is not None else EmbeddingTable(block_size=len(vocab))
+        rows = table.add(embeddings, default=oov_embedding(self.rdm_seed, oov_size))
+        document.set_embeddings(table, [rows[word.normalized_text] for word in words])
+
+    def __getstate__(self):
+        # shipped to worker processes with every task: the shared table stays behind, rows added in another process
+        # could not be shared with this one's anyway. Workers embed every document with a table of its own, which is
+        # pickled back with the document (see `Document.__getstate__`)
+        state = self.__dict__.copy()
+        state["table"] = None
+        return state
 
 
 class FactEmbeddingEnricher(Enricher):
-    def __init__(self, embedding_provider: EmbeddingProvider, random_seed=1337):
+    reads = ("facts",)
+    produces = ("fact_embeddings",)
+
+    def __init__(self, embedding_provider: EmbeddingProvider, random_seed=1337, shared=False):
+        """
+        :param embedding_provider: Config or actual instance of an embedding provider.
+        :param random_seed: Seed for the embedding of unknown spans.
+        :param shared: Whether all documents share one embedding table, see `EmbeddingEnricher`.
+        """
         super().__init__()
         self.rdm_seed = random_seed  # should be moved to one place at some point
         self.embedding_provider: EmbeddingProvider = util.safe_construct(embedding_provider,
                                                                          restrict_to=EmbeddingProvider,
                                                                          relative_import="estrella.operate.embedding")
+        self.table = EmbeddingTable() if shared else None
 
     def enrich(self, document: Document):
         if getattr(document, 'facts', False):
@@ -68,14 +98,20 @@ class FactEmbeddingEnricher(Enricher):
             embeddings = self.embedding_provider.get_embeddings(k for k in text_to_span.keys() if k)
 
             try:
-                embedding_size = len(next(emb for emb in embeddings.values() if emb))
+                embedding_size = len(next(emb for emb in embeddings.values() if emb is not None))
             except StopIteration:
                 raise ValueError("Document has not a single word with a known embedding!")
 
             if text_to_span.get('', None) is not None:
                 embeddings[''] = zero_embedding(embedding_size)
 
-            oov_vector = oov_embedding(self.rdm_seed, embedding_size)
-            for k, v in text_to_span.items():
-                for span in v:
-                    span.embedding = np.array(embeddings[k] or oov_vector, dtype=np.float32)
+            table = self.table if self.table is not None else EmbeddingTable(block_size=len(embeddings))
+            rows = table.add(embeddings, default=oov_embedding(self.rdm_seed, embedding_size))
+            spans = [span for v in text_to_span.values() for span in v]
+            document.set_span_embeddings(table, spans, [rows[k] for k, v in text_to_span.items() for _ in v])
+
+    def __getstate__(self):
+        # see `EmbeddingEnricher.__getstate__`
+        state = self.__dict__.copy()
+        state["table"] = None
+        return state
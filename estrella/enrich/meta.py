@@ -1,4 +1,3 @@
-from pyhocon import ConfigTree
 
 import estrella.interfaces
 from estrella.model.basic import Document
@@ -15,10 +14,12 @@ class StaticDocumentEnricher(Enricher):
     def __init__(self, meta_tags, lang_config):
         super().__init__()
         self.meta_tags = meta_tags
+        self.reads = ()
+        self.produces = tuple(meta_tags.keys())
         self.languages: Lang = language.from_config(lang_config)
 
     def _convert(self, k, v):
-        if isinstance(v, ConfigTree):
+        if util.is_config(v):
             # if v is ConfigTree, then it's sth like k: {class: Label: args: Name}
             cls_name, kwargs = util.get_constructor_and_args(v)
             v = util.construct_from_config(cls_name, restrict_to=estrella.interfaces.Labeled,
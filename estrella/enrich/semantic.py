@@ -1,11 +1,11 @@
-import json
 from collections import namedtuple
-from typing import Dict
-
-import requests
+from typing import Dict, List, Tuple
 
+from estrella import service, util
 from estrella.enrich import Enricher
+from estrella.exceptions.service import ServiceException
 from estrella.model.oie import MaybeSpan, FactLabel, ContextLink, Fact
+from estrella.operate.cache import ExtractionCache
 
 
 def _get(serialized, *paths, as_cls=lambda x: x):
@@ -14,36 +14,221 @@ def _get(serialized, *paths, as_cls=lambda x: x):
     return tuple(as_cls(serialized[path]) for path in paths)
 
 
+def sentence_texts(document) -> List[str]:
+    """
+    Cuts the text of a document (`Document.plaintext`) into its sentences, so they can be sent to services as they
+    were written instead of as tokens joined by spaces.
+
+    Sentences are located by finding their words in the text one after another. Words the tokenizer changed (such as
+    quotes) are skipped, a sentence none of whose words is found (or every sentence of a document without text) is
+    joined from its tokens.
+
+    :return: The original text of every sentence, without surrounding whitespace.
+    """
+    try:
+        text = document.plaintext
+    except NotImplementedError:
+        return [" ".join(w.text for w in sentence) for sentence in document]
+    starts, cursor = [], 0
+    for sentence in document:
+        start = None
+        for word in sentence:
+            found = text.find(word.text, cursor)
+            if found < 0:
+                continue
+            start = found if start is None else start
+            cursor = found + len(word.text)
+        starts.append(start)
+    ends = []
+    end = len(text)
+    for start in reversed(starts):
+        ends.append(end)
+        end = start if start is not None else end
+    ends.reverse()
+    return [text[start:end].strip() if start is not None else " ".join(w.text for w in sentence)
+            for sentence, start, end in zip(document, starts, ends)]
+
+
 class GrapheneEnricher(Enricher):
-    def __init__(self, do_coreference=False, server_address="localhost", server_port=8080, group_lists=False):
+    output_format = "DEFAULT"
+    reads = ("sentences",)
+    produces = ("facts",)
+
+    def __init__(self, do_coreference=False, server_address="localhost", server_port=8080, group_lists=False,
+                 max_concurrency=8, timeout=600, retries=3, backoff=0.5, cache=None, window_size=None,
+                 window_overlap=2):
+        """
+        :param do_coreference: Whether Graphene should resolve coreferences.
+        :param server_address: Address of the Graphene server.
+        :param server_port: Port of the Graphene server.
+        :param group_lists: Whether to group facts in lists (not implemented yet).
+        :param max_concurrency: See `estrella.service.get_client`.
+        :param timeout: See `estrella.service.get_client`.
+        :param retries: See `estrella.service.get_client`.
+        :param backoff: See `estrella.service.get_client`.
+        :param cache: Config or actual instance of an `estrella.operate.cache.ExtractionCache`. If given, extractions
+            are cached per sentence and only uncached sentences are sent to Graphene. Cached sentences are extracted in
+            isolation, so their facts link to facts of the same sentence only. Sentences depend on each other when
+            resolving coreferences, so with `do_coreference` whole documents are cached instead.
+        :param window_size: If given, documents are split into windows of this many sentences, which are sent to
+            Graphene concurrently (up to `max_concurrency`) and merged into one fact graph per document.
+        :param window_overlap: With `do_coreference`, every window is sent with this many preceding sentences as
+            context, so that references to them can be resolved. Facts of context sentences are dropped.
+        """
         super().__init__()
+        self.client = service.get_client(max_concurrency, timeout, retries, backoff)
         self.do_coreference = do_coreference
         self.server_address = server_address
         self.server_port = server_port
         self.server_address = server_address
         self.group_lists = group_lists
+        self.cache: ExtractionCache = None if cache is None else util.safe_construct(
+            cache, restrict_to=ExtractionCache, relative_import="estrella.operate.cache")
+        self.window_size = window_size
+        self.window_overlap = window_overlap
 
-    def get_graphene_output(self, document) -> Dict:
-        url = "http://{}:{}/relationExtraction/text".format(self.server_address, self.server_port)
-        data = {
-            'text': document.plaintext,
+    @property
+    def url(self):
+        return "http://{}:{}/relationExtraction/text".format(self.server_address, self.server_port)
+
+    def _payload(self, text, isolate=False):
+        return {
+            'text': text,
             'doCoreference': self.do_coreference,
-            'isolateSentences': False,
-            'format': "DEFAULT",
+            'isolateSentences': isolate,
+            'format': self.output_format,
         }
 
-        headers = {
-            'content-type': "application/json",
-            'Accept': "application/json"
-        }
+    def get_graphene_output(self, document) -> Dict:
+        try:
+            return self.client.post(self.url, self._payload(document.plaintext))
+        except ServiceException as e:
+            self.logger.error(e, exc_info=True)
+
+    async def aget_graphene_output(self, document) -> Dict:
+        """
+        Coroutine version of `get_graphene_output`.
+        """
+        try:
+            return await self.client.apost(self.url, self._payload(document.plaintext))
+        except ServiceException as e:
+            self.logger.error(e, exc_info=True)
+
+    def _key(self, text, isolated=False):
+        return ExtractionCache.key(text, self.do_coreference, self.output_format, isolated)
+
+    @staticmethod
+    def _prefixed(extraction: Dict, prefix, ids, sentence_idx: int) -> Dict:
+        # makes the ids of one response unique within the document, links to other responses are left as they are
+        extraction = dict(extraction, id="{}:{}".format(prefix, extraction["id"]), sentenceIdx=sentence_idx)
+        extraction["linkedContexts"] = [
+            dict(c, targetID="{}:{}".format(prefix, c["targetID"])) if c["targetID"] in ids else c
+            for c in extraction["linkedContexts"]
+        ]
+        return extraction
+
+    def _windows(self, n: int) -> List[Tuple[int, int, int]]:
+        """
+        Splits n sentences into windows.
+
+        :return: For every window, the first context sentence, the first sentence and the end of the window.
+        """
+        size = self.window_size or max(n, 1)
+        overlap = self.window_overlap if self.do_coreference else 0
+        return [(max(0, start - overlap), start, min(start + size, n)) for start in range(0, n, size)]
+
+    def _post_windows(self, texts: List[str], windows, isolate=False) -> List[Dict]:
+        return self.client.post_many(self.url, (self._payload(" ".join(texts[c:e]), isolate) for c, _, e in windows))
+
+    def _extract(self, document) -> List[Dict]:
+        if not self.window_size:
+            output = self.get_graphene_output(document)
+            if output is None:
+                raise ServiceException("Graphene did not return any extractions for document {}.".format(
+                    document.name))
+            return output['extractions']
+        texts = sentence_texts(document)
+        windows = self._windows(len(texts))
+        self.logger.debug("Sending {} sentences in {} windows.".format(len(texts), len(windows)))
+        extractions = []
+        for k, ((context, start, end), output) in enumerate(zip(windows, self._post_windows(texts, windows))):
+            if len(output["sentences"]) != end - context:
+                self.logger.warning("Graphene found {} sentences instead of {} in window {}.".format(
+                    len(output["sentences"]), end - context, k))
+            ids = {e["id"] for e in output["extractions"]}
+            for extraction in output["extractions"]:
+                idx = context + extraction["sentenceIdx"]
+                if idx < start:
+                    continue  # context sentences belong to the previous window
+                extractions.append(self._prefixed(extraction, "w{}".format(k), ids, min(idx, end - 1)))
+        return extractions
 
-        response = requests.request("POST", url, data=json.dumps(data), headers=headers)
+    def get_extractions(self, document) -> List[Dict]:
+        """
+        Returns the serialized extractions of a document, from the cache where possible.
 
+        :param document: Document to extract facts from.
+        :return: Extractions as returned by Graphene, ids and `sentenceIdx` refer to this document.
+        :raises ServiceException: if Graphene could not be reached.
+        """
+        if self.cache is None:
+            return self._extract(document)
+        if self.do_coreference:
+            key = self._key(document.plaintext)
+            cached = self.cache.get_many([key])
+            if key not in cached:
+                cached[key] = self._extract(document)
+                self.cache.put_many(cached)
+            return cached[key]
+        return self._get_sentence_extractions(document)
+
+    def _get_sentence_extractions(self, document) -> List[Dict]:
+        texts = sentence_texts(document)
+        keys = [self._key(text, isolated=True) for text in texts]
+        cached = self.cache.get_many(keys)
+        missing, seen = [], set()  # first occurrence of every uncached sentence
+        for i, key in enumerate(keys):
+            if key not in cached and key not in seen:
+                seen.add(key)
+                missing.append(i)
+        if missing:
+            self.logger.debug("{} of {} sentences not cached.".format(len(missing), len(keys)))
+            fetched = self._extract_sentences([texts[i] for i in missing])
+            if fetched is None:
+                return self._extract(document)
+            new = {keys[i]: extractions for i, extractions in zip(missing, fetched)}
+            self.cache.put_many(new)
+            cached.update(new)
+        # stitch the extractions of every sentence together, ids are made unique as a sentence can occur repeatedly
+        extractions = []
+        for i, key in enumerate(keys):
+            ids = {e["id"] for e in cached[key]}
+            extractions.extend(self._prefixed(extraction, i, ids, i) for extraction in cached[key])
+        return extractions
+
+    def _extract_sentences(self, texts: List[str]) -> List[List[Dict]]:
+        """
+        Sends sentences to Graphene (in windows, if configured) and splits the extractions by sentence, with
+        `sentenceIdx` 0. The sentences are isolated, so that no extraction links to another sentence, which
+        could not be restored once the sentences are cached one by one.
+
+        :return: Extractions per sentence, None if Graphene split the sentences differently.
+        """
+        windows = self._windows(len(texts))
         try:
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
+            outputs = self._post_windows(texts, windows, isolate=True)
+        except ServiceException as e:
             self.logger.error(e, exc_info=True)
+            return None
+        per_sentence = [[] for _ in texts]
+        for (_, start, end), output in zip(windows, outputs):
+            if len(output["sentences"]) != end - start:
+                self.logger.warning("Graphene found {} sentences instead of {}, not caching them.".format(
+                    len(output["sentences"]), end - start))
+                return None
+            for extraction in output["extractions"]:
+                per_sentence[start + extraction["sentenceIdx"]].append(dict(extraction, sentenceIdx=0))
+        return per_sentence
 
     # put into graphene stub and gather output
     # create facts, link LinkedContexts
@@ -58,9 +243,18 @@ class GrapheneEnricher(Enricher):
     # where/there
     # list
     def enrich(self, document):
+        document.facts = self.build_facts(document, self.get_extractions(document))
+
+    def build_facts(self, document, serialized_facts: List[Dict]) -> List[Fact]:
+        """
+        Creates facts from serialized Graphene extractions.
+
+        :param document: Document the extractions belong to.
+        :param serialized_facts: Extractions, see `get_extractions`.
+        :return: Facts with their simple and fact links.
+        """
         SLT = namedtuple("SLT", ("source", "label", "target"))
 
-        serialized_facts = self.get_graphene_output(document)['extractions']
         facts = []
 
         id_to_fact = dict()
@@ -99,10 +293,12 @@ class GrapheneEnricher(Enricher):
 
         # handle linked facts
         for source, label, target in fact_links:
+            if target not in id_to_fact:
+                self.logger.warning("Skipping link of fact {} to unknown fact {}.".format(source.id, target))
+                continue
             source.fact_links.append(ContextLink(source=source, label=label, target=id_to_fact[target]))
 
-        document.facts = facts
-
+        return facts
 
     def group_by_lists(self, facts, links, id_map):
         # create FactCollection for every list
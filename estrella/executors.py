@@ -0,0 +1,130 @@
+import os
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from concurrent import futures
+from typing import Callable, Iterable, Iterator
+
+import estrella.interfaces
+
+
+class Executor(estrella.interfaces.Loggable, metaclass=ABCMeta):
+    """
+    Execution backend for a pipeline. Decides how a function is applied to a collection of documents.
+
+    Results are always returned in the order of the input.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    @abstractmethod
+    def map(self, func: Callable, iterable: Iterable) -> Iterator:
+        """
+        Applies a given function to every element of a given iterable.
+
+        :param func: Function to apply. Must be picklable for process based executors.
+        :param iterable: Elements to apply the function to.
+        :return: Iterator over the results, in order of the input.
+        """
+        pass
+
+    def stream(self, func: Callable, iterable: Iterable) -> Iterator:
+        """
+        Lazy version of `map`: consumes the given iterable only as fast as results are consumed.
+
+        :param func: Function to apply.
+        :param iterable: Elements to apply the function to, can be a generator.
+        :return: Iterator over the results, in order of the input.
+        """
+        return self.map(func, iterable)
+
+    def shutdown(self):
+        """
+        Releases all resources held by the executor (such as worker threads or processes).
+        """
+        pass
+
+
+class SerialExecutor(Executor):
+    """
+    Runs everything one after another in the calling thread. The default.
+    """
+
+    def map(self, func: Callable, iterable: Iterable) -> Iterator:
+        return map(func, iterable)
+
+
+class _PoolExecutor(Executor):
+    pool_cls = None
+
+    def __init__(self, max_workers=None, window=None):
+        """
+        :param max_workers: Number of workers. Defaults to the default of the underlying pool.
+        :param window: Maximum number of pending calls when streaming. Defaults to twice the number of workers.
+        """
+        super().__init__()
+        self.max_workers = max_workers
+        self.window = window or 2 * (max_workers or os.cpu_count() or 1)
+        self._pool = None
+        self._pool_lock = threading.Lock()  # the pool may be started by several threads at once
+
+    @property
+    def pool(self) -> futures.Executor:
+        with self._pool_lock:
+            if self._pool is None:
+                self.logger.debug("Starting {} with {} workers.".format(self.pool_cls.__name__, self.max_workers))
+                self._pool = self.pool_cls(max_workers=self.max_workers)
+            return self._pool
+
+    def map(self, func: Callable, iterable: Iterable) -> Iterator:
+        return self.pool.map(func, iterable)
+
+    def stream(self, func: Callable, iterable: Iterable) -> Iterator:
+        # pool.map submits everything at once, so keep at most `window` calls in flight instead
+        pending = deque()
+        for element in iterable:
+            if len(pending) >= self.window:
+                yield pending.popleft().result()
+            pending.append(self.pool.submit(func, element))
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        del state['_pool_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool_lock = threading.Lock()
+
+
+class ThreadExecutor(_PoolExecutor):
+    """
+    Runs every call in a thread pool. Best suited when most of the time is spent waiting for remote services.
+    """
+    pool_cls = futures.ThreadPoolExecutor
+
+
+class ProcessExecutor(_PoolExecutor):
+    """
+    Runs every call in a process pool. Best suited for CPU-bound enrichers.
+
+    Functions, arguments and results are pickled between processes, so changes made to documents in a worker are only
+    visible through the returned results.
+    """
+    pool_cls = futures.ProcessPoolExecutor
+
+    def __init__(self, max_workers=None, window=None, chunksize=1):
+        super().__init__(max_workers, window)
+        self.chunksize = chunksize
+
+    def map(self, func: Callable, iterable: Iterable) -> Iterator:
+        return self.pool.map(func, iterable, chunksize=self.chunksize)
@@ -1,18 +1,24 @@
 from abc import ABCMeta, abstractmethod
-from typing import List
+from typing import List, Iterable, Iterator, Optional
 
 import estrella.interfaces
-from estrella import util
+from estrella import metrics, util
+from estrella.executors import ProcessExecutor
 from estrella.input.normalizers import Normalizer
 from estrella.model.basic import Document
 
 
 class FormatReader(estrella.interfaces.Loggable, metaclass=ABCMeta):
-    def __init__(self, normalizer):
+    # document attributes available to the enrichers, see `estrella.enrich.Enricher.reads`
+    produces = ("sentences", "words", "text")
+
+    def __init__(self, normalizer, processes: int = None, batch_size=16):
         """
         Reads and parses Words, Sentences and Documents from a raw text input (i.e. a string).
 
         :param normalizer: Config or actual instance of a normalizer.
+        :param processes: If given, resources are parsed by a pool of this many processes.
+        :param batch_size: Number of resources sent to a process at once.
         """
         super().__init__()
         if not isinstance(normalizer, Normalizer):
@@ -20,10 +26,51 @@ class FormatReader(estrella.interfaces.Loggable, metaclass=ABCMeta):
                                                                      relative_import="estrella.input.normalizers")
         else:
             self.normalizer = normalizer
+        self.processes = processes
+        self.batch_size = batch_size
+        self._executor: ProcessExecutor = None
+
+    @property
+    def executor(self) -> Optional[ProcessExecutor]:
+        if self._executor is None and self.processes:
+            self._executor = ProcessExecutor(max_workers=self.processes, chunksize=self.batch_size)
+        return self._executor
 
     @abstractmethod
     def create_doc(self, loaded_resource) -> Document:
         pass
 
+    @staticmethod
+    def _counted(docs: Iterable[Document]) -> Iterator[Document]:
+        # counted as the documents arrive, also if they were created by other processes
+        created = metrics.counter("format_reader.documents")
+        for doc in docs:
+            created.inc()
+            yield doc
+
     def read_resource(self, loaded_resource) -> List[Document]:
-        return [self.create_doc(resource) for resource in loaded_resource]
+        if self.executor is not None:
+            return list(self._counted(self.executor.map(self.create_doc, loaded_resource)))
+        return list(self._counted(self.create_doc(resource) for resource in loaded_resource))
+
+    def iterate_resource(self, loaded_resource: Iterable) -> Iterator[Document]:
+        """
+        Lazy version of `read_resource`, creates documents only as they are consumed.
+        """
+        if self.executor is not None:
+            return self._counted(self.executor.stream(self.create_doc, loaded_resource))
+        return self._counted(self.create_doc(resource) for resource in loaded_resource)
+
+    def close(self):
+        """
+        Shuts down the process pool, if any. It starts again when further resources are read.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self):
+        # workers parse single resources, they do not need a pool of their own
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
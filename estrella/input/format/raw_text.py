@@ -1,24 +1,52 @@
+from estrella import util
 from estrella.input.format import FormatReader
+from estrella.input.tokenizers import Tokenizer, NLTKTokenizer
 from estrella.model.basic import Word, Sentence, Document
-from nltk.tokenize import word_tokenize, sent_tokenize
+from estrella.model.columnar import TokenStore, ColumnarDocument
 
 
 class RawTextReader(FormatReader):
-    def __init__(self, normalizer, keep_original_text=True):
-        super().__init__(normalizer)
+    def __init__(self, normalizer, keep_original_text=True, columnar=False, tokenizer=None, processes: int = None,
+                 batch_size=16):
+        """
+        :param normalizer: Config or actual instance of a normalizer.
+        :param keep_original_text: Whether to keep the original text or to restore it from the words.
+        :param columnar: Whether to back documents by a columnar token store (see `estrella.model.columnar`) instead
+            of one object per word. Saves memory on large corpora.
+        :param tokenizer: Config or actual instance of a tokenizer, see `estrella.input.tokenizers`. Defaults to the
+            `NLTKTokenizer`.
+        :param processes: See `FormatReader`.
+        :param batch_size: See `FormatReader`.
+        """
+        super().__init__(normalizer, processes, batch_size)
         self.keep_original_text = keep_original_text
+        self.columnar = columnar
+        if tokenizer is None:
+            self.tokenizer: Tokenizer = NLTKTokenizer()
+        elif not isinstance(tokenizer, Tokenizer):
+            self.tokenizer = util.construct_from_config(tokenizer, restrict_to=Tokenizer,
+                                                        relative_import="estrella.input.tokenizers")
+        else:
+            self.tokenizer = tokenizer
 
     def create_doc(self, loaded_resource: str) -> Document:
         loaded_resource = self.normalizer.normalize(loaded_resource)
-        doc = Document([
-            Sentence(
-                index, ([
-                    Word(i, word, self.normalizer.normalize_word(word))
-                    for i, word in enumerate(word_tokenize(sent))
-                ])
-            )
+        sentences = self.tokenizer.tokenize(loaded_resource)
+        normalize = self.normalizer.normalize_token
+        if self.columnar:
+            doc = ColumnarDocument(TokenStore.from_sentences(
+                [normalize(word) for word in sent] for sent in sentences
+            ))
+        else:
+            doc = Document([
+                Sentence(
+                    index, ([
+                        Word(i, *normalize(word))
+                        for i, word in enumerate(sent)
+                    ])
+                )
 
-            for index, sent in enumerate(sent_tokenize(loaded_resource))
-        ])
+                for index, sent in enumerate(sentences)
+            ])
         doc._text = loaded_resource if self.keep_original_text else self.normalizer.revert(doc)
         return doc
@@ -1,5 +1,10 @@
 import logging
+import string
+import sys
 from abc import ABCMeta, abstractmethod
+from functools import lru_cache
+from typing import Tuple, Dict
+
 from unidecode import unidecode
 
 import estrella.interfaces
@@ -23,6 +28,12 @@ class Normalizer(estrella.interfaces.Loggable, metaclass=ABCMeta):
     def revert(self, document: Document) -> str:
         pass
 
+    def normalize_token(self, word: str) -> Tuple[str, str]:
+        """
+        :return: The surface form and the normalized form of a token.
+        """
+        return word, self.normalize_word(word)
+
 
 class DefaultNormalizer(Normalizer):
     def revert(self, document: Document) -> str:
@@ -37,14 +48,98 @@ class DefaultNormalizer(Normalizer):
 
 class SlightlyBetterNormalizer(Normalizer):
     """
-    Should normalize with respect to punctuation etc.
+    Normalizes with respect to whitespace and punctuation: collapses all whitespace, unifies the quote and bracket
+    tokens of different tokenizers and strips punctuation around words. Reverts without spaces before closing
+    punctuation.
     """
+    _tokens = {"``": '"', "''": '"', "-LRB-": "(", "-RRB-": ")", "-LSB-": "[", "-RSB-": "]", "--": "-"}
+    _punctuation = string.punctuation
+    _no_space_before = set(",.;:!?)]}%'") | {"n't", "'s", "'re", "'ve", "'ll", "'d", "'m"}
+    _no_space_after = set("([{$")
+
+    def normalize(self, text):
+        return " ".join(unidecode(text).split())
 
     def normalize_word(self, word):
-        pass
+        word = self._tokens.get(word, word).lower()
+        return word.strip(self._punctuation) or word
 
     def revert(self, document: Document) -> str:
-        pass
+        parts = []
+        space = False
+        quoted = False  # double quotes alternate between opening and closing
+        for word in document.words:
+            text = self._tokens.get(word.text, word.text)
+            closing = text in self._no_space_before or (text == '"' and quoted)
+            if space and not closing:
+                parts.append(" ")
+            parts.append(text)
+            if text == '"':
+                quoted = not quoted
+            space = text not in self._no_space_after and not (text == '"' and quoted)
+        return "".join(parts)
+
+
+class CachingNormalizer(Normalizer):
+    """
+    Wraps another normalizer and memoizes its `normalize_word` in a bounded LRU. Surface and normalized forms are
+    interned, so every distinct token is stored once in memory no matter how often it occurs.
+    """
+
+    def __init__(self, normalizer, lru_size=2 ** 18):
+        """
+        :param normalizer: Config or actual instance of the normalizer to wrap.
+        :param lru_size: Maximal number of distinct tokens to remember.
+        """
+        super().__init__()
+        if not isinstance(normalizer, Normalizer):
+            normalizer = util.construct_from_config(normalizer, restrict_to=Normalizer,
+                                                    relative_import="estrella.input.normalizers")
+        self.normalizer: Normalizer = normalizer
+        self.lru_size = lru_size
+        self._setup()
+
+    def _setup(self):
+        self._normalize_token = lru_cache(maxsize=self.lru_size)(self._intern_token)
+
+    def _intern_token(self, word: str) -> Tuple[str, str]:
+        return sys.intern(word), sys.intern(self.normalizer.normalize_word(word))
 
     def normalize(self, text):
-        pass
+        return self.normalizer.normalize(text)
+
+    def normalize_token(self, word: str) -> Tuple[str, str]:
+        return self._normalize_token(word)
+
+    def normalize_word(self, word):
+        return self._normalize_token(word)[1]
+
+    def revert(self, document: Document) -> str:
+        return self.normalizer.revert(document)
+
+    @property
+    def hit_rate(self) -> float:
+        info = self._normalize_token.cache_info()
+        total = info.hits + info.misses
+        return info.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the cache counters, see `estrella.operate.cache.CachingEmbeddingProvider.stats`.
+        """
+        info = self._normalize_token.cache_info()
+        return {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "hit_rate": self.hit_rate
+        }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_normalize_token"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
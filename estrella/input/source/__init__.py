@@ -1,6 +1,6 @@
 from abc import ABCMeta, abstractmethod
 import logging
-from typing import List
+from typing import Any, List, Iterator, Tuple
 
 import estrella.interfaces
 from estrella import util
@@ -17,3 +17,30 @@ class SourceReader(estrella.interfaces.Loggable, metaclass=ABCMeta):
         :return:
         """
         pass
+
+    def iterate(self, location) -> Iterator:
+        """
+        Lazily yields the loaded resources one by one. Override if the resources can be loaded incrementally.
+        :return:
+        """
+        yield from self.load(location)
+
+
+class WatchableReader(SourceReader, metaclass=ABCMeta):
+    """
+    Source reader that can watch a location for new and changed resources, see `estrella.pipeline.Pipeline.watch`.
+    """
+
+    @abstractmethod
+    def watch(self, location, interval=1.0, polls=None) -> Iterator[Iterator[Tuple[str, Any]]]:
+        """
+        Polls a location for new and changed resources.
+
+        :param location: Location to watch.
+        :param interval: Seconds between two polls.
+        :param polls: Number of polls after which to stop, None to watch forever.
+        :return: Generator with one element per poll that found any new or changed resources: a generator of
+            (name, loaded resource) pairs that loads the resources only as they are consumed. The name identifies a
+            resource across its versions, such as the path of a file. The first poll finds all resources.
+        """
+        pass
@@ -1,13 +1,27 @@
-from typing import List
+import time
+from typing import List, Iterator, Tuple
 
-from estrella.input.source import SourceReader
+from estrella import metrics
+from estrella.input.source import SourceReader, WatchableReader
 
 import os
 import glob
 
 
 def files_in_folder(path, ending=""):
-    return [f for f in glob.iglob(os.path.join(path, "**", "*" + ending)) if not os.path.isdir(f)]
+    return [f for f in iter_files_in_folder(path, ending)]
+
+
+def iter_files_in_folder(path, ending=""):
+    return (f for f in glob.iglob(os.path.join(path, "**", "*" + ending), recursive=True) if not os.path.isdir(f))
+
+
+def read_file(path) -> str:
+    with open(path, "r") as f:
+        text = f.read()
+    metrics.counter("source_reader.files").inc()
+    metrics.counter("source_reader.characters").inc(len(text))
+    return text
 
 
 class MultipleFileReader(SourceReader):
@@ -16,18 +30,59 @@ class MultipleFileReader(SourceReader):
         self.ending = ending
 
     def load(self, location, ending=None, **kwargs) -> List[str]:
-        return [f.read() for f in files_in_folder(location, self.ending)]
+        return [read_file(f) for f in files_in_folder(location, self.ending)]
+
+    def iterate(self, location) -> Iterator[str]:
+        # only one file is held in memory at a time
+        return (read_file(f) for f in iter_files_in_folder(location, self.ending))
 
 
 class SingleFileReader(SourceReader):
     def load(self, location, **kwargs) -> List[str]:
-        with open(location, "r") as f:
-            return [f.read()]
+        return [read_file(location)]
 
 
-class FileReader(SingleFileReader, MultipleFileReader):
+class FileReader(SingleFileReader, MultipleFileReader, WatchableReader):
     def load(self, location, **kwargs):
         if os.path.isdir(location):
             return MultipleFileReader.load(self, location, self.ending)
         else:
             return SingleFileReader.load(self, location)
+
+    def iterate(self, location) -> Iterator[str]:
+        if os.path.isdir(location):
+            return MultipleFileReader.iterate(self, location)
+        else:
+            return SingleFileReader.iterate(self, location)
+
+    def watch(self, location, interval=1.0, polls=None) -> Iterator[Iterator[Tuple[str, str]]]:
+        # files count as changed when their modification time or size changed, a file still being written is read
+        # again by the poll after it was completed. Only the changed files are read, one at a time as consumed
+        seen = dict()
+        poll = 0
+        while polls is None or poll < polls:
+            if poll:
+                time.sleep(interval)
+            paths = iter_files_in_folder(location, self.ending) if os.path.isdir(location) else [location]
+            changed = []
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # deleted since listed
+                    continue
+                if seen.get(path) != (stat.st_mtime_ns, stat.st_size):
+                    seen[path] = (stat.st_mtime_ns, stat.st_size)
+                    changed.append(path)
+            if changed:
+                self.logger.debug("Found {} new or changed files in {}.".format(len(changed), location))
+                yield self._read_changed(changed)
+            poll += 1
+
+    @staticmethod
+    def _read_changed(paths: List[str]) -> Iterator[Tuple[str, str]]:
+        for path in paths:
+            try:
+                text = read_file(path)
+            except FileNotFoundError:  # deleted since the poll
+                continue
+            yield path, text
@@ -0,0 +1,70 @@
+import re
+from abc import ABCMeta, abstractmethod
+from typing import List
+
+import estrella.interfaces
+
+
+class Tokenizer(estrella.interfaces.Loggable, metaclass=ABCMeta):
+    """
+    Splits raw text into sentences and sentences into words.
+    """
+
+    @abstractmethod
+    def sentences(self, text: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    def words(self, sentence: str) -> List[str]:
+        pass
+
+    def tokenize(self, text: str) -> List[List[str]]:
+        """
+        :return: The words of every sentence of a given text.
+        """
+        return [self.words(sentence) for sentence in self.sentences(text)]
+
+
+class NLTKTokenizer(Tokenizer):
+    """
+    NLTK's punkt sentence splitter and treebank word tokenizer. Accurate, but slow.
+    """
+
+    def __init__(self, language="english"):
+        super().__init__()
+        self.language = language
+
+    def sentences(self, text: str) -> List[str]:
+        from nltk.tokenize import sent_tokenize
+        return sent_tokenize(text, self.language)
+
+    def words(self, sentence: str) -> List[str]:
+        from nltk.tokenize import word_tokenize
+        return word_tokenize(sentence, self.language)
+
+
+class RegexTokenizer(Tokenizer):
+    """
+    Tokenizer based on precompiled regular expressions, several times faster than `NLTKTokenizer`.
+
+    Sentences end with ., ! or ? followed by whitespace and an upper case letter, digit or quote. Words are runs of
+    word characters (possibly joined by hyphens, apostrophes or, in numbers, by . and ,), every other non-whitespace
+    character sequence is a token of its own.
+    """
+    default_sentence_pattern = r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])"
+    default_word_pattern = r"\d+(?:[.,]\d+)*|\w+(?:[-'’]\w+)*|[^\w\s]"
+
+    def __init__(self, sentence_pattern: str = None, word_pattern: str = None):
+        """
+        :param sentence_pattern: Pattern matching the boundaries between sentences.
+        :param word_pattern: Pattern matching words.
+        """
+        super().__init__()
+        self.sentence_pattern = re.compile(sentence_pattern or self.default_sentence_pattern)
+        self.word_pattern = re.compile(word_pattern or self.default_word_pattern)
+
+    def sentences(self, text: str) -> List[str]:
+        return [sentence for sentence in self.sentence_pattern.split(text.strip()) if sentence]
+
+    def words(self, sentence: str) -> List[str]:
+        return self.word_pattern.findall(sentence)
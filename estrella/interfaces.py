@@ -20,6 +20,7 @@ class Representable:
     Classes providing a 'to_exclude' collection attribute will be presented based on the 'to_repesent' attributes
     absent in 'to_exclude' collection. Defaults to all attributes starting with "_".
     """
+    __slots__ = ()
 
     def __repr__(self):
         to_represent: Collection = getattr(self, "to_represent", self.__dict__.keys())
@@ -36,6 +37,7 @@ class Readable(metaclass=ABCMeta):
     Printable Interface. Classes implementing this interface must provide a pprint() function (short for pretty-print)
     which outputs the representation of the class in a nice, fancy and human-readable way.
     """
+    __slots__ = ()
 
     @abstractmethod
     def pprint(self, **kwargs) -> str:
@@ -98,6 +100,10 @@ class Viewable(metaclass=ABCMeta):
             return None
 
 
+# label codes per class, see Labeled.codes
+_label_codes: Dict[Type["Labeled"], Dict["Labeled", int]] = dict()
+
+
 class Labeled(Enum):
     """
     Abstract class describing an enumerable finite label to describe an object.
@@ -125,7 +131,19 @@ class Labeled(Enum):
         pass
 
     def __int__(self):
-        return list(self.__class__.__members__).index(self.name)
+        return self.codes()[self]
+
+    @classmethod
+    def codes(cls) -> Dict["Labeled", int]:
+        """
+        :return: Mapping from every member to its code, the position of its name among all member names (including
+            aliases). Computed once per class.
+        """
+        codes = _label_codes.get(cls)
+        if codes is None:
+            names = list(cls.__members__)
+            codes = _label_codes[cls] = {member: names.index(member.name) for member in cls}
+        return codes
 
     @classmethod
     def from_string(cls, string: str):
@@ -1,20 +1,78 @@
-from typing import Collection, Dict, Iterable, Union, Mapping
-
-from pyhocon import ConfigTree
+from typing import Collection, Dict, Iterable, Iterator, List, Union, Mapping, Sequence, TYPE_CHECKING
 
 from estrella import util
 from estrella.model import language
 from estrella.model.basic import Document
 from estrella.operate import view
-from estrella.operate.embedding import EmbeddingComparator
+from estrella.operate.index import IndexRegistry
 from estrella.operate.view import View
 from estrella.pipeline import Pipeline, from_config
 from estrella.interfaces import Loggable
 
+if TYPE_CHECKING:
+    from pyhocon import ConfigTree
+    from estrella.operate.embedding import EmbeddingComparator
+    from estrella.operate.graph import FactGraph
+
+# numpy-based modules (embeddings, graph, binary serialization) are imported when first needed
+
+
+class DocumentSequence(Sequence):
+    """
+    Documents of an `Estrella` instance: sequences of documents chained one after another, such as corpora opened with
+    `Estrella.load` (which create their documents only when accessed) and lists of documents added by pipelines.
+    """
+
+    def __init__(self):
+        self.parts: List[Sequence[Document]] = []
+        self._added: List[Document] = None  # last part, if documents were added to it one by one
+
+    def append(self, doc: Document):
+        if self._added is None:
+            self._added = []
+            self.parts.append(self._added)
+        self._added.append(doc)
+
+    def chain(self, docs: Sequence[Document]):
+        """
+        Appends a sequence of documents without accessing them.
+        """
+        self.parts.append(docs)
+        self._added = None
+
+    def remove(self, docs: Iterable[Document]):
+        """
+        Removes given documents (by identity) from the ones added one by one. Chained sequences are left as they are.
+        """
+        ids = {id(doc) for doc in docs}
+        if ids:
+            for part in self.parts:
+                if isinstance(part, list):
+                    part[:] = [doc for doc in part if id(doc) not in ids]
+
+    def __len__(self):
+        return sum(len(part) for part in self.parts)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        for part in self.parts:
+            if 0 <= i < len(part):
+                return part[i]
+            i -= len(part)
+        raise IndexError("Document index out of range!")
+
+    def __iter__(self) -> Iterator[Document]:
+        for part in self.parts:
+            yield from part
+
 
 class Estrella(Loggable):
-    def __init__(self, cfg_or_path: Union[str, ConfigTree] = None):
+    def __init__(self, cfg_or_path: Union[str, "ConfigTree"] = None):
         super().__init__()
+        from estrella.operate.embedding import EmbeddingComparator
         if isinstance(cfg_or_path, Mapping):
             self.cfg = cfg_or_path
         else:
@@ -23,12 +81,15 @@ class Estrella(Loggable):
             except Exception:
                 raise ValueError("Could not construct main class. Param "
                                  "cfg_or_path should be string or dict-like config! (Was {})".format(type(cfg_or_path)))
-        self._docs = []
-        self.dist_service: EmbeddingComparator = util.safe_construct(self.cfg['embedding_comparator'],
+        self._docs = DocumentSequence()
+        self._watched: Dict[str, List[Document]] = dict()  # documents by watched resource, see `watch_pipeline`
+        self.indexes = IndexRegistry()
+        self._graph = None
+        self.dist_service: "EmbeddingComparator" = util.safe_construct(self.cfg['embedding_comparator'],
                                                                      restrict_to=EmbeddingComparator,
                                                                      relative_import="estrella.operate.latent")
         self.languages = language.from_config(self.cfg['languages'])
-        self.pipeline_configs: Dict[str, ConfigTree] = {
+        self.pipeline_configs: Dict[str, "ConfigTree"] = {
             k: v for k, v in self.cfg.get_config("pipelines").items()
         }  # from name to config
         self.pipelines: Dict[str, Pipeline] = {
@@ -63,7 +124,13 @@ class Estrella(Loggable):
         """
         return self.pipelines.get(name, None)
 
-    def run_pipeline(self, name_or_pipeline, location, assemble=True):
+    def _get_assembled(self, name_or_pipeline, assemble) -> Pipeline:
+        p = self.pipelines[name_or_pipeline] if isinstance(name_or_pipeline, str) else name_or_pipeline
+        if assemble and not p.assembled:
+            p.assemble()
+        return p
+
+    def run_pipeline(self, name_or_pipeline, location, assemble=True, stream=False, checkpoint: str = None):
         """
         Runs a given pipeline on a given location, adds the resulting documents to the document collection.
 
@@ -72,22 +139,116 @@ class Estrella(Loggable):
         :param location: Initial resource to run the pipeline on.
 
         :param assemble: Whether to try to assemble without any arguments if not assembled yet.
+
+        :param stream: Whether to add the documents one by one as they are enriched instead of loading the whole
+            location first. See `Pipeline.stream`.
+
+        :param checkpoint: Directory of a `DocumentStore` to persist the enriched documents to as they are done. Running
+            again with the same checkpoint skips the resources that were done already, e.g. after a service went down
+            mid-run, and the resources that did not change since (by content and pipeline config). Defaults to the
+            `checkpoint` of the pipeline config. See `Pipeline.stream`.
         """
-        p = self.pipelines[name_or_pipeline] if isinstance(name_or_pipeline, str) else name_or_pipeline
-        if assemble and not p.assembled:
-            p.assemble()
-        docs = p.load(location)
-        self.add_docs(docs)
+        with self._get_assembled(name_or_pipeline, assemble) as p:
+            docs = p.stream(location, checkpoint) if stream else p.load(location, checkpoint)
+            self.add_docs(docs)
+
+    def stream_pipeline(self, name_or_pipeline, location, assemble=True) -> Iterator[Document]:
+        """
+        Runs a given pipeline on a given location and yields the resulting documents one by one without adding them
+        to the document collection.
+
+        Use this to feed a sink (such as a serializer) with corpora that do not fit into memory. The executors of the
+        pipeline are shut down once the generator is exhausted or closed.
+
+        :param name_or_pipeline: Name or actual pipeline to run.
+
+        :param location: Initial resource to run the pipeline on.
 
-    def add_docs(self, docs: Collection[Document]):
+        :param assemble: Whether to try to assemble without any arguments if not assembled yet.
+
+        :return: Generator of enriched documents.
+        """
+        p = self._get_assembled(name_or_pipeline, assemble)
+        return self._closing(p, p.stream(location))
+
+    @staticmethod
+    def _closing(p: Pipeline, docs: Iterator[Document]) -> Iterator[Document]:
+        with p:
+            yield from docs
+
+    def watch_pipeline(self, name_or_pipeline, location, assemble=True, checkpoint: str = None, interval=1.0,
+                       polls=None):
+        """
+        Watches a location with a given pipeline and adds the documents of new and changed resources to the document
+        collection as they are enriched, see `Pipeline.watch`. Blocks until `polls` polls are done, forever if None.
+
+        Documents of a changed resource replace the ones of its earlier version.
+
+        :param name_or_pipeline: Name or actual pipeline to run.
+
+        :param location: Location to watch, such as a folder.
+
+        :param assemble: Whether to try to assemble without any arguments if not assembled yet.
+
+        :param checkpoint: Directory of a `DocumentStore` to persist the enriched documents to, see `run_pipeline`.
+
+        :param interval: Seconds between two polls.
+
+        :param polls: Number of polls after which to stop.
+        """
+        with self._get_assembled(name_or_pipeline, assemble) as p:
+            for name, docs in p.watch(location, checkpoint, interval, polls):
+                self._docs.remove(self._watched.pop(name, ()))
+                self._watched[name] = docs
+                self.add_docs(docs)
+
+    def add_docs(self, docs: Iterable[Document]):
         """
-        Adds a given collection of documents to the document collection.
+        Adds given documents to the document collection.
 
-        :param docs: Docs to be added.
+        :param docs: Docs to be added. Can be a generator, which is consumed incrementally.
         """
         for doc in docs:
             assert isinstance(doc, Document)
-        self._docs.extend(docs)
+            self._docs.append(doc)
+        self._graph = None
+
+    def save(self, path: str):
+        """
+        Saves the document collection, including facts and embeddings, in a binary format.
+
+        :param path: Directory to save to. See ``estrella.serialize.binary.oie``.
+        """
+        from estrella.serialize.binary import oie as binary
+        binary.save(self._docs, path)
+
+    def load(self, path: str, mmap=True):
+        """
+        Adds the documents saved with `save` to the document collection, without running any pipeline.
+
+        Documents are memory-mapped, so only the parts actually used are read from disk. Opening takes the same time
+        for any number of documents, every document is created when it is first accessed.
+
+        :param path: Directory the documents were saved to.
+        :param mmap: Whether to memory-map the documents or to read them into memory at once.
+        """
+        from estrella.serialize.binary import oie as binary
+        self._docs.chain(binary.load(path, mmap))
+        self._graph = None
+
+    @property
+    def graph(self) -> "FactGraph":
+        """
+        Adjacency graph over the facts of all current documents, for fast traversals (see ``View.traverse``).
+
+        Built on first access after documents were added.
+
+        :return: Graph over all facts.
+        """
+        if self._graph is None:
+            from estrella.operate.graph import FactGraph
+            self._graph = FactGraph([fact for doc in self._docs for fact in getattr(doc, "facts", [])])
+        return self._graph
 
     @property
     def docs(self) -> View[Document]:
@@ -96,4 +257,4 @@ class Estrella(Loggable):
 
         :return: View of all current documents.
         """
-        return view.create_from(self, Document)
+        return view.create_from(self, Document, self.indexes)
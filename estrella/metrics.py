@@ -0,0 +1,287 @@
+"""
+Counters, gauges and histograms recorded by pipelines, readers, enrichers, service clients and caches.
+
+Metrics are disabled by default: every metric is then the same no-op object, so instrumented code costs one function
+call per update. Enable them before running a pipeline::
+
+    from estrella import metrics
+    registry = metrics.enable(callback=lambda snapshot: print(snapshot["gauges"]))
+    main.run_pipeline("extended_pipeline", "sample.txt")
+    print(registry.format_text())
+
+Metrics are named like ``pipeline.documents`` and can be labeled, e.g. ``http.requests{url=...}``. Callbacks get a
+snapshot (see `MetricsRegistry.snapshot`) whenever `publish` is called, which pipelines do after every run.
+
+Work done in other processes (such as enrichers run by a ``ProcessExecutor``) is only recorded as far as it is
+reported back to the pipeline.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def _key(name: str, labels: Dict) -> str:
+    if not labels:
+        return name
+    return "{}{{{}}}".format(name, ",".join("{}={}".format(k, v) for k, v in sorted(labels.items())))
+
+
+class Counter:
+    """
+    Monotonically increasing count, e.g. of requests.
+    """
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+
+class Gauge:
+    """
+    Value that is set, e.g. a hit rate.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """
+    Distribution of observed values, e.g. latencies. Keeps count, sum, minimum and maximum of all values and a uniform
+    sample of at most `sample_size` values for percentiles.
+    """
+    __slots__ = ("count", "sum", "min", "max", "_sample", "_sample_size", "_lock")
+
+    def __init__(self, sample_size=1024):
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._sample = []
+        self._sample_size = sample_size
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+            if len(self._sample) < self._sample_size:
+                self._sample.append(value)
+            else:
+                i = random.randrange(self.count)  # reservoir sampling
+                if i < self._sample_size:
+                    self._sample[i] = value
+
+    def percentile(self, q: float) -> float:
+        """
+        :param q: Quantile between 0 and 1.
+        :return: The (estimated) q-quantile of the observed values, None if nothing was observed.
+        """
+        with self._lock:
+            ordered = sorted(self._sample)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count, "sum": self.sum, "mean": self.sum / self.count, "min": self.min, "max": self.max,
+            "p50": self.percentile(0.5), "p90": self.percentile(0.9), "p99": self.percentile(0.99)
+        }
+
+
+class MetricsRegistry:
+    """
+    Creates metrics on first use and exports them.
+    """
+    enabled = True
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[type, str], object] = dict()
+        self._lock = threading.Lock()
+        self.callbacks: List[Callable[[Dict], None]] = []
+
+    def _get(self, cls, name, labels):
+        key = (cls, _key(name, labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, cls())
+        return metric
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        return self._get(Histogram, name, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Observes the seconds spent in a with block in a histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name, **labels).observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        :return: Current values of all metrics by kind ("counters", "gauges" and "histograms") and name. Histograms
+            are summarized by count, sum, mean, min, max, p50, p90 and p99.
+        """
+        with self._lock:
+            metrics = list(self._metrics.items())
+        snapshot = {"counters": dict(), "gauges": dict(), "histograms": dict()}
+        for (cls, key), metric in sorted(metrics, key=lambda m: m[0][1]):
+            if cls is Counter:
+                snapshot["counters"][key] = metric.value
+            elif cls is Gauge:
+                snapshot["gauges"][key] = metric.value
+            else:
+                snapshot["histograms"][key] = metric.summary()
+        return snapshot
+
+    def format_text(self) -> str:
+        """
+        :return: Human readable snapshot, one metric per line.
+        """
+        snapshot = self.snapshot()
+        lines = ["{} {}".format(k, v) for kind in ("counters", "gauges") for k, v in snapshot[kind].items()]
+        lines.extend("{} {}".format(k, " ".join("{}={:.6g}".format(s, v) for s, v in summary.items()))
+                     for k, summary in snapshot["histograms"].items())
+        return "\n".join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def publish(self):
+        """
+        Hands a snapshot to every callback.
+        """
+        if self.callbacks:
+            snapshot = self.snapshot()
+            for callback in self.callbacks:
+                callback(snapshot)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+class _NullMetric:
+    __slots__ = ()
+    value = None
+
+    def inc(self, n=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+_null_metric = _NullMetric()
+
+
+class NullRegistry(MetricsRegistry):
+    """
+    Registry of disabled metrics, records nothing.
+    """
+    enabled = False
+
+    def counter(self, name: str, **labels):
+        return _null_metric
+
+    gauge = histogram = counter
+
+    def timer(self, name: str, **labels):
+        return nullcontext()
+
+    def publish(self):
+        pass
+
+
+_registry: MetricsRegistry = NullRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def enable(callback: Callable[[Dict], None] = None) -> MetricsRegistry:
+    """
+    Starts recording metrics, keeping the metrics recorded so far if already enabled.
+
+    :param callback: Function to hand a snapshot to on every `publish`.
+    :return: The registry recording the metrics.
+    """
+    global _registry
+    if not _registry.enabled:
+        _registry = MetricsRegistry()
+    if callback is not None:
+        _registry.callbacks.append(callback)
+    return _registry
+
+
+def disable():
+    global _registry
+    _registry = NullRegistry()
+
+
+def counter(name: str, **labels) -> Counter:
+    return _registry.counter(name, **labels)
+
+
+def gauge(name: str, **labels) -> Gauge:
+    return _registry.gauge(name, **labels)
+
+
+def histogram(name: str, **labels) -> Histogram:
+    return _registry.histogram(name, **labels)
+
+
+def timer(name: str, **labels):
+    return _registry.timer(name, **labels)
+
+
+def publish():
+    _registry.publish()
+
+
+def peak_memory() -> int:
+    """
+    :return: Peak resident memory of this process in bytes, None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # bytes on macos, kilobytes elsewhere
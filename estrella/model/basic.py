@@ -5,7 +5,7 @@ from uuid import uuid4
 from estrella.interfaces import Representable, Readable, Viewable, Labeled, Numeric
 
 
-class Document(Sequence, Representable, Readable, Viewable):
+class Document(Sequence, Representable, Readable, Viewable, Numeric):
 
     @classmethod
     def allowed_attributes(cls) -> Collection[str]:
@@ -38,11 +38,74 @@ class Document(Sequence, Representable, Readable, Viewable):
         self.language = None  # will be enriched
         self.sentences: List[Sentence] = sentences
         self._text = None
+        self._embedding_table = None
+        self._embedding_rows = None
+        self._span_embedding_table = None
+        self._embedded_spans = None
 
     @property
     def words(self) -> list:
         return [word for sentence in self.sentences for word in sentence]
 
+    def set_embeddings(self, table, rows):
+        """
+        Backs the word embeddings by rows of an embedding table, every word's embedding becomes a view of its row.
+
+        :param table: An `estrella.model.embedding.EmbeddingTable`.
+        :param rows: Row of every word, in order of `words`.
+        """
+        import numpy as np
+        self._embedding_table, self._embedding_rows = table, np.asarray(rows, dtype=np.int64)
+        for word, row in zip(self.words, self._embedding_rows):
+            word.bind_embedding(table, row)
+
+    def set_span_embeddings(self, table, spans: List["Embeddable"], rows):
+        """
+        Backs the embeddings of spans (such as the subjects and objects of facts) by rows of an embedding table, see
+        `set_embeddings`.
+
+        :param table: An `estrella.model.embedding.EmbeddingTable`.
+        :param spans: Spans to embed.
+        :param rows: Row of every span, in order.
+        """
+        self._span_embedding_table, self._embedded_spans = table, list(spans)
+        for span, row in zip(self._embedded_spans, rows):
+            span.bind_embedding(table, row)
+
+    def __getstate__(self):
+        # only the rows the document uses are pickled, once each instead of once per word or span (which pickle their
+        # row only, see `Embeddable`), and without the rest of a table shared with other documents
+        state = self.__dict__.copy()
+        if self._embedding_table is not None:
+            state["_embedding_table"], state["_embedding_rows"] = self._embedding_table.compact(self._embedding_rows)
+        if self._span_embedding_table is not None:
+            spans = [span for span in self._embedded_spans if span.embedding_row is not None]
+            state["_span_embedding_table"], rows = self._span_embedding_table.compact(
+                [span.embedding_row for span in spans])
+            state["_embedded_spans"] = list(zip(spans, rows.tolist()))
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if state.get("_embedding_table") is not None:
+            for word, row in zip(self.words, self._embedding_rows):
+                if word.embedding_row is not None:
+                    word.bind_embedding(self._embedding_table, row)
+        if state.get("_span_embedding_table") is not None:
+            for span, row in self._embedded_spans:
+                span.bind_embedding(self._span_embedding_table, row)
+            self._embedded_spans = [span for span, _ in self._embedded_spans]
+
+    def numerify(self, *args, **kwargs):
+        """
+        :return: Matrix of the word embeddings, one row per word. Stacked straight from the embedding table if
+            the embeddings were set with `set_embeddings`.
+        """
+        if self._embedding_table is not None:
+            return self._embedding_table.take(self._embedding_rows)
+        import numpy as np
+        return np.stack([word.embedding for word in self.words])
+
     def with_view(self, span_view: type, *args):
         # create a working copy of the containing spans to work on
         pass
@@ -73,7 +136,51 @@ class Sentence(Sequence, Representable, Readable):
         self.words: List[Word] = words
 
 
-class Word(Representable, Readable):
+class Embeddable:
+    """
+    Mix-in for objects with an `embedding`, which may be a view of a row of an
+    `estrella.model.embedding.EmbeddingTable` (see `Document.set_embeddings`).
+
+    Such views are pickled as their row only and bound to the row again by the document they belong to, so they stay
+    shared instead of becoming a copy per object. Assigning an embedding unbinds it from its row.
+    """
+    __slots__ = ()
+
+    @property
+    def embedding(self):
+        return self._embedding
+
+    @embedding.setter
+    def embedding(self, embedding):
+        self._embedding = embedding
+        self._embedding_row = None
+
+    @property
+    def embedding_row(self) -> int:
+        """
+        Row of the embedding table the embedding is a view of, None if it is not bound to a row.
+        """
+        return self.__dict__.get("_embedding_row")
+
+    def bind_embedding(self, table, row: int):
+        self._embedding = table[row]
+        self._embedding_row = row
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state.get("_embedding_row") is not None:
+            state["_embedding"] = None
+        return state
+
+    def __setstate__(self, state):
+        if "embedding" in state:  # pickled before embeddings could be bound
+            state["_embedding"] = state.pop("embedding")
+        self.__dict__.update(state)
+
+
+class Word(Embeddable, Representable, Readable):
+    to_represent = ("text", "normalized_text")
+
     def pprint(self, **kwargs):
         return self.text
 
@@ -83,10 +190,9 @@ class Word(Representable, Readable):
         self.normalized_text: str = normalized_text
         self.pos_tag: Labeled = None  # set later by an enricher
         self.embedding = None
-        self.to_represent = {"text", "normalized_text"}
 
 
-class Span(Sequence, Representable, Readable, Numeric):
+class Span(Sequence, Embeddable, Representable, Readable, Numeric):
     def numerify(self, *args, **kwargs):
         return self.embedding
 
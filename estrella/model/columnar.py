@@ -0,0 +1,207 @@
+from typing import List, Sequence, Tuple, Dict
+
+import numpy as np
+
+from estrella.interfaces import Readable, Representable
+from estrella.model.basic import Document, Sentence
+from estrella.model.embedding import EmbeddingTable
+
+
+class StringTable:
+    """
+    Interns strings: every distinct string is stored once and referred to by its integer id.
+    """
+
+    def __init__(self, strings: Sequence[str] = ()):
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = dict()
+        for string in strings:
+            self.intern(string)
+
+    def intern(self, string: str) -> int:
+        i = self.ids.get(string, None)
+        if i is None:
+            i = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return i
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class TokenStore:
+    """
+    Columnar storage of the tokens of a document: one array per attribute instead of one object per token.
+
+    - ``text_ids``/``normalized_ids``: ids of the (normalized) token texts in a string table,
+    - ``sentence_offsets``: tokens of sentence ``i`` are ``offsets[i]:offsets[i + 1]``,
+    - ``pos``: code of the pos tag of every token (-1 if not tagged), see ``pos_labels``,
+    - ``embedding_rows``: row of every token in ``embedding_table`` (-1 if not embedded), so tokens with the same
+      text share their embedding.
+    """
+
+    def __init__(self, text_ids: np.ndarray, normalized_ids: np.ndarray, sentence_offsets: np.ndarray,
+                 strings: StringTable, pos: np.ndarray = None, embedding_table: EmbeddingTable = None,
+                 embedding_rows: np.ndarray = None):
+        self.text_ids = text_ids
+        self.normalized_ids = normalized_ids
+        self.sentence_offsets = sentence_offsets
+        self.strings = strings
+        self.pos = pos if pos is not None else np.full(len(text_ids), -1, dtype=np.int16)
+        self.pos_labels: List = []
+        self.embedding_table = embedding_table
+        self.embedding_rows = embedding_rows
+
+    @classmethod
+    def from_sentences(cls, sentences: Sequence[Sequence[Tuple[str, str]]], strings: StringTable = None):
+        """
+        Builds a store from tokenized sentences.
+
+        :param sentences: For every sentence, a sequence of (text, normalized text) tuples.
+        :param strings: String table to intern the texts into. A new one is created if not given.
+        :return: The store.
+        """
+        strings = strings if strings is not None else StringTable()
+        text_ids, normalized_ids, lengths = [], [], []
+        for sentence in sentences:
+            lengths.append(len(sentence))
+            for text, normalized in sentence:
+                text_ids.append(strings.intern(text))
+                normalized_ids.append(strings.intern(normalized))
+        return cls(np.array(text_ids, dtype=np.int32), np.array(normalized_ids, dtype=np.int32),
+                   np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]), strings)
+
+    def __len__(self):
+        return len(self.text_ids)
+
+    @staticmethod
+    def _writeable(array: np.ndarray) -> np.ndarray:
+        # arrays of loaded stores might be read-only memory maps, they are copied on first write
+        return array if array.flags.writeable else array.copy()
+
+    def pos_code(self, label) -> int:
+        if label is None:
+            return -1
+        try:
+            return self.pos_labels.index(label)
+        except ValueError:
+            self.pos_labels.append(label)
+            return len(self.pos_labels) - 1
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        Embeddings of all tokens as one matrix, None if not every token is embedded.
+        """
+        if self.embedding_table is None or self.embedding_rows is None or (self.embedding_rows < 0).any():
+            return None
+        return self.embedding_table.take(self.embedding_rows)
+
+    def embedding(self, position: int):
+        row = -1 if self.embedding_rows is None else self.embedding_rows[position]
+        return None if row < 0 else self.embedding_table[row]
+
+    def set_embedding(self, position: int, embedding):
+        # a single token gets a row of its own, the row might be shared with other tokens
+        if self.embedding_table is None:
+            self.embedding_table = EmbeddingTable(block_size=len(self))
+        if self.embedding_rows is None:
+            self.embedding_rows = np.full(len(self), -1, dtype=np.int64)
+        self.embedding_rows = self._writeable(self.embedding_rows)
+        self.embedding_rows[position] = self.embedding_table.append(embedding)
+
+    def __getstate__(self):
+        # only the rows of the tokens are pickled, not the rest of a table shared with other documents
+        state = self.__dict__.copy()
+        if self.embedding_table is not None and self.embedding_rows is not None:
+            state["embedding_table"], state["embedding_rows"] = self.embedding_table.compact(self.embedding_rows)
+        return state
+
+
+class ColumnarWord(Representable, Readable):
+    """
+    Lightweight view on one token of a ``TokenStore``, with the same attributes as ``Word``.
+    """
+    __slots__ = ("_store", "_position", "index")
+    to_represent = ("text", "normalized_text")
+
+    def __init__(self, store: TokenStore, position: int, index: int):
+        self._store = store
+        self._position = position
+        self.index = index  # position in sentence
+
+    @property
+    def text(self) -> str:
+        return self._store.strings[self._store.text_ids[self._position]]
+
+    @property
+    def normalized_text(self) -> str:
+        return self._store.strings[self._store.normalized_ids[self._position]]
+
+    @property
+    def pos_tag(self):
+        code = self._store.pos[self._position]
+        return None if code < 0 else self._store.pos_labels[code]
+
+    @pos_tag.setter
+    def pos_tag(self, label):
+        store = self._store
+        store.pos = store._writeable(store.pos)
+        store.pos[self._position] = store.pos_code(label)
+
+    @property
+    def embedding(self):
+        return self._store.embedding(self._position)
+
+    @embedding.setter
+    def embedding(self, embedding):
+        self._store.set_embedding(self._position, embedding)
+
+    def pprint(self, **kwargs):
+        return self.text
+
+    def __repr__(self):
+        return "Word({})".format(", ".join("{}='{}'".format(k, getattr(self, k)) for k in self.to_represent))
+
+
+class ColumnarSentence(Sentence):
+    def __init__(self, store: TokenStore, index: int):
+        self._store = store
+        self._words = None
+        self.index: int = index
+
+    @property
+    def words(self) -> List[ColumnarWord]:
+        # views are created once, on first access
+        if self._words is None:
+            start, end = self._store.sentence_offsets[self.index:self.index + 2]
+            self._words = [ColumnarWord(self._store, position, i) for i, position in enumerate(range(start, end))]
+        return self._words
+
+
+class ColumnarDocument(Document):
+    """
+    Document backed by a ``TokenStore``. Sentences and words are views over the store and behave like
+    ``Sentence`` and ``Word``.
+    """
+
+    def __init__(self, store: TokenStore):
+        super().__init__([ColumnarSentence(store, i) for i in range(len(store.sentence_offsets) - 1)])
+        self.store = store
+        self._words = None
+
+    @property
+    def words(self) -> list:
+        if self._words is None:
+            self._words = [word for sentence in self.sentences for word in sentence]
+        return self._words
+
+    def set_embeddings(self, table, rows):
+        # no views needed, words look their embeddings up in the store
+        self.store.embedding_table, self.store.embedding_rows = table, np.asarray(rows, dtype=np.int64)
+
+    def numerify(self, *args, **kwargs):
+        return self.store.embeddings
@@ -0,0 +1,142 @@
+import threading
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingTable:
+    """
+    Vocabulary-indexed float32 embedding matrix: every distinct string is stored in one row, and everything embedded
+    with that string refers to the row by a (zero-copy) view.
+
+    Rows are allocated in blocks of fixed size that are never reallocated, so views stay valid when the table grows.
+    Thread-safe, so one table can be shared by all documents of a collection enriched concurrently.
+    """
+
+    def __init__(self, block_size=4096):
+        """
+        :param block_size: Number of rows allocated at once.
+        """
+        self.block_size = max(1, block_size)
+        self.blocks: List[np.ndarray] = []
+        self.rows: Dict[str, int] = dict()
+        self.dimension: int = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _append(self, vector) -> int:
+        if self.dimension is None:
+            self.dimension = len(vector)
+        block, offset = divmod(self._size, self.block_size)
+        if block == len(self.blocks):
+            self.blocks.append(np.zeros((self.block_size, self.dimension), dtype=np.float32))
+        self.blocks[block][offset] = vector
+        self._size += 1
+        return self._size - 1
+
+    def append(self, vector) -> int:
+        """
+        Adds an anonymous row, that is not shared by a string.
+
+        :return: Index of the new row.
+        """
+        with self._lock:
+            return self._append(vector)
+
+    def add(self, embeddings: Mapping[str, Sequence[float]], default=None) -> Dict[str, int]:
+        """
+        Adds the embeddings of all strings not in the table yet.
+
+        :param embeddings: Mapping from strings to their embeddings, or to None if unknown.
+        :param default: Embedding to store for unknown strings.
+        :return: Mapping from the given strings to their rows.
+        """
+        with self._lock:
+            for string, vector in embeddings.items():
+                if string not in self.rows:
+                    self.rows[string] = self._append(default if vector is None else vector)
+        return {string: self.rows[string] for string in embeddings}
+
+    def __getitem__(self, row: int) -> np.ndarray:
+        block, offset = divmod(row, self.block_size)
+        return self.blocks[block][offset]
+
+    def take(self, rows: Sequence[int]) -> np.ndarray:
+        """
+        Stacks given rows into one matrix.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(self.blocks) == 1:
+            return self.blocks[0][rows]
+        result = np.empty((len(rows), self.dimension or 0), dtype=np.float32)
+        blocks, offsets = np.divmod(rows, self.block_size)
+        for block in np.unique(blocks):
+            mask = blocks == block
+            result[mask] = self.blocks[block][offsets[mask]]
+        return result
+
+    def compact(self, rows: Sequence[int]) -> Tuple["EmbeddingTable", np.ndarray]:
+        """
+        Copies given rows into a new table holding only them (without their strings), e.g. to pickle the rows a
+        document uses without the rest of a table shared with other documents.
+
+        :param rows: Rows to copy, possibly repeated. Negative rows (not embedded) are kept as they are.
+        :return: The new table and the row of every given row in it.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        used = rows >= 0
+        unique, inverse = np.unique(rows[used], return_inverse=True)
+        table = EmbeddingTable(block_size=len(unique))
+        if len(unique):
+            table.blocks.append(self.take(unique))
+            table.dimension = self.dimension
+        table._size = len(unique)
+        compacted = rows.copy()
+        compacted[used] = inverse
+        return table, compacted
+
+    def save(self, path: str):
+        """
+        Saves all rows as one ``.npy`` matrix, block by block.
+        """
+        matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(self._size, self.dimension or 0))
+        for i, block in enumerate(self.blocks):
+            start = i * self.block_size
+            end = min(start + self.block_size, self._size)
+            matrix[start:end] = block[:end - start]
+        matrix.flush()
+
+    @classmethod
+    def load(cls, path: str, mmap=True) -> "EmbeddingTable":
+        """
+        Loads a matrix saved with `save` as the only block of a new table. Rows are paged in from disk on access if
+        memory-mapped, new rows are added to new blocks in memory.
+        """
+        matrix = np.load(path, mmap_mode="r" if mmap else None)
+        table = cls(block_size=len(matrix))
+        if len(matrix):
+            table.blocks.append(matrix)
+            table.dimension = matrix.shape[1]
+        table._size = len(matrix)
+        return table
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        All rows as one matrix, a view if the table fits in one block.
+        """
+        if len(self.blocks) == 1:
+            return self.blocks[0][:self._size]
+        return np.concatenate(self.blocks)[:self._size] if self.blocks else np.empty((0, 0), dtype=np.float32)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
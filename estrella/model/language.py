@@ -1,5 +1,8 @@
 from enum import Enum
-from pyhocon import ConfigTree
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pyhocon import ConfigTree
 
 
 class Lang(Enum):
@@ -16,6 +19,10 @@ class Lang(Enum):
                 and self._name_ == other._name_
                 and self._value_ == other._value_)
 
+    def __hash__(self):
+        # consistent with __eq__, so languages can be used in sets and indexes
+        return hash((self.__class__.__name__, self._name_, self._value_))
+
 
-def from_config(language_config: ConfigTree) -> Enum:
+def from_config(language_config: "ConfigTree") -> Enum:
     return Enum("Language", [lang for lang in language_config.items()] + [("Unknown", "unk")], type=Lang)
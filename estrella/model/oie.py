@@ -1,6 +1,6 @@
 from typing import List, Union, Dict, Type, Callable, Collection
 
-from estrella.model.basic import Sentence, Document, Link
+from estrella.model.basic import Sentence, Document, Embeddable, Link
 from estrella.interfaces import Representable, Readable, Viewable, Labeled, Numeric
 from estrella.util import pprint
 
@@ -30,9 +30,7 @@ class Fact(Viewable, Representable, Readable, Numeric):
 
     @property
     def links(self):
-        if not self._links == self.simple_links + self.fact_links:
-            self._links = self.simple_links + self.fact_links
-        return self._links
+        return self.simple_links + self.fact_links
 
     def __init__(self, id, sentence, context_level, subject, predicate, object, extraction_type, simple_links=None,
                  fact_links=None):
@@ -49,7 +47,6 @@ class Fact(Viewable, Representable, Readable, Numeric):
         self.fact_links: List[ContextLink] = fact_links or []
 
         self.type = extraction_type
-        self._links = []
 
     def pprint(self, deep=True, **kwargs) -> str:
         links = []
@@ -66,8 +63,18 @@ class Fact(Viewable, Representable, Readable, Numeric):
     def text(self):
         return " ".join((self.subject.text, self.predicate.text, self.object.text))
 
+    @property
+    def embedding(self):
+        """
+        Mean of the subject, predicate and object embeddings, None if they are not embedded (yet).
+        """
+        spo = (self.subject.embedding, self.predicate.embedding, self.object.embedding)
+        if any(e is None for e in spo):
+            return None
+        return sum(spo) / 3
+
 
-class MaybeSpan(Representable, Readable, Viewable, Numeric):
+class MaybeSpan(Embeddable, Representable, Readable, Viewable, Numeric):
     # TODO: this will move in favor ov actual span
 
     def __init__(self, original_text):
@@ -162,7 +169,7 @@ class ContextLabel(Labeled):
 class ContextLink(Link, Representable, Readable, Numeric):
 
     def __init__(self, source: Fact, label: Union[ContextLabel, str], target: Union[Fact, MaybeSpan]):
-        label = ContextLabel.from_string(label) or Labeled
+        label = label if isinstance(label, ContextLabel) else ContextLabel.from_string(label) or Labeled
         super().__init__(label, target)
         self.source = source
         self.is_simple = isinstance(target, MaybeSpan)
@@ -0,0 +1,134 @@
+"""
+Turns collections of facts into arrays, as input for models.
+
+Counterpart of ``Fact.numerify`` for many facts at once: instead of one nested tuple per fact, every part of the facts
+ends up in one array, links as ragged arrays with offsets (the links of fact ``i`` are
+``labels[offsets[i]:offsets[i + 1]]``, see `pad` for padded ones).
+"""
+import json
+import os
+from typing import Dict, Sequence
+
+import numpy as np
+
+from estrella.model.oie import ContextLabel, Fact, FactLabel
+
+
+def _embedding_size(facts: Sequence[Fact]) -> int:
+    for fact in facts:
+        for span in (fact.subject, fact.predicate, fact.object):
+            if span.embedding is not None:
+                return len(span.embedding)
+        for link in fact.simple_links:
+            if link.target.embedding is not None:
+                return len(link.target.embedding)
+    return 0
+
+
+def numerify_facts(facts: Sequence[Fact], out_dir: str = None) -> Dict[str, np.ndarray]:
+    """
+    Turns facts into arrays, in one pass over the facts.
+
+    :param facts: Facts to convert, e.g. a view of facts.
+    :param out_dir: If given, the arrays are written to ``.npy`` files in this directory (created if needed) as they
+        are filled and returned as memory maps, so they do not need to fit into memory (only a map from the facts to
+        their positions, to resolve fact links, is kept). ``labels.json`` lists the
+        label names of the codes.
+    :return: Arrays by name, for n facts with m simple links and k fact links and embeddings of size d:
+
+        - ``ids`` (n): fact ids,
+        - ``types`` (n): `FactLabel` codes, -1 if unknown,
+        - ``context_levels`` (n),
+        - ``subject``, ``predicate``, ``object`` (n x d): embeddings, zero if missing,
+        - ``embedded`` (n x 3): whether subject, predicate and object are embedded,
+        - ``simple_offsets`` (n + 1), ``simple_labels`` (m), ``simple_embeddings`` (m x d): simple links with their
+          `ContextLabel` codes and the embeddings of their targets,
+        - ``link_offsets`` (n + 1), ``link_labels`` (k), ``link_targets`` (k): fact links with their `ContextLabel`
+          codes and the positions of their targets among the given facts, -1 if not among them.
+    """
+    n = len(facts)
+    size = _embedding_size(facts)
+    simple_offsets = np.zeros(n + 1, dtype=np.int64)
+    simple_offsets[1:] = np.cumsum(np.fromiter((len(f.simple_links) for f in facts), dtype=np.int64, count=n))
+    link_offsets = np.zeros(n + 1, dtype=np.int64)
+    link_offsets[1:] = np.cumsum(np.fromiter((len(f.fact_links) for f in facts), dtype=np.int64, count=n))
+    m, k = int(simple_offsets[-1]), int(link_offsets[-1])
+
+    def allocate(name, shape, dtype):
+        if out_dir is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(os.path.join(out_dir, name + ".npy"), mode="w+", dtype=dtype, shape=shape)
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    arrays = {
+        "ids": allocate("ids", (n,), np.int64),
+        "types": allocate("types", (n,), np.int16),
+        "context_levels": allocate("context_levels", (n,), np.int32),
+        "subject": allocate("subject", (n, size), np.float32),
+        "predicate": allocate("predicate", (n, size), np.float32),
+        "object": allocate("object", (n, size), np.float32),
+        "embedded": allocate("embedded", (n, 3), np.bool_),
+        "simple_offsets": allocate("simple_offsets", (n + 1,), np.int64),
+        "simple_labels": allocate("simple_labels", (m,), np.int16),
+        "simple_embeddings": allocate("simple_embeddings", (m, size), np.float32),
+        "link_offsets": allocate("link_offsets", (n + 1,), np.int64),
+        "link_labels": allocate("link_labels", (k,), np.int16),
+        "link_targets": allocate("link_targets", (k,), np.int64),
+    }
+    arrays["simple_offsets"][:] = simple_offsets
+    arrays["link_offsets"][:] = link_offsets
+
+    label_codes, type_codes = ContextLabel.codes(), FactLabel.codes()
+    positions = {id(fact): i for i, fact in enumerate(facts)}
+    # every value is written straight into its array, nothing of the size of the facts is collected on the way
+    ids, types, levels = arrays["ids"], arrays["types"], arrays["context_levels"]
+    spo = (arrays["subject"], arrays["predicate"], arrays["object"])
+    embedded = arrays["embedded"]
+    simple_labels, simple_embeddings = arrays["simple_labels"], arrays["simple_embeddings"]
+    link_labels, link_targets = arrays["link_labels"], arrays["link_targets"]
+    s = l = 0
+    for i, fact in enumerate(facts):
+        ids[i] = fact.id
+        types[i] = type_codes.get(fact.type, -1)
+        levels[i] = fact.context_level
+        for j, span in enumerate((fact.subject, fact.predicate, fact.object)):
+            if span.embedding is not None:
+                spo[j][i] = span.embedding
+                embedded[i, j] = True
+        for link in fact.simple_links:
+            simple_labels[s] = label_codes.get(link.label, -1)
+            if link.target.embedding is not None:
+                simple_embeddings[s] = link.target.embedding
+            s += 1
+        for link in fact.fact_links:
+            link_labels[l] = label_codes.get(link.label, -1)
+            link_targets[l] = positions.get(id(link.target), -1)
+            l += 1
+
+    if out_dir is not None:
+        for array in arrays.values():
+            array.flush()
+        with open(os.path.join(out_dir, "labels.json"), "w") as f:
+            json.dump({"types": list(FactLabel.__members__), "labels": list(ContextLabel.__members__)}, f)
+    return arrays
+
+
+def pad(values: np.ndarray, offsets: np.ndarray, fill=-1, length: int = None) -> np.ndarray:
+    """
+    Turns a ragged array into a padded one.
+
+    :param values: Values of all rows, e.g. ``link_labels`` of `numerify_facts`.
+    :param offsets: Offsets of the rows, e.g. ``link_offsets``.
+    :param fill: Value to pad with.
+    :param length: Length of every row, longer rows are cut. Defaults to the longest row.
+    :return: Array of shape (rows, length) (plus the remaining dimensions of `values`).
+    """
+    offsets = np.asarray(offsets)
+    lengths = np.diff(offsets)
+    length = int(lengths.max(initial=0)) if length is None else length
+    padded = np.full((len(lengths), length) + values.shape[1:], fill, dtype=values.dtype)
+    columns = np.arange(length)
+    mask = columns[None, :] < lengths[:, None]
+    padded[mask] = values[(offsets[:-1, None] + columns[None, :])[mask]]
+    return padded
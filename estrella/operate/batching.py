@@ -0,0 +1,162 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from estrella import metrics, util
+from estrella.enrich.latent import EmbeddingProvider
+from estrella.exceptions.service import ServiceException
+from estrella.executors import ThreadExecutor
+from estrella.interfaces import Loggable
+
+
+class BatchingEmbeddingProvider(EmbeddingProvider, Loggable):
+    """
+    Wraps another embedding provider and merges the terms of concurrent calls (e.g. of documents enriched by a
+    ``ThreadExecutor``) into batches, so the wrapped provider gets a few large requests instead of one per document.
+
+    Calls are merged over a window of `window` concurrent callers, e.g. the documents in flight in an executor with as
+    many workers: the first caller waits up to `max_wait` seconds for the others (or until a batch is full), then the
+    distinct terms of all of them are split into batches of at most `batch_size` terms, which are requested
+    concurrently. Every caller gets the embeddings of its own terms. With a window of 1 (the default, e.g. for the
+    `SerialExecutor`) nothing is waited for.
+
+    The batch size adapts to the observed latency: it grows by `min_batch_size` terms after every batch answered
+    within `target_latency` and is halved after every slower or failed batch (additive increase, multiplicative
+    decrease). Failed batches are split and retried, down to `min_batch_size`, so payload limits of the service are
+    found on their own.
+
+    Providers using `ServiceClient.fetch_keyed` (such as `Indra`) merge concurrent requests for the same terms on their
+    own, but still send one request per document. Batching happens before that: the batches of one merge are disjoint,
+    so `fetch_keyed` only merges terms that batches share with requests still in flight from earlier merges or from
+    other users of the same client.
+    """
+
+    def __init__(self, embedding_provider, window=1, max_wait=0.01, batch_size=1000, min_batch_size=50,
+                 max_batch_size=10000, target_latency=1.0, max_concurrency=4):
+        """
+        :param embedding_provider: Config or actual instance of the provider to wrap.
+        :param window: Number of calls to merge, at most. Set it to the number of documents enriched concurrently.
+        :param max_wait: Seconds to wait for the further calls of a window before requesting the terms collected so
+            far.
+        :param batch_size: Initial number of terms per request.
+        :param min_batch_size: Lower bound of the batch size, also the step it grows by.
+        :param max_batch_size: Upper bound of the batch size, e.g. the payload limit of the service.
+        :param target_latency: Seconds a request may take without the batch size being reduced.
+        :param max_concurrency: Maximal number of concurrent requests.
+        """
+        super().__init__()
+        self.embedding_provider: EmbeddingProvider = util.safe_construct(embedding_provider,
+                                                                         restrict_to=EmbeddingProvider,
+                                                                         relative_import="estrella.operate.embedding")
+        self.window = window
+        self.max_wait = max_wait
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = min(max(batch_size, min_batch_size), max_batch_size)
+        self.target_latency = target_latency
+        self.max_concurrency = max_concurrency
+        self._setup()
+
+    def _setup(self):
+        self._condition = threading.Condition()
+        self._pending: List[Future] = []
+        self._pending_terms = set()
+        self._collecting = False
+        self._executor: ThreadExecutor = None
+
+    @property
+    def executor(self) -> ThreadExecutor:
+        with self._condition:
+            if self._executor is None:
+                self._executor = ThreadExecutor(max_workers=self.max_concurrency)
+            return self._executor
+
+    def get_embeddings(self, strings: Iterable[str]) -> Dict[str, np.array]:
+        terms = set(strings)
+        if not terms:
+            return dict()
+        future = Future()
+        with self._condition:
+            self._pending.append(future)
+            self._pending_terms.update(terms)
+            leader = not self._collecting
+            if leader:
+                self._collecting = True
+            else:
+                self._condition.notify_all()
+        if leader:
+            self._flush()
+        embeddings = future.result()
+        return {term: embeddings.get(term, None) for term in terms}
+
+    def _flush(self):
+        # the first caller collects the calls arriving meanwhile and requests the terms of all of them
+        with self._condition:
+            if self.window > 1:
+                self._condition.wait_for(lambda: len(self._pending) >= self.window
+                                         or len(self._pending_terms) >= self.batch_size, timeout=self.max_wait)
+            pending, terms = self._pending, list(self._pending_terms)
+            self._pending, self._pending_terms, self._collecting = [], set(), False
+        try:
+            embeddings = self._fetch(terms)
+        except BaseException as e:
+            for future in pending:
+                future.set_exception(e)
+            raise
+        if len(pending) > 1:
+            self.logger.debug("Merged {} calls into requests for {} terms.".format(len(pending), len(terms)))
+        for future in pending:
+            future.set_result(embeddings)
+
+    def _batches(self, terms: List[str]) -> List[List[str]]:
+        size = self.batch_size
+        return [terms[i:i + size] for i in range(0, len(terms), size)]
+
+    def _fetch(self, terms: List[str]) -> Dict[str, np.array]:
+        batches = self._batches(terms)
+        metrics.counter("batching.calls").inc()
+        if len(batches) == 1:
+            return self._fetch_batch(batches[0])
+        embeddings = dict()
+        for fetched in self.executor.map(self._fetch_batch, batches):
+            embeddings.update(fetched)
+        return embeddings
+
+    def _fetch_batch(self, batch: List[str]) -> Dict[str, np.array]:
+        start = time.perf_counter()
+        try:
+            embeddings = self.embedding_provider.get_embeddings(batch)
+        except ServiceException as e:
+            self._adapt(None)
+            if len(batch) <= self.min_batch_size:
+                raise
+            self.logger.warning("Request for {} terms failed ({}), splitting it.".format(len(batch), e))
+            half = len(batch) // 2
+            return dict(self._fetch_batch(batch[:half]), **self._fetch_batch(batch[half:]))
+        latency = time.perf_counter() - start
+        self._adapt(latency)
+        metrics.histogram("batching.batch_terms").observe(len(batch))
+        metrics.histogram("batching.seconds").observe(latency)
+        return embeddings
+
+    def _adapt(self, latency: float):
+        """
+        Adapts the batch size to the latency of a request, None for failed requests.
+        """
+        with self._condition:
+            if latency is not None and latency <= self.target_latency:
+                self.batch_size = min(self.batch_size + self.min_batch_size, self.max_batch_size)
+            else:
+                self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+            metrics.gauge("batching.batch_size").set(self.batch_size)
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items()
+                if k not in ("_condition", "_pending", "_pending_terms", "_collecting", "_executor")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from estrella import metrics, util
+from estrella.enrich.latent import EmbeddingProvider
+from estrella.interfaces import Loggable
+
+
+class TieredCache(Loggable, metaclass=ABCMeta):
+    """
+    Base of caches with two tiers: a bounded in-memory LRU and an optional persistent sqlite file. Keeps the hit
+    counters and reports them as metrics labelled with `metric_label`.
+
+    Subclasses create their table in `_create_tables` and look up / store in the persistent tier themselves.
+    """
+    _batch_size = 500  # stay below sqlite's limit of host parameters per statement
+    metric_label: str = None
+
+    def __init__(self, path: str = None, lru_size=10000):
+        """
+        :param path: Path of the sqlite file for the persistent tier. If not given, only the in-memory tier is used.
+        :param lru_size: Maximal number of entries to keep in memory.
+        """
+        super().__init__()
+        self.path = path
+        self.lru_size = lru_size
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+        self._connection: sqlite3.Connection = None
+
+    @abstractmethod
+    def _create_tables(self, connection: sqlite3.Connection):
+        pass
+
+    @property
+    def connection(self) -> Optional[sqlite3.Connection]:
+        if self._connection is None and self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._create_tables(self._connection)
+            self._connection.commit()
+        return self._connection
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.persistent_hits + self.misses
+        return (self.hits + self.persistent_hits) / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the cache counters.
+
+        :return: Number of hits in memory, hits in the persistent tier, misses and the overall hit rate.
+        """
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate
+        }
+
+    def _count(self, hits=0, persistent_hits=0, misses=0):
+        self.hits += hits
+        self.persistent_hits += persistent_hits
+        self.misses += misses
+        metrics.counter("cache.hits", cache=self.metric_label).inc(hits)
+        metrics.counter("cache.persistent_hits", cache=self.metric_label).inc(persistent_hits)
+        metrics.counter("cache.misses", cache=self.metric_label).inc(misses)
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _recall(self, keys: Iterable) -> Tuple[Dict, List]:
+        """
+        Looks keys up in the in-memory tier, counting the hits.
+
+        :return: Values of the keys found and the keys missing.
+        """
+        found, missing = dict(), []
+        for key in set(keys):
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                found[key] = self._lru[key]
+            else:
+                missing.append(key)
+        self._count(hits=len(found))
+        return found, missing
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __getstate__(self):
+        # connections and locks cannot be shipped to other processes, they are re-created on demand
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_lock'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+def provider_namespace(provider: EmbeddingProvider) -> str:
+    """
+    Identifies the vector space of an embedding provider, so that providers sharing a cache file do not get each
+    other's embeddings.
+
+    :return: corpus/model/language of the provider (those it has), otherwise the namespace of the provider it wraps
+        (such as a `estrella.operate.batching.BatchingEmbeddingProvider`), otherwise its class name and the absolute
+        path of its vectors (such as a `estrella.operate.local.LocalEmbeddings`).
+    """
+    parts = [str(getattr(provider, attr)) for attr in ("corpus", "model", "language")
+             if getattr(provider, attr, None) is not None]
+    if parts:
+        return "/".join(parts)
+    wrapped = getattr(provider, "embedding_provider", None)
+    if wrapped is not None:
+        return provider_namespace(wrapped)
+    path = getattr(provider, "path", None)
+    name = provider.__class__.__name__
+    return name if path is None else "{}:{}".format(name, os.path.abspath(path))
+
+
+class CachingEmbeddingProvider(EmbeddingProvider, TieredCache):
+    """
+    Wraps another embedding provider and caches its embeddings in two tiers: a bounded in-memory LRU and an optional
+    persistent sqlite file. Only terms missing from both tiers are sent to the wrapped provider.
+
+    Unknown terms (for which the wrapped provider returns None) are cached as well.
+    """
+    metric_label = "embeddings"
+
+    def __init__(self, embedding_provider, path: str = None, lru_size=100000, namespace: str = None):
+        """
+        :param embedding_provider: Config or actual instance of the provider to wrap.
+        :param path: Path of the sqlite file for the persistent tier. If not given, only the in-memory tier is used.
+        :param lru_size: Maximal number of embeddings to keep in memory.
+        :param namespace: Key to separate embeddings of different vector spaces in the same file. Defaults to
+            corpus/model/language of the wrapped provider if it has any of them, otherwise to its class name and the
+            path of its vectors (if any), see `provider_namespace`.
+        """
+        TieredCache.__init__(self, path, lru_size)
+        self.embedding_provider: EmbeddingProvider = util.safe_construct(embedding_provider,
+                                                                         restrict_to=EmbeddingProvider,
+                                                                         relative_import="estrella.operate.embedding")
+        self.namespace = namespace or provider_namespace(self.embedding_provider)
+
+    def _create_tables(self, connection):
+        connection.execute("CREATE TABLE IF NOT EXISTS embeddings "
+                           "(namespace TEXT, term TEXT, vector BLOB, PRIMARY KEY (namespace, term))")
+
+    def _load_persistent(self, terms):
+        found = dict()
+        for i in range(0, len(terms), self._batch_size):
+            batch = terms[i:i + self._batch_size]
+            rows = self.connection.execute(
+                "SELECT term, vector FROM embeddings WHERE namespace = ? AND term IN ({})".format(
+                    ",".join("?" * len(batch))),
+                [self.namespace] + batch
+            )
+            for term, vector in rows:
+                found[term] = None if vector is None else np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def _store_persistent(self, embeddings):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO embeddings (namespace, term, vector) VALUES (?, ?, ?)",
+            ((self.namespace, term, None if embedding is None else embedding.tobytes())
+             for term, embedding in embeddings.items())
+        )
+        self.connection.commit()
+
+    def get_embeddings(self, strings: Iterable[str]) -> Dict[str, np.array]:
+        with self._lock:
+            result, missing = self._recall(strings)
+            if missing and self.connection:
+                persistent = self._load_persistent(missing)
+                self._count(persistent_hits=len(persistent))
+                for term, embedding in persistent.items():
+                    self._remember(term, embedding)
+                result.update(persistent)
+                missing = [term for term in missing if term not in persistent]
+
+        if missing:
+            self.logger.debug("{} cache misses, asking {}.".format(len(missing),
+                                                                     self.embedding_provider.__class__.__name__))
+            fetched = self.embedding_provider.get_embeddings(missing)
+            fetched = {term: None if fetched.get(term, None) is None else np.asarray(fetched[term], dtype=np.float32)
+                       for term in missing}
+            with self._lock:
+                self._count(misses=len(missing))
+                for term, embedding in fetched.items():
+                    self._remember(term, embedding)
+                if self.connection:
+                    self._store_persistent(fetched)
+            result.update(fetched)
+        metrics.gauge("cache.hit_rate", cache=self.metric_label).set(self.hit_rate)
+        return result
+
+
+class ExtractionCache(TieredCache):
+    """
+    Content-addressed cache of JSON-serializable results (such as Graphene extractions), in a bounded in-memory LRU
+    and an optional persistent sqlite file.
+    """
+    metric_label = "extractions"
+
+    def __init__(self, path: str = None, lru_size=10000):
+        """
+        :param path: Path of the sqlite file for the persistent tier. If not given, only the in-memory tier is used.
+        :param lru_size: Maximal number of results to keep in memory.
+        """
+        super().__init__(path, lru_size)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Creates a key from the content and the options a result depends on.
+        """
+        return hashlib.sha1(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def _create_tables(self, connection):
+        connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get_many(self, keys: Iterable[str]) -> Dict:
+        """
+        Looks up results.
+
+        :param keys: Keys to look up.
+        :return: Mapping from the keys found to their results. Missing keys are counted as misses.
+        """
+        with self._lock:
+            result, missing = self._recall(keys)
+            if missing and self.connection:
+                persistent = dict()
+                for i in range(0, len(missing), self._batch_size):
+                    batch = missing[i:i + self._batch_size]
+                    rows = self.connection.execute(
+                        "SELECT key, value FROM results WHERE key IN ({})".format(",".join("?" * len(batch))), batch)
+                    for key, value in rows:
+                        persistent[key] = json.loads(value)
+                        self._remember(key, persistent[key])
+                self._count(persistent_hits=len(persistent))
+                result.update(persistent)
+            self._count(misses=sum(1 for key in missing if key not in result))
+        metrics.gauge("cache.hit_rate", cache=self.metric_label).set(self.hit_rate)
+        return result
+
+    def put_many(self, results: Dict):
+        """
+        Stores results by their keys.
+        """
+        with self._lock:
+            for key, value in results.items():
+                self._remember(key, value)
+            if self.connection:
+                self.connection.executemany("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                                            ((key, json.dumps(value)) for key, value in results.items()))
+                self.connection.commit()
@@ -1,10 +1,8 @@
-import json
 from abc import ABCMeta, abstractmethod
 from operator import attrgetter
 from typing import Sequence, Dict, Iterable
 
-import requests
-
+from estrella import service
 from estrella.enrich.latent import EmbeddingProvider
 
 
@@ -30,7 +28,16 @@ class Indra(EmbeddingComparator, EmbeddingProvider):
     """
 
     def __init__(self, corpus="googlenews", model="W2V", language="EN", server="localhost", scoring_function='COSINE',
-                 port=8916):
+                 port=8916, max_concurrency=8, timeout=60, retries=3, backoff=0.5):
+        """
+        Requests go through a service client shared with every other stub using the same client settings.
+
+        :param max_concurrency: Maximal number of concurrent requests.
+        :param timeout: Timeout per request in seconds.
+        :param retries: How often to retry failed requests.
+        :param backoff: Seconds to wait before the first retry, doubled with every further retry.
+        """
+        self.client = service.get_client(max_concurrency, timeout, retries, backoff)
         self.corpus = corpus
         self.model = model
         self.language = getattr(language, "value", False) or language
@@ -48,21 +55,27 @@ class Indra(EmbeddingComparator, EmbeddingProvider):
         has no embedding in the vector space, returns None.
         """
 
+        # concurrent requests for the same terms (e.g. from other documents) are merged
+        return self.client.fetch_keyed(strings, self._fetch_embeddings, namespace=self._namespace)
+
+    async def aget_embeddings(self, strings: Iterable[str]) -> Dict[str, float]:
+        """
+        Coroutine version of `get_embeddings`.
+        """
+        return await self.client.afetch_keyed(strings, self._fetch_embeddings, namespace=self._namespace)
+
+    @property
+    def _namespace(self):
+        return self.embeddings_endpoint, self.corpus, self.model, self.language
+
+    def _fetch_embeddings(self, terms):
         payload = {
             'corpus': self.corpus,
             'model': self.model,
             'language': self.language,
-            'terms': list(strings)
-        }
-        headers = {
-            'content-type': "application/json"
+            'terms': terms
         }
-        response = requests.request("POST", self.embeddings_endpoint, data=json.dumps(payload), headers=headers)
-
-        response.raise_for_status()
-
-        response = response.json()['terms']
-        return response
+        return self.client.post(self.embeddings_endpoint, payload)['terms']
 
     def get_semantic_relatedness(self, pairs):
         """
@@ -71,22 +84,22 @@ class Indra(EmbeddingComparator, EmbeddingProvider):
         :param pairs: list of word pairs where each element looks like {"t1": word1, "t2": word2}
         :return: list of word pairs where each element looks like {"t1": word1, "t2": word2, "score": value}
         """
-        payload = {
+        return self.client.post_coalesced(self.relatedness_endpoint, self._relatedness_payload(pairs))['pairs']
+
+    async def aget_semantic_relatedness(self, pairs):
+        """
+        Coroutine version of `get_semantic_relatedness`.
+        """
+        return (await self.client.apost(self.relatedness_endpoint, self._relatedness_payload(pairs)))['pairs']
+
+    def _relatedness_payload(self, pairs):
+        return {
             'corpus': self.corpus,
             'model': self.model,
             'language': self.language,
             'scoreFunction': self.scoring_function,
             'pairs': pairs
         }
-        headers = {
-            'content-type': "application/json"
-        }
-        response = requests.request("POST", self.relatedness_endpoint, data=json.dumps(payload), headers=headers)
-
-        response.raise_for_status()
-
-        response = response.json()['pairs']
-        return response
 
     def sort_by_relatedness_with_id(self, comparator, comparables, id_name="_id", format="{name}"):
         """
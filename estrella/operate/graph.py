@@ -0,0 +1,127 @@
+from typing import Sequence, Iterable, List, Collection
+
+import numpy as np
+
+from estrella.interfaces import Loggable
+from estrella.model.oie import Fact, ContextLabel
+
+
+class FactGraph(Loggable):
+    """
+    Compact adjacency structure over the context links of a collection of facts, built once and traversed with array
+    operations.
+
+    Nodes are the facts (in the given order) followed by the targets of their simple contexts. Edges are stored in
+    CSR layout: the outgoing edges of node ``i`` are ``targets[indptr[i]:indptr[i + 1]]`` with label codes
+    ``labels[...]``, in the same order as ``Fact.links``. The inverse adjacency is built on first use.
+    """
+
+    def __init__(self, facts: Sequence[Fact]):
+        super().__init__()
+        self.label_codes = {label: code for code, label in enumerate(ContextLabel)}
+        self.nodes: List = list(facts)
+        self._node_ids = {id(f): i for i, f in enumerate(self.nodes)}
+
+        targets, labels, simple, counts = [], [], [], np.zeros(len(self.nodes), dtype=np.int64)
+        for i, fact in enumerate(facts):
+            for link in fact.links:
+                target_id = self._node_ids.get(id(link.target), None)
+                if target_id is None:
+                    # simple contexts (or facts outside the collection) become nodes without outgoing edges
+                    target_id = self._node_ids[id(link.target)] = len(self.nodes)
+                    self.nodes.append(link.target)
+                targets.append(target_id)
+                labels.append(self.label_codes.get(link.label, -1))
+                simple.append(link.is_simple)
+                counts[i] += 1
+        counts = np.concatenate([counts, np.zeros(len(self.nodes) - len(counts), dtype=np.int64)])
+        self.indptr = np.concatenate([[0], np.cumsum(counts)])
+        self.targets = np.array(targets, dtype=np.int64)
+        self.labels = np.array(labels, dtype=np.int16)
+        self.simple = np.array(simple, dtype=bool)
+        self.sources = np.repeat(np.arange(len(self.nodes)), counts)
+        self._inverse = None
+        self.logger.debug("Built graph with {} nodes and {} edges.".format(len(self.nodes), len(self.targets)))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def inverse(self):
+        """
+        Inverse adjacency in CSR layout: (indptr, edge indices sorted by target).
+        """
+        if self._inverse is None:
+            order = np.argsort(self.targets, kind="stable")
+            counts = np.bincount(self.targets, minlength=len(self.nodes))
+            self._inverse = np.concatenate([[0], np.cumsum(counts)]), order
+        return self._inverse
+
+    def ids(self, objects: Iterable) -> np.ndarray:
+        """
+        Returns the node ids of given objects, skipping objects that are not part of the graph.
+        """
+        ids = np.fromiter((self._node_ids.get(id(o), -1) for o in objects), dtype=np.int64)
+        return ids[ids >= 0]
+
+    def objects(self, ids: np.ndarray) -> list:
+        """
+        Returns the objects for given node ids.
+        """
+        return [self.nodes[i] for i in ids]
+
+    def _codes(self, labels: Collection[ContextLabel], inverse):
+        if inverse:
+            # following an edge backwards turns e.g. a CAUSE into a RESULT
+            labels = [label.inverse or label for label in labels]
+        return np.array([self.label_codes[label] for label in labels], dtype=np.int16)
+
+    def hop(self, ids: np.ndarray, labels: Collection[ContextLabel] = None, inverse=False, simple=True) -> np.ndarray:
+        """
+        Follows the edges of given nodes once.
+
+        :param ids: Node ids to start from, duplicates are followed again.
+        :param labels: Only follow edges with one of these labels. When hopping inversely, the labels are read from
+            the perspective of the traversal, i.e. an inverse ``ContextLabel.Result`` hop follows ``Cause`` edges
+            backwards.
+        :param inverse: Whether to follow the edges backwards.
+        :param simple: Whether to follow edges to simple contexts (which are not facts).
+        :return: Node ids reached, grouped by start node in order of the given ids.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        indptr, edge_order = self.inverse if inverse else (self.indptr, None)
+        starts, ends = indptr[ids], indptr[ids + 1]
+        counts = ends - starts
+        # indices of all edges of all given nodes, in order, without a python loop
+        edges = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) + np.arange(counts.sum())
+        if edge_order is not None:
+            edges = edge_order[edges]
+        mask = np.ones(len(edges), dtype=bool)
+        if labels is not None:
+            mask &= np.isin(self.labels[edges], self._codes(labels, inverse))
+        if not simple:
+            mask &= ~self.simple[edges]
+        edges = edges[mask]
+        return self.sources[edges] if inverse else self.targets[edges]
+
+    def traverse(self, ids: np.ndarray, depth=1, labels: Collection[ContextLabel] = None, inverse=False,
+                 simple=True) -> np.ndarray:
+        """
+        Returns every node reachable from given nodes in one up to `depth` hops, each node once.
+
+        :param ids: Node ids to start from.
+        :param depth: Maximal number of hops.
+        :param labels: See `hop`.
+        :param inverse: See `hop`.
+        :param simple: See `hop`.
+        :return: Sorted node ids reached.
+        """
+        visited = np.zeros(len(self.nodes), dtype=bool)
+        frontier = np.unique(ids)
+        for _ in range(depth):
+            frontier = np.unique(self.hop(frontier, labels, inverse, simple))
+            frontier = frontier[~visited[frontier]]
+            if not len(frontier):
+                break
+            visited[frontier] = True
+        return np.flatnonzero(visited)
@@ -0,0 +1,165 @@
+from collections import OrderedDict, defaultdict
+from operator import attrgetter
+from typing import Dict, List, Set, Any, Tuple, Collection
+
+from estrella.interfaces import Loggable
+
+default_attributes = ("subject.text", "predicate.text", "object.text", "type", "context_level", "label", "language")
+
+_missing = object()  # value of members without the attribute, never matched
+_unhashable = object()  # value of members whose value cannot be hashed, compared one by one
+
+
+class AttributeIndex:
+    """
+    Hash index from the values of one (possibly dotted) attribute to the positions of the members of a collection
+    having that value.
+
+    Built once per collection (see `IndexRegistry.collection`). Assumes that indexed attributes do not change once the
+    collection has been indexed.
+    """
+
+    def __init__(self, attribute: str, members: List):
+        self.attribute = attribute
+        self.buckets: Dict[Any, List[int]] = defaultdict(list)
+        self.unhashable: List[int] = []  # positions of members with a value that cannot be hashed
+        self.values: List = []  # value by position, to check further predicates on the candidates of another index
+        get = attrgetter(attribute)
+        for i, member in enumerate(members):
+            try:
+                value = get(member)
+            except Exception:
+                self.values.append(_missing)
+                continue
+            try:
+                self.buckets[value].append(i)
+            except TypeError:
+                self.unhashable.append(i)
+                value = _unhashable
+            self.values.append(value)
+        self.buckets.default_factory = None
+
+    def lookup(self, value) -> List[int]:
+        """
+        Returns the positions of all members whose attribute equals a given (hashable) value, in order.
+        """
+        return self.buckets.get(value, [])
+
+
+class CollectionIndexes:
+    """
+    Indexes over one collection of members (such as the documents of an `Estrella` instance), built lazily on first use
+    and kept together with the members they refer to.
+    """
+
+    def __init__(self, members: List):
+        self.members = members
+        self.attributes: Dict[str, AttributeIndex] = dict()
+        self.nearest = None  # nearest neighbour index, see `View.nearest`
+
+    def attribute(self, attribute: str) -> AttributeIndex:
+        if attribute not in self.attributes:
+            self.attributes[attribute] = AttributeIndex(attribute, self.members)
+        return self.attributes[attribute]
+
+    def select(self, **kwargs) -> Tuple[List, Set[int]]:
+        """
+        Selects the members matching all given indexable equality predicates, see `IndexRegistry.select`.
+        """
+        lookups = [(self.attribute(attribute), value) for attribute, value in kwargs.items()]
+        # start with the most selective index, check the others on its candidates only
+        lookups.sort(key=lambda l: len(l[0].lookup(l[1])) + len(l[0].unhashable))
+        first, value = lookups[0]
+        positions = first.lookup(value)
+        unsure = set(first.unhashable)
+        if unsure:
+            positions = sorted(positions + first.unhashable)
+        for index, value in lookups[1:]:
+            kept = []
+            for i in positions:
+                indexed = index.values[i]
+                if indexed is _unhashable:
+                    unsure.add(i)
+                    kept.append(i)
+                elif indexed is not _missing and indexed == value:
+                    kept.append(i)
+            positions = kept
+        members = self.members
+        return [members[i] for i in positions], {id(members[i]) for i in unsure.intersection(positions)}
+
+
+class IndexRegistry(Loggable):
+    """
+    Collection of indexes, built lazily and shared by all views created from the same collection (such as all views
+    derived from one `Estrella` instance).
+
+    Indexes belong to a collection of members, identified by the identity and order of the members. The indexes of the
+    `max_collections` collections used most recently are kept, together with their members.
+    """
+
+    def __init__(self, attributes: Collection[str] = default_attributes, max_collections=8):
+        """
+        :param attributes: Attributes to index when they are filtered for.
+        :param max_collections: Number of collections to keep the indexes of.
+        """
+        super().__init__()
+        self.attributes = set(attributes)
+        self.max_collections = max_collections
+        self.collections: Dict[tuple, CollectionIndexes] = OrderedDict()
+
+    def index_on(self, *attributes: str):
+        """
+        Adds attributes to be indexed.
+        """
+        self.attributes.update(attributes)
+
+    def clear(self):
+        self.collections.clear()
+
+    def collection(self, members: List) -> CollectionIndexes:
+        """
+        Returns the indexes over a given collection of members, new (and empty) ones for a collection not seen before.
+
+        Collections are identified by the identities of their members, which takes one (C-level) pass over them per
+        call. It is not cached on views, since they are lists that can change at any time.
+        """
+        key = tuple(map(id, members))
+        indexes = self.collections.get(key, None)
+        if indexes is None:
+            self.logger.debug("Indexing a collection of {} members.".format(len(key)))
+            # the indexes keep their members alive, so the ids in the key stay unique
+            indexes = self.collections[key] = CollectionIndexes(list(members))
+            if len(self.collections) > self.max_collections:
+                self.collections.popitem(last=False)
+        else:
+            self.collections.move_to_end(key)
+        return indexes
+
+    def plan(self, **kwargs) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Splits equality predicates into those that can be answered with an index and those that need a scan.
+
+        :param kwargs: Attribute names and expected values.
+        :return: Indexable predicates and remaining predicates.
+        """
+        indexed, scanned = dict(), dict()
+        for attribute, value in kwargs.items():
+            try:
+                hash(value)
+                hashable = True
+            except TypeError:
+                hashable = False
+            (indexed if hashable and attribute in self.attributes else scanned)[attribute] = value
+        return indexed, scanned
+
+    def select(self, members: List, **kwargs) -> Tuple[List, Set[int]]:
+        """
+        Selects the members matching all given indexable equality predicates, in their original order. The members
+        are only iterated when their collection is indexed for the first time.
+
+        :param members: Members to select from.
+        :param kwargs: Indexable attribute names and expected values, see `plan`.
+        :return: Members that (possibly) matched and the ids of those among them that need to be checked one by one,
+            since they have unhashable values.
+        """
+        return self.collection(members).select(**kwargs)
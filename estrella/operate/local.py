@@ -0,0 +1,205 @@
+import os
+import threading
+from operator import attrgetter
+from typing import Iterable, Dict, Sequence, List
+
+import numpy as np
+
+from estrella.enrich.latent import EmbeddingProvider
+from estrella.interfaces import Loggable
+from estrella.operate.embedding import EmbeddingComparator
+from estrella.operate.relatedness import rank
+
+
+def _read_text_vectors(path, has_header):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        if has_header:
+            f.readline()
+        for line in f:
+            parts = line.rstrip("\n").rstrip(" ").split(" ")
+            if len(parts) > 1:
+                yield parts[0], np.asarray(parts[1:], dtype=np.float32)
+
+
+def _read_binary_vectors(path):
+    with open(path, "rb") as f:
+        count, size = (int(x) for x in f.readline().split())
+        for _ in range(count):
+            word = bytearray()
+            while True:
+                c = f.read(1)
+                if c == b" " or not c:
+                    break
+                if c != b"\n":
+                    word.extend(c)
+            yield word.decode("utf-8", errors="replace"), np.frombuffer(f.read(4 * size), dtype=np.float32)
+
+
+def _text_header(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        first = f.readline().split()
+        # word2vec text files start with "<count> <size>", glove files do not
+        if len(first) == 2 and all(x.isdigit() for x in first):
+            return True, int(first[0]), int(first[1])
+        size = len(first) - 1
+        count = 1 + sum(1 for _ in f)
+    return False, count, size
+
+
+def convert(path, target, binary=False):
+    """
+    Converts a word2vec (text or binary) or GloVe file into the memory-mappable layout used by `LocalEmbeddings`:
+
+    - ``<target>.vectors.npy``: float32 matrix, one row per word, in order of the source file.
+    - ``<target>.vocab.npy``: utf-8 encoded words, sorted, as fixed width byte strings.
+    - ``<target>.rows.npy``: row in the matrix for every entry of the sorted vocabulary.
+
+    The files are written under temporary names and renamed into place once complete, so readers never open a
+    partly written file, also if several processes convert the same source at once.
+
+    :param path: Vector file to convert.
+    :param target: Path prefix of the converted files.
+    :param binary: Whether the vector file is in binary word2vec format.
+    """
+    if binary:
+        with open(path, "rb") as f:
+            count, size = (int(x) for x in f.readline().split())
+        vectors = _read_binary_vectors(path)
+    else:
+        has_header, count, size = _text_header(path)
+        vectors = _read_text_vectors(path, has_header)
+    names = [target + ext for ext in (".vectors.npy", ".rows.npy", ".vocab.npy")]
+    # unique per process and thread, next to the final files so they can be renamed atomically
+    temporary = ["{}.{}-{}.tmp.npy".format(name[:-len(".npy")], os.getpid(), threading.get_ident()) for name in names]
+    try:
+        # written row by row, the source never has to fit into memory at once
+        matrix = np.lib.format.open_memmap(temporary[0], mode="w+", dtype=np.float32, shape=(count, size))
+        words = []
+        for i, (word, vector) in enumerate(vectors):
+            matrix[i] = vector
+            words.append(word.encode("utf-8"))
+        matrix.flush()
+        del matrix
+        vocab = np.array(words, dtype=bytes)
+        order = np.argsort(vocab, kind="stable")
+        np.save(temporary[1], order.astype(np.int64))
+        np.save(temporary[2], vocab[order])
+        # the vocabulary last, it is what `LocalEmbeddings` checks first
+        for tmp, name in zip(temporary, names):
+            os.replace(tmp, name)
+    finally:
+        for tmp in temporary:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+class LocalEmbeddings(EmbeddingComparator, EmbeddingProvider, Loggable):
+    """
+    In-process embedding provider reading word2vec/GloVe vectors.
+
+    The vectors are converted once into `.npy` files next to the source file (or `cache_path`) and memory-mapped
+    afterwards: opening is near-instant, and processes reading the same files share their pages. Lookups are
+    batched binary searches over a sorted, memory-mapped vocabulary.
+    """
+
+    def __init__(self, path: str, binary=False, cache_path: str = None, scoring_function="COSINE"):
+        """
+        :param path: Path to the word2vec or GloVe file.
+        :param binary: Whether the file is in binary word2vec format.
+        :param cache_path: Path prefix of the converted files. Defaults to `path`.
+        :param scoring_function: Scoring function used to sort by relatedness, see `relatedness.scoring_functions`.
+        """
+        super().__init__()
+        self.path = path
+        self.binary = binary
+        self.cache_path = cache_path or path
+        self.scoring_function = scoring_function
+        self._vectors = None
+        self._vocab = None
+        self._rows = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # the first lookups of concurrent workers convert and open the files only once
+        with self._lock:
+            if self._vocab is not None:
+                return
+            files = [self.cache_path + ext for ext in (".vectors.npy", ".vocab.npy", ".rows.npy")]
+            if not all(os.path.exists(f) and os.path.getmtime(f) >= os.path.getmtime(self.path) for f in files):
+                self.logger.info("Converting {} into memory-mappable format...".format(self.path))
+                convert(self.path, self.cache_path, self.binary)
+            vectors, vocab, rows = (np.load(f, mmap_mode="r") for f in files)
+            # the vocabulary last, lookups only check it
+            self._vectors, self._rows, self._vocab = vectors, rows, vocab
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vocab is None:
+            self._open()
+        return self._vectors
+
+    @property
+    def size(self) -> int:
+        return self.vectors.shape[1]
+
+    def lookup(self, strings: Sequence[str]) -> np.ndarray:
+        """
+        Looks up the rows of given strings in the vector matrix.
+
+        :param strings: Strings to look up.
+        :return: Row in the vector matrix for every string, -1 for unknown strings.
+        """
+        if self._vocab is None:
+            self._open()
+        if not len(strings) or not len(self._vocab):
+            return np.full(len(strings), -1, dtype=np.int64)
+        keys = np.array([s.encode("utf-8") for s in strings], dtype=bytes)
+        positions = np.searchsorted(self._vocab, keys).clip(max=len(self._vocab) - 1)
+        found = self._vocab[positions] == keys
+        return np.where(found, self._rows[positions], -1)
+
+    def get_embeddings(self, strings: Iterable[str]) -> Dict[str, np.array]:
+        strings = list(set(strings))
+        rows = self.lookup(strings)
+        known = rows >= 0
+        # one vectorized gather for the whole batch
+        embeddings = self.vectors[rows[known]]
+        result = dict.fromkeys(strings)
+        result.update(zip((s for s, k in zip(strings, known) if k), embeddings))
+        return result
+
+    def embed_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embeds texts as the mean of the vectors of their (whitespace separated) words.
+
+        :param texts: Texts to embed.
+        :return: Matrix with one row per text. Rows of texts without any known word are zero.
+        """
+        tokens = [text.split() for text in texts]
+        lengths = np.array([len(t) for t in tokens])
+        rows = self.lookup([token for t in tokens for token in t])
+        vectors = np.zeros((len(rows), self.size), dtype=np.float32)
+        known = rows >= 0
+        vectors[known] = self.vectors[rows[known]]
+        text_ids = np.repeat(np.arange(len(texts)), lengths)
+        sums = np.zeros((len(texts), self.size), dtype=np.float32)
+        np.add.at(sums, text_ids[known], vectors[known])
+        counts = np.bincount(text_ids[known], minlength=len(texts)).reshape(-1, 1)
+        return sums / np.maximum(counts, 1)
+
+    def sort_by_relatedness(self, compare_with: str, comparables: Sequence, attr: str = None, k: int = None) -> List:
+        get = attrgetter(attr) if attr else lambda x: x
+        matrix = self.embed_texts([str(get(c)) for c in comparables])
+        query = self.embed_texts([compare_with])[0]
+        return [comparables[i] for i in rank(query, matrix, k, self.scoring_function)]
+
+    def __getstate__(self):
+        # memory maps are re-opened in the receiving process, sharing pages instead of copying them
+        state = self.__dict__.copy()
+        state['_vectors'] = state['_vocab'] = state['_rows'] = None
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,144 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from estrella.interfaces import Loggable
+from estrella.operate import relatedness
+
+
+class IVFIndex(Loggable):
+    """
+    Approximate nearest neighbour index (inverted file): vectors are clustered with k-means, and a search only
+    scores the vectors of the `n_probe` clusters closest to the query.
+
+    With `n_lists` clusters of roughly equal size, a search scores about ``n_probe / n_lists`` of all vectors.
+    Pure numpy, can be saved and loaded again.
+    """
+
+    def __init__(self, n_lists: int = None, n_probe=8, scoring_function="COSINE", iterations=10, sample_size=256,
+                 random_seed=1337):
+        """
+        :param n_lists: Number of clusters. Defaults to the square root of the number of vectors.
+        :param n_probe: Number of clusters to search. Higher is slower but more accurate.
+        :param scoring_function: One of COSINE, DOT or EUCLIDEAN.
+        :param iterations: Number of k-means iterations when building.
+        :param sample_size: k-means is trained on at most `sample_size` vectors per cluster.
+        :param random_seed: Seed for sampling and initialising the clusters.
+        """
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.scoring_function = scoring_function.upper()
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.random_seed = random_seed
+
+        self.centroids: np.ndarray = None
+        self.vectors: np.ndarray = None  # grouped by cluster
+        self.ids: np.ndarray = None  # original position of every vector in `vectors`
+        self.offsets: np.ndarray = None  # vectors of cluster i are vectors[offsets[i]:offsets[i + 1]]
+        self.items: Sequence = None
+
+    def _prepare(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.scoring_function == "COSINE":
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    @property
+    def _score(self):
+        # vectors are normalised for cosine, so the dot product suffices
+        return relatedness.dot if self.scoring_function == "COSINE" else \
+            relatedness.scoring_functions[self.scoring_function]
+
+    def _assign(self, vectors, centroids, batch_size=4096):
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        if self.scoring_function == "EUCLIDEAN":
+            # -|x - c|^2 = 2 x.c - |c|^2 - |x|^2, the last term is the same for all centroids of a vector
+            squared_norms = (centroids ** 2).sum(axis=1)
+        for start in range(0, len(vectors), batch_size):
+            batch = vectors[start:start + batch_size]
+            scores = batch.dot(centroids.T)
+            if self.scoring_function == "EUCLIDEAN":
+                scores = 2 * scores - squared_norms
+            assignments[start:start + batch_size] = scores.argmax(axis=1)
+        return assignments
+
+    def build(self, vectors: np.ndarray, items: Sequence = None) -> "IVFIndex":
+        """
+        Builds the index.
+
+        :param vectors: Matrix with one row per item.
+        :param items: Objects the vectors belong to, returned by `nearest`. Optional.
+        :return: The index.
+        """
+        vectors = self._prepare(vectors)
+        n_lists = max(1, min(self.n_lists or int(np.sqrt(len(vectors))), len(vectors)))
+        random = np.random.RandomState(self.random_seed)
+        sample = vectors[random.choice(len(vectors), min(len(vectors), n_lists * self.sample_size), replace=False)]
+        centroids = sample[random.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignments = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            # keep empty clusters where they are
+            centroids = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centroids)
+            centroids = self._prepare(centroids)
+        assignments = self._assign(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        self.centroids = centroids
+        self.vectors = vectors[order]
+        self.ids = order
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+        self.items = items
+        self.logger.debug("Built index over {} vectors in {} lists.".format(len(vectors), n_lists))
+        return self
+
+    def search(self, query: np.ndarray, k=10, n_probe: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the k nearest neighbours of a query vector.
+
+        :param query: Vector to search for.
+        :param k: Number of neighbours.
+        :param n_probe: Overrides the number of clusters to search.
+        :return: Original positions of the neighbours and their scores, most related first.
+        """
+        query = self._prepare(query)
+        lists = relatedness.rank(query, self.centroids, n_probe or self.n_probe, self._score)
+        candidates = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+        scores = self._score(query, self.vectors[candidates])
+        best = relatedness.top_k(scores, k)
+        return self.ids[candidates[best]], scores[best]
+
+    def nearest(self, query: np.ndarray, k=10, n_probe: int = None) -> list:
+        """
+        Same as `search`, but returns the items the index was built with.
+        """
+        if self.items is None:
+            raise ValueError("Index was built without items, use search instead!")
+        return [self.items[i] for i in self.search(query, k, n_probe)[0]]
+
+    def save(self, path: str):
+        """
+        Saves the index (without items) to a given path.
+        """
+        np.savez(path, centroids=self.centroids, vectors=self.vectors, ids=self.ids, offsets=self.offsets,
+                 scoring_function=self.scoring_function, n_probe=self.n_probe)
+
+    @classmethod
+    def load(cls, path: str, items: Sequence = None) -> "IVFIndex":
+        """
+        Loads an index saved with `save`.
+
+        :param path: Path the index was saved to.
+        :param items: Objects the vectors belong to, in the order the index was built with.
+        :return: The loaded index.
+        """
+        with np.load(path) as saved:
+            index = cls(n_probe=int(saved["n_probe"]), scoring_function=str(saved["scoring_function"]))
+            index.centroids, index.vectors, index.ids, index.offsets = (
+                saved[k] for k in ("centroids", "vectors", "ids", "offsets"))
+        index.items = items
+        return index
@@ -0,0 +1,205 @@
+from abc import ABCMeta, abstractmethod
+from itertools import chain
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+from estrella.model.basic import Link
+from estrella.operate.view import View, safe_predicate, get_predicate
+
+
+class Operation(metaclass=ABCMeta):
+    """
+    One step of a query plan, transforms a stream of members into another stream of members.
+    """
+
+    @abstractmethod
+    def apply(self, stream: Iterable) -> Iterator:
+        pass
+
+
+class Filter(Operation):
+    def __init__(self, predicates: Sequence[Callable], kwargs: dict = None):
+        self.predicates = list(predicates)
+        self.kwargs = kwargs  # kept to answer a leading filter with indexes
+
+    def apply(self, stream):
+        if len(self.predicates) == 1:
+            return filter(self.predicates[0], stream)
+        predicates = self.predicates
+        return (x for x in stream if all(p(x) for p in predicates))
+
+    def __repr__(self):
+        return "Filter({})".format(len(self.predicates))
+
+
+class Hop(Operation):
+    def __init__(self, link_name: str, constraint: Callable = None, keep=False):
+        self.link_name = link_name
+        self.constraint = safe_predicate(constraint)
+        self.keep = keep
+        self.target_filter: Filter = None  # pushed down filter, applied to every target right away
+
+    def _targets(self, stream):
+        for member in stream:
+            link = getattr(member, self.link_name, None)
+            if link:
+                try:
+                    links = iter(link)  # assuming member.link_name is list
+                except TypeError:
+                    links = [link]  # well then it's a single link
+                for l in links:
+                    if self.constraint(l):
+                        yield l.target if isinstance(l, Link) else l
+
+    def apply(self, stream):
+        if self.keep:
+            # the members are needed twice, once to pass them on and once to hop from them
+            stream = list(stream)
+            return chain(stream, self._targets(stream))
+        targets = self._targets(stream)
+        return self.target_filter.apply(targets) if self.target_filter else targets
+
+    def __repr__(self):
+        return "Hop({}{})".format(self.link_name, ", {}".format(self.target_filter) if self.target_filter else "")
+
+
+class Expand(Operation):
+    def __init__(self, predicate: Callable, source: Iterable):
+        self.predicate = safe_predicate(predicate)
+        self.source = source
+
+    def apply(self, stream):
+        return chain(stream, filter(self.predicate, self.source))
+
+    def __repr__(self):
+        return "Expand"
+
+
+class Rank(Operation):
+    def __init__(self, comparator: Callable, reverse=False):
+        self.comparator = comparator
+        self.reverse = reverse
+
+    def apply(self, stream):
+        return iter(sorted(stream, key=self.comparator, reverse=self.reverse))
+
+    def __repr__(self):
+        return "Rank"
+
+
+class ForEach(Operation):
+    def __init__(self, func: Callable):
+        self.func = func
+
+    def apply(self, stream):
+        for member in stream:
+            self.func(member)
+            yield member
+
+    def __repr__(self):
+        return "ForEach"
+
+
+class Query:
+    """
+    Lazy counterpart of `View`: operations only record a query plan, which is optimized and run as one fused
+    generator pass when the query is iterated or collected. Results are identical to the eager view operations.
+
+    Optimizations:
+
+    - adjacent filters are fused into one pass,
+    - a filter after a hop is pushed into the hop and applied to each target as it is produced,
+    - a leading filter by keyword arguments is answered with the view's indexes (if any).
+
+    Created with ``View.lazy()``. Note that functions given to ``for_each`` run while the query is iterated.
+    """
+
+    def __init__(self, view: View, operations: Sequence[Operation] = ()):
+        self.view = view
+        self.operations: List[Operation] = list(operations)
+
+    def _then(self, operation: Operation) -> "Query":
+        return Query(self.view, self.operations + [operation])
+
+    def filter(self, filter_predicate: Callable = None, **kwargs) -> "Query":
+        """
+        Lazy ``View.filter``.
+        """
+        if not filter_predicate and kwargs:
+            return self._then(Filter([get_predicate(**kwargs)], kwargs))
+        return self._then(Filter([filter_predicate or bool]))
+
+    def for_each(self, func: Callable) -> "Query":
+        """
+        Lazy ``View.for_each``.
+        """
+        return self._then(ForEach(func))
+
+    def expand(self, filter_predicate: Callable = None, source=None, **kwargs) -> "Query":
+        """
+        Lazy ``View.expand``. Draws from the initial list of the underlying view if no source is given.
+        """
+        if not filter_predicate and kwargs:
+            filter_predicate = get_predicate(**kwargs)
+        return self._then(Expand(filter_predicate, source or self.view.initial_list))
+
+    def rank(self, comparator: Callable, reverse=False) -> "Query":
+        """
+        Lazy ``View.rank``. Needs to see all members before yielding the first one.
+        """
+        return self._then(Rank(comparator, reverse))
+
+    def hop(self, link_name: str, constraint: Callable = None, keep=False) -> "Query":
+        """
+        Lazy ``View.hop``.
+        """
+        return self._then(Hop(link_name, constraint, keep))
+
+    def optimize(self) -> List[Operation]:
+        """
+        Creates the optimized query plan.
+
+        :return: Operations to run, in order.
+        """
+        plan: List[Operation] = []
+        for operation in self.operations:
+            last = plan[-1] if plan else None
+            if isinstance(operation, Filter) and isinstance(last, Filter):
+                plan[-1] = Filter(last.predicates + operation.predicates, last.kwargs)
+            elif isinstance(operation, Filter) and isinstance(last, Hop) and not last.keep:
+                hop = Hop(last.link_name, keep=False)
+                hop.constraint = last.constraint
+                hop.target_filter = Filter((last.target_filter.predicates if last.target_filter else [])
+                                           + operation.predicates)
+                plan[-1] = hop
+            else:
+                plan.append(operation)
+        return plan
+
+    def explain(self) -> str:
+        """
+        :return: Human readable optimized query plan.
+        """
+        return " -> ".join(["View"] + [repr(o) for o in self.optimize()])
+
+    def __iter__(self) -> Iterator:
+        plan = self.optimize()
+        stream = self.view
+        if plan and isinstance(plan[0], Filter) and plan[0].kwargs and self.view.indexes is not None:
+            # the first predicate of a leading keyword filter is the one built from the keywords
+            stream = self.view._filter_indexed(**plan[0].kwargs)
+            remaining = plan[0].predicates[1:]
+            plan = ([Filter(remaining)] if remaining else []) + plan[1:]
+        stream = iter(stream)
+        for operation in plan:
+            stream = operation.apply(stream)
+        return stream
+
+    def collect(self) -> View:
+        """
+        Runs the query.
+
+        :return: A new view with the results, sharing the indexes of the underlying view.
+        """
+        result = View(list(self), self.view.indexes)
+        result.initial_list = self.view.initial_list[:]
+        return result
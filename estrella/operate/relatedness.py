@@ -0,0 +1,171 @@
+from operator import attrgetter
+from typing import Sequence, Callable, Dict, List
+
+import numpy as np
+
+from estrella import util
+from estrella.enrich.latent import EmbeddingProvider
+from estrella.interfaces import Loggable, Readable
+from estrella.operate.embedding import EmbeddingComparator
+
+
+def _norms(matrix):
+    norms = np.linalg.norm(matrix, axis=-1)
+    return np.where(norms == 0, 1, norms)
+
+
+def cosine(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    return matrix.dot(query) / (_norms(matrix) * _norms(query))
+
+
+def dot(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    return matrix.dot(query)
+
+
+def euclidean(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    # negated, so that higher scores are more related for every scoring function
+    return -np.linalg.norm(matrix - query, axis=1)
+
+
+def manhattan(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    return -np.abs(matrix - query).sum(axis=1)
+
+
+scoring_functions: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    "COSINE": cosine,
+    "DOT": dot,
+    "EUCLIDEAN": euclidean,
+    "MANHATTAN": manhattan
+}
+
+
+def top_k(scores: np.ndarray, k: int = None) -> np.ndarray:
+    """
+    Returns the indices of the k highest scores, highest first.
+
+    Only the top k are sorted (after a linear time partition), so this is cheap for small k.
+
+    :param scores: Scores to rank.
+    :param k: How many to return. All if not given.
+    :return: Indices of the highest scores in descending order of their score.
+    """
+    if k is None or k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rank(query: np.ndarray, matrix: np.ndarray, k: int = None, scoring_function="COSINE") -> np.ndarray:
+    """
+    Ranks the rows of a matrix by their relatedness to a query vector, in one matrix operation.
+
+    :param query: Vector to compare to.
+    :param matrix: One row per candidate.
+    :param k: How many to return. All if not given.
+    :param scoring_function: Name of a scoring function in `scoring_functions` or a function
+        `(query, matrix) -> scores`.
+    :return: Row indices, most related first.
+    """
+    score = scoring_functions[scoring_function.upper()] if isinstance(scoring_function, str) else scoring_function
+    return top_k(score(np.asarray(query, dtype=np.float32), matrix), k)
+
+
+def embed_texts(embedding_provider: EmbeddingProvider, texts: Sequence[str]) -> np.ndarray:
+    """
+    Embeds texts as the mean of the vectors of their (whitespace separated) words, asking the provider only once.
+
+    :param embedding_provider: Provider to get the word vectors from.
+    :param texts: Texts to embed.
+    :return: Matrix with one row per text. Rows of texts without any known word are zero.
+    """
+    if getattr(embedding_provider, "embed_texts", None):
+        return embedding_provider.embed_texts(texts)
+    tokens = [text.split() for text in texts]
+    embeddings = embedding_provider.get_embeddings(set(token for t in tokens for token in t))
+    try:
+        size = len(next(e for e in embeddings.values() if e is not None))
+    except StopIteration:
+        raise ValueError("Not a single word with a known embedding!")
+    result = np.zeros((len(texts), size), dtype=np.float32)
+    for i, text in enumerate(tokens):
+        known = [embeddings[t] for t in text if embeddings.get(t, None) is not None]
+        if known:
+            result[i] = np.mean(known, axis=0)
+    return result
+
+
+class VectorComparator(EmbeddingComparator, Loggable):
+    """
+    Ranks locally, by comparing vectors in one matrix operation instead of asking a remote service for every pair.
+
+    Uses the embeddings already attached by the enrichers (e.g. `Word.embedding`, `MaybeSpan.embedding`) and only asks
+    the embedding provider for strings without an attached embedding.
+    """
+
+    def __init__(self, embedding_provider=None, scoring_function="COSINE", embedding_attr="embedding",
+                 text_attr="text"):
+        """
+        :param embedding_provider: Config or actual instance of a provider to embed plain strings. Optional if only
+            already embedded objects are compared.
+        :param scoring_function: One of `scoring_functions`.
+        :param embedding_attr: Name of the attribute holding an object's embedding.
+        :param text_attr: Name of the attribute holding the text to embed objects without an embedding by (such as
+            `Fact.text` or `MaybeSpan.text`). Objects without it are embedded by their `pprint()` if they are
+            `Readable`, by `str()` otherwise.
+        """
+        super().__init__()
+        self.embedding_provider: EmbeddingProvider = embedding_provider and util.safe_construct(
+            embedding_provider,
+            restrict_to=EmbeddingProvider,
+            relative_import="estrella.operate.embedding")
+        self.scoring_function = scoring_function
+        self.embedding_attr = embedding_attr
+        self.text_attr = text_attr
+
+    def _embedding(self, obj):
+        if isinstance(obj, np.ndarray):
+            return obj
+        return getattr(obj, self.embedding_attr, None)
+
+    def _text(self, obj) -> str:
+        if isinstance(obj, str):
+            return obj
+        text = getattr(obj, self.text_attr, None) if self.text_attr else None
+        if isinstance(text, str):
+            return text
+        return obj.pprint() if isinstance(obj, Readable) else str(obj)
+
+    def vectorize(self, objects: Sequence) -> np.ndarray:
+        """
+        Stacks the embeddings of given objects (or strings) into a matrix.
+
+        :param objects: Objects with an attached embedding or strings.
+        :return: Matrix with one row per object.
+        """
+        vectors = [self._embedding(o) for o in objects]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            if not self.embedding_provider:
+                raise ValueError("{} objects without embedding and no embedding provider given!".format(len(missing)))
+            for i, v in zip(missing, embed_texts(self.embedding_provider, [self._text(objects[i]) for i in missing])):
+                vectors[i] = v
+        return np.asarray(vectors, dtype=np.float32)
+
+    def sort_by_relatedness(self, compare_with, comparables: Sequence, attr: str = None, k: int = None) -> List:
+        """
+        Sorts a list of objects by their relatedness to a given string or embedded object.
+
+        :param compare_with: String, vector or object with an attached embedding to compare to.
+        :param comparables: List of objects to sort.
+        :param attr: Name of the attribute to compare by. If not given, the objects themselves are compared.
+        :param k: Return only the k most related objects.
+        :return: (The k most related) objects, most related first.
+        """
+        if not len(comparables):
+            return []
+        get = attrgetter(attr) if attr else lambda x: x
+        query = self.vectorize([compare_with])[0]
+        matrix = self.vectorize([get(c) for c in comparables])
+        return [comparables[i] for i in rank(query, matrix, k, self.scoring_function)]
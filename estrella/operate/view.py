@@ -4,6 +4,7 @@ from typing import TypeVar, List, Callable, Type, Iterable
 
 from estrella.model.basic import Link
 from estrella.interfaces import Loggable, Viewable
+from estrella.operate.index import IndexRegistry
 
 
 def safe_predicate(func):
@@ -22,10 +23,15 @@ U = TypeVar("U", bound=Viewable)
 
 
 class View(List[U], Loggable):
-    def __init__(self, initial_list: List[U]):
+    def __init__(self, initial_list: List[U], indexes: IndexRegistry = None):
+        """
+        :param initial_list: Members of the view.
+        :param indexes: Attribute indexes to answer ``filter`` with, shared by all views derived from this one.
+        """
         super().__init__(initial_list)
         Loggable.__init__(self)
         self.initial_list = initial_list[:]
+        self.indexes = indexes
         self._view_type: Viewable = None
 
     @property
@@ -55,16 +61,44 @@ class View(List[U], Loggable):
             Objects for which this function returns false are removed from the view.
 
         :param kwargs: If no filter_predicate is provided, predicates are constructed from keyword args.
+            If the view has indexes, predicates on indexed attributes are answered by the indexes instead.
 
         :return: Returns the filtered list.
         """
-        if not filter_predicate and kwargs:
-            filter_predicate = get_predicate(**kwargs)
-        filtered = [x for x in filter(filter_predicate, self)]
+        if not filter_predicate and kwargs and self.indexes is not None:
+            filtered = self._filter_indexed(**kwargs)
+        else:
+            if not filter_predicate and kwargs:
+                filter_predicate = get_predicate(**kwargs)
+            filtered = [x for x in filter(filter_predicate, self)]
         self.clear()
         self.extend(filtered)
         return self
 
+    def _filter_indexed(self, **kwargs):
+        indexed, scanned = self.indexes.plan(**kwargs)
+        candidates = self
+        if indexed:
+            candidates, unsure = self.indexes.select(self, **indexed)
+            if unsure:
+                check = get_predicate(**indexed)
+                candidates = [c for c in candidates if id(c) not in unsure or check(c)]
+        if scanned:
+            candidates = list(filter(get_predicate(**scanned), candidates))
+        return candidates
+
+    def lazy(self):
+        """
+        Starts a lazy query over this view. Operations on the query mirror the view operations, but are only
+        recorded and run as one fused pass when the query is iterated or collected, without changing this view.
+
+        Example: ``view.lazy().filter(type=FactLabel.VerbBased).hop("links").collect()``
+
+        :return: Query over this view, see ``estrella.operate.query.Query``.
+        """
+        from estrella.operate.query import Query
+        return Query(self)
+
     def for_each(self, func: Callable):
         """
         Executes a given function on every member of the view.
@@ -152,6 +186,108 @@ class View(List[U], Loggable):
         self._view_type = None
         return self
 
+    def traverse(self, graph, labels=None, depth=1, inverse=False, simple=True, distinct=False, keep=False):
+        """
+        Array based counterpart of ``hop(link_name="links")`` over a precomputed ``FactGraph``.
+
+        Example: ``v.traverse(graph, labels=[ContextLabel.Cause])`` replaces the members with the causes of the facts
+        in the view. Members that are not part of the graph are dropped.
+
+        :param graph: Graph over (at least) the facts in this view, e.g. ``Estrella.graph``.
+
+        :param labels: Only follow links with one of these labels.
+
+        :param depth: Number of hops.
+
+        :param inverse: Whether to follow links backwards (e.g. from a cause to the facts it causes).
+
+        :param simple: Whether to include simple contexts (which are not facts).
+
+        :param distinct: If False, the members reached after exactly ``depth`` hops are returned, like repeated
+            calls of ``hop``. If True, every member reachable within ``depth`` hops is returned once.
+
+        :param keep: Whether to keep the current members.
+
+        :return: The view with the members reached.
+        """
+        ids = graph.ids(self)
+        if distinct:
+            ids = graph.traverse(ids, depth, labels, inverse, simple)
+        else:
+            for _ in range(depth):
+                ids = graph.hop(ids, labels, inverse, simple)
+        if not keep:
+            self.clear()
+        self.extend(graph.objects(ids))
+        self._view_type = None
+        return self
+
+    def build_index(self, **kwargs):
+        """
+        Builds an approximate nearest neighbour index over the embeddings of the members of this view
+        (e.g. ``Fact.embedding`` or ``MaybeSpan.embedding``, as attached by the enrichers).
+
+        The index can be saved and loaded again (see ``IVFIndex``) and handed to ``nearest``.
+
+        :param kwargs: Keyword arguments handed to ``IVFIndex``.
+
+        :return: The index, its items are the current members of the view.
+        """
+        from estrella.operate.nearest import IVFIndex
+        from estrella.operate.relatedness import VectorComparator
+        return IVFIndex(**kwargs).build(VectorComparator().vectorize(self), items=self[:])
+
+    def nearest(self, query, k=10, index=None, embedding_provider=None, n_probe=None):
+        """
+        Keeps the k members most related to a given query, most related first.
+
+        Searches an approximate nearest neighbour index, so scoring grows sublinearly with the size of the view. If
+        no index is given and the view has indexes (such as the views of an `Estrella` instance), one is built over
+        the current members on first use and kept with the indexes of this collection of members, so further queries
+        over the same members (e.g. on copies of the view) reuse it. Finding the kept index still takes one pass over
+        the identities of the members (see `IndexRegistry.collection`), which is linear in the size of the view but
+        much cheaper than scoring its members. Views without indexes build a new index for every call. Use
+        ``build_index`` and hand the index over to avoid both when querying the same members repeatedly.
+
+        :param query: Vector, object with an embedding or (if an embedding provider is given) string.
+
+        :param k: Number of members to keep.
+
+        :param index: Index built with ``build_index`` to search in.
+
+        :param embedding_provider: Provider to embed a string query with.
+
+        :param n_probe: Overrides how many clusters of the index are searched.
+
+        :return: The view with the k members nearest to the query.
+        """
+        from estrella.operate.relatedness import VectorComparator
+        if index is None and self.indexes is not None:
+            collection = self.indexes.collection(self)
+            if collection.nearest is None:
+                collection.nearest = self.build_index()
+            index = collection.nearest
+        elif index is None:
+            index = self.build_index()
+        query = VectorComparator(embedding_provider=embedding_provider).vectorize([query])[0]
+        result = index.nearest(query, k, n_probe)
+        self.clear()
+        self.extend(result)
+        return self
+
+    def numerify_batch(self, out_dir: str = None):
+        """
+        Batched counterpart of ``[f.numerify() for f in view]`` for a view of facts: turns all members into arrays at
+        once, see ``estrella.operate.batch.numerify_facts``.
+
+        :param out_dir: If given, the arrays are written to memory-mapped ``.npy`` files in this directory.
+
+        :return: Arrays by name: ids, types, context levels, subject/predicate/object embedding matrices and the
+            simple and fact links as ragged arrays with offsets.
+        """
+        from estrella.operate.batch import numerify_facts
+        return numerify_facts(self, out_dir)
+
     def copy(self):
         """
         Copys the view.
@@ -159,7 +295,7 @@ class View(List[U], Loggable):
         Useful, since the operations on the view are stateful (yet to debate whether it makes sense).
         :return: Copy of the view.
         """
-        return View(self[:])
+        return View(self[:], self.indexes)
 
     def serialize(self, serialize_with=None, **kwargs) -> str:
         """
@@ -180,7 +316,7 @@ class View(List[U], Loggable):
         return "View<{}>".format(self.view_type.__name__) + super().__repr__()
 
 
-def create_from(from_what, view_type: Type[Viewable]) -> View:
+def create_from(from_what, view_type: Type[Viewable], indexes: IndexRegistry = None) -> View:
     """
     Creates a view from a given instance.
 
@@ -188,13 +324,15 @@ def create_from(from_what, view_type: Type[Viewable]) -> View:
 
     :param view_type: Expected type of the view to be created.
 
+    :param indexes: Attribute indexes shared by the created view and all views derived from it.
+
     :return: The view of a given view type.
     """
     if isinstance(from_what, Iterable) and not isinstance(from_what, str):
-        return View([x for fw in from_what for x in create_from(fw, view_type)])
+        return View([x for fw in from_what for x in create_from(fw, view_type)], indexes)
     fm = view_type.get_factory_method(from_what)
     if fm:
-        return View(fm(from_what))
+        return View(fm(from_what), indexes)
     else:
         raise ValueError("Don't know how to create view {} from {}!".format(view_type.__name__, type(from_what)))
 
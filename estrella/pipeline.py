@@ -1,15 +1,20 @@
 import logging
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
 from enum import Enum, auto
-from typing import List, Tuple, Type
+from functools import partial
+from typing import Any, List, Tuple, Type, Dict, Iterator, Iterable, Union
 
 import estrella.interfaces
 from estrella.enrich import Enricher
 from estrella.exceptions.pipeline import PipelineException
+from estrella.executors import Executor, SerialExecutor, ThreadExecutor
 from estrella.input.format import FormatReader
-from estrella.input.source import SourceReader
+from estrella.input.source import SourceReader, WatchableReader
 import inspect
-from estrella import util
+import json
+from estrella import metrics, util
+from estrella.store import DocumentStore
 
 
 class Sources(Enum):
@@ -38,6 +43,106 @@ def from_classes(source_reader_cls, format_reader_cls, enricher_classes):
     pipeline.enricher_classes = [(c, {}) for c in enricher_classes]
 
 
+def plan_enrichers(enrichers: List[Enricher], available: Iterable[str] = ()) -> List[List[Enricher]]:
+    """
+    Orders enrichers into waves by the document attributes they read and produce (see `Enricher.reads`). Every
+    enricher comes in a later wave than the enrichers it depends on, the enrichers of one wave are independent.
+
+    An enricher depends on every enricher producing an attribute it reads and on the enrichers configured before it
+    that produce an attribute it produces as well or read an attribute it changes (so their order is kept). Enrichers
+    without declarations depend on every enricher configured before them and vice versa.
+
+    :param enrichers: Enrichers in configured order.
+    :param available: Attributes documents have before enrichment, see `FormatReader.produces`.
+    :return: Waves of enrichers, in configured order within every wave.
+    :raises PipelineException: if an enricher reads an attribute nobody produces or enrichers depend on each other
+        cyclically.
+    """
+    available = set(available)
+    declared = [e.reads is not None and e.produces is not None for e in enrichers]
+    producers = defaultdict(set)
+    for i, enricher in enumerate(enrichers):
+        for attribute in (enricher.produces or ()):
+            producers[attribute].add(i)
+    depends = [set() for _ in enrichers]
+    for i, enricher in enumerate(enrichers):
+        if not declared[i]:
+            depends[i].update(range(i))
+            continue
+        for j in range(i):
+            if not declared[j] or set(enricher.produces) & set(enrichers[j].produces):
+                depends[i].add(j)
+            elif any(producers[a] - {i} or a in available for a in set(enricher.produces) & set(enrichers[j].reads)):
+                depends[i].add(j)  # j reads the version of the attribute from before i changes it
+        for attribute in enricher.reads:
+            if attribute not in producers and attribute not in available:
+                raise PipelineException("{} reads '{}', which neither the format reader nor any enricher produces!"
+                                        .format(enricher.__class__.__name__, attribute))
+            depends[i].update(producers[attribute] - {i})
+
+    levels = [None] * len(enrichers)
+    visiting = []
+
+    def level(i):
+        if levels[i] is None:
+            if i in visiting:
+                cycle = visiting[visiting.index(i):] + [i]
+                raise PipelineException("Enrichers depend on each other cyclically: {}!".format(
+                    " -> ".join(enrichers[j].__class__.__name__ for j in cycle)))
+            visiting.append(i)
+            levels[i] = 1 + max((level(j) for j in depends[i]), default=-1)
+            visiting.pop()
+        return levels[i]
+
+    waves = [[] for _ in range(max(map(level, range(len(enrichers))), default=-1) + 1)]
+    for i, enricher in enumerate(enrichers):
+        waves[levels[i]].append(enricher)
+    return waves
+
+
+def _timed_enrich(enricher: Enricher, document):
+    start = time.perf_counter()
+    enricher.enrich(document)
+    return enricher.__class__.__name__, time.perf_counter() - start
+
+
+def enrich_document(waves: List[List[Enricher]], document, wave_executor: Executor = None):
+    """
+    Runs waves of enrichers (see `plan_enrichers`) over a single document. The waves run in order, the enrichers of a
+    wave concurrently.
+
+    Module level function so it can be shipped to worker processes.
+
+    :param waves: Waves of enrichers to run.
+    :param document: Document to enrich.
+    :param wave_executor: Executor to run the enrichers of a wave with, shared by all documents. If not given, they
+        run one after another.
+    :return: The enriched document and the time in seconds spent per enricher.
+    """
+    timings = []
+    for wave in waves:
+        if len(wave) == 1 or wave_executor is None:
+            timings.extend(_timed_enrich(enricher, document) for enricher in wave)
+        else:
+            timings.extend(wave_executor.map(partial(_timed_enrich, document=document), wave))
+    return document, timings
+
+
+def try_enrich_document(waves: List[List[Enricher]], document, wave_executor: Executor = None):
+    """
+    Same as `enrich_document`, but returns the error instead of raising it, so a failing document does not end the
+    whole run.
+
+    :return: The (possibly partially) enriched document, the time in seconds spent per enricher and a description of
+        the error, None if the document was enriched successfully.
+    """
+    try:
+        document, timings = enrich_document(waves, document, wave_executor)
+    except Exception as e:
+        return document, [], "{}: {}".format(e.__class__.__name__, e)
+    return document, timings, None
+
+
 class Pipeline(estrella.interfaces.Loggable):
     def __init__(self, source):
         super().__init__()
@@ -50,17 +155,26 @@ class Pipeline(estrella.interfaces.Loggable):
         self.source_reader: SourceReader = None
         self.format_reader: FormatReader = None
         self.enrichers: List[Enricher] = []
+        self.waves: List[List[Enricher]] = None
+        self.parallel_enrichers = True
+        self.wave_executor: Executor = ThreadExecutor(max_workers=8)
+        self.checkpoint: str = None
+        self.executor: Executor = SerialExecutor()
+        self.timings: Dict[str, float] = defaultdict(float)
 
         self._no_name_clashes = True
         self._arg_to_cls = dict()
         self._args_flat = set()
         self._args_deep = dict()
+        self._assemble_kwargs = dict()
 
         self.enricher_classes: List[Tuple[Type[Enricher], dict]] = []
         self.source_reader_cls: Type[SourceReader] = None
         self.source_reader_args = dict()
         self.format_reader_cls: Type[FormatReader] = None
         self.format_reader_args = dict()
+        self.executor_cls: Type[Executor] = SerialExecutor
+        self.executor_args = dict()
 
     def check_required_args(self, cls):
         params = inspect.signature(cls.__init__).parameters
@@ -99,6 +213,10 @@ class Pipeline(estrella.interfaces.Loggable):
                                                                              restrict_to=FormatReader,
                                                                              relative_import="estrella.input.format")
 
+            self.executor_cls, self.executor_args = self._from_cfg(self.config.get("executor", "SerialExecutor"),
+                                                                   restrict_to=Executor,
+                                                                   relative_import="estrella.executors")
+
             # same for enrichers
             for entry in self.config.enrichers:
                 cls_name, cls_args = util.get_constructor_and_args(entry)
@@ -135,16 +253,304 @@ class Pipeline(estrella.interfaces.Loggable):
                                             dict(self.format_reader_args, **cls_dicts[self.format_reader_cls]))
         for enricher_cls, enricher_kwargs in self.enricher_classes:
             self.enrichers.append(util.construct(enricher_cls, dict(enricher_kwargs, **cls_dicts[enricher_cls])))
+        self.executor = util.construct(self.executor_cls, dict(self.executor_args, **cls_dicts[self.executor_cls]))
+        if self.config is not None:
+            self.parallel_enrichers = self.config.get("parallel_enrichers", True)
+            if self.config.get("wave_executor", None) is not None:
+                # not registered with check_required_args, its arguments would clash with those of the executor
+                self.wave_executor = util.construct_from_config(self.config.wave_executor, restrict_to=Executor,
+                                                                relative_import="estrella.executors")
+            self.checkpoint = self.config.get("checkpoint", None)
+        self._assemble_kwargs = kwargs
+        self.waves = self.plan()
         self.assembled = True
 
-    def load(self, location):
+    def plan(self) -> List[List[Enricher]]:
+        """
+        Validates the dependencies between the enrichers and orders them into waves, see `plan_enrichers`.
+
+        :return: Waves of independent enrichers, or one enricher per wave if `parallel_enrichers` is off.
+        :raises PipelineException: if the dependencies cannot be satisfied.
+        """
+        waves = plan_enrichers(self.enrichers, getattr(self.format_reader, "produces", ()))
+        if not self.parallel_enrichers:
+            waves = [[enricher] for wave in waves for enricher in wave]
+        self.logger.debug("Enricher waves: {}".format(
+            " | ".join(", ".join(e.__class__.__name__ for e in wave) for wave in waves)))
+        return waves
+
+    def _timed(self, stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings[stage] += time.perf_counter() - start
+        return result
+
+    def _check_assembled(self):
         if not self.assembled:
             raise PipelineException("Cannot run a pipeline that was not assembled yet!"
                                     "Run pipeline.assemble(**kwargs)!")
-        res = self.source_reader.load(location)
-        docs = self.format_reader.read_resource(res)
-        # TODO make Parallel
-        for document in docs:
-            for enricher in self.enrichers:
-                enricher.enrich(document)
-        return docs
+
+    def _timed_iter(self, stage, iterable):
+        # accounts the time spent producing each element of a lazy stage
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                element = next(iterator)
+            except StopIteration:
+                self.timings[stage] += time.perf_counter() - start
+                return
+            self.timings[stage] += time.perf_counter() - start
+            yield element
+
+    def _resources(self, location):
+        return self._timed_iter("source_reader", self.source_reader.iterate(location))
+
+    def _read(self, loaded_resources):
+        resources = metrics.counter("source_reader.resources")
+        for resource in loaded_resources:
+            resources.inc()
+            yield from self._timed_iter("format_reader", self.format_reader.iterate_resource([resource]))
+
+    def _enrich(self, docs, lazy, safe=False):
+        # every document runs its own enricher chain in order, documents are spread over the executor
+        # if safe, yields (document, error) pairs instead of raising the first error
+        run = self.executor.stream if lazy else self.executor.map
+        documents = metrics.counter("pipeline.documents")
+        if self.waves is None:
+            self.waves = self.plan()
+        enrich = try_enrich_document if safe else enrich_document
+        wave_executor = self.wave_executor if any(len(wave) > 1 for wave in self.waves) else None
+        for result in run(partial(enrich, self.waves, wave_executor=wave_executor), docs):
+            document, timings = result[:2]
+            for stage, seconds in timings:
+                self.timings[stage] += seconds
+                metrics.histogram("enricher.seconds", enricher=stage).observe(seconds)
+            documents.inc()
+            yield (document, result[2]) if safe else document
+
+    def config_key(self) -> str:
+        """
+        Hash of everything besides the content of a resource that its enriched documents depend on: the resolved
+        configuration, the arguments given to `assemble`, and the classes and versions (see `Enricher.version`) of the
+        readers and enrichers. Settings that do not change results (executors, `parallel_enrichers`,
+        `checkpoint`) are left out.
+        """
+        config = dict(self.config.as_plain_ordered_dict()) if self.config is not None else dict()
+        for setting in ("executor", "parallel_enrichers", "wave_executor", "checkpoint"):
+            config.pop(setting, None)
+        components = [self.format_reader] + self.enrichers
+        return DocumentStore.content_key(
+            json.dumps(config, sort_keys=True, default=str),
+            repr(sorted(self._assemble_kwargs.items())),
+            *("{}.{}:{}".format(c.__class__.__module__, c.__class__.__qualname__, getattr(c, "version", 1))
+              for c in components)
+        )
+
+    def resource_key(self, resource, config_key: str = None) -> str:
+        """
+        Key of a loaded resource in a `DocumentStore`: the hash of its content and of the pipeline (see `config_key`),
+        so a resource is only taken from the store if neither it nor the pipeline changed.
+
+        :param resource: Loaded resource, such as the contents of a file.
+        :param config_key: `config_key` of the pipeline, computed if not given.
+        """
+        return DocumentStore.content_key(str(resource), config_key or self.config_key())
+
+    def _grouped(self, named_resources: Iterable[Tuple[Any, Any]], store: DocumentStore = None) \
+            -> Iterator[Tuple[Any, List]]:
+        # yields (name, enriched documents) of every resource in order, once all its documents are enriched. With a
+        # store, resources are journaled as a whole: done once all their documents are enriched, failed (and left out)
+        # if any of them failed
+        pending = deque()  # (name, key, number of documents, whether stored) of every resource read, in order
+        resources = metrics.counter("source_reader.resources")
+        config_key = None if store is None else self.config_key()
+
+        def read():
+            # runs in the consuming thread, whenever the executor asks for further documents
+            for name, resource in named_resources:
+                resources.inc()
+                key = None if store is None else self.resource_key(resource, config_key)
+                if key is not None and store.done(key):
+                    pending.append((name, key, 0, True))
+                    continue
+                docs = list(self._timed_iter("format_reader", self.format_reader.iterate_resource([resource])))
+                pending.append((name, key, len(docs), False))
+                yield from docs
+
+        def finished():
+            # yields the documents of stored and empty resources at the front
+            while pending and (pending[0][3] or not pending[0][2]):
+                name, key, _, stored = pending.popleft()
+                if stored:
+                    metrics.counter("checkpoint.skipped").inc()
+                    yield name, store.get(key)
+                else:
+                    if store is not None:
+                        store.put(key, [])
+                    yield name, []
+
+        enriched, errors = [], []
+        for result in self._enrich(read(), lazy=True, safe=store is not None):
+            yield from finished()
+            document, error = result if store is not None else (result, None)
+            enriched.append(document)
+            if error is not None:
+                errors.append(error)
+            name, key, count, _ = pending[0]
+            if len(enriched) < count:
+                continue
+            pending.popleft()
+            if errors:
+                metrics.counter("checkpoint.failed").inc()
+                self.logger.warning("Enriching a resource failed, it is retried on the next run: {}".format(errors[0]))
+                store.fail(key, errors[0])
+            else:
+                if store is not None:
+                    store.put(key, enriched)
+                yield name, enriched
+            enriched, errors = [], []
+        yield from finished()
+
+    def _record_run(self, documents: int, seconds: float, memory_before: int):
+        metrics.gauge("pipeline.documents_per_second").set(documents / seconds if seconds else None)
+        memory = metrics.peak_memory()
+        if memory is not None:
+            metrics.gauge("process.peak_memory").set(memory)
+            if documents:
+                # growth of the peak over the run, a rough upper bound of the memory a document takes
+                metrics.gauge("pipeline.memory_per_document").set((memory - memory_before) / documents)
+        metrics.publish()
+
+    def load(self, location, checkpoint: Union[str, DocumentStore] = None):
+        """
+        Runs the pipeline on a given location.
+
+        :param location: Initial resource to run the pipeline on.
+        :param checkpoint: Path or instance of a `DocumentStore`, see `stream`.
+        :return: List of enriched documents.
+        """
+        if checkpoint is not None or self.checkpoint is not None:
+            return list(self.stream(location, checkpoint))
+        self._check_assembled()
+        run_start, memory = time.perf_counter(), metrics.peak_memory()
+        res = self._timed("source_reader", self.source_reader.load, location)
+        docs = self._timed("format_reader", self.format_reader.read_resource, res)
+        start = time.perf_counter()
+        enriched = list(self._enrich(docs, lazy=False))
+        self.timings["enrichment"] += time.perf_counter() - start
+        metrics.counter("source_reader.resources").inc(len(res))
+        self._record_run(len(enriched), time.perf_counter() - run_start, memory)
+        self.logger.debug("Stage timings: {}".format(self.format_timings()))
+        return enriched
+
+    def stream(self, location, checkpoint: Union[str, DocumentStore] = None) -> Iterator:
+        """
+        Lazy version of `load`. Yields enriched documents one by one, in order, while reading and enriching
+        the following ones.
+
+        Only a bounded number of resources and documents (given by the executor's window) is held in memory at a time,
+        so a sink consuming the documents (such as a serializer or `Estrella.add_docs`) can process corpora that do not
+        fit into memory at once.
+
+        With a checkpoint (by default the `checkpoint` of the pipeline config), the enriched documents of every
+        resource are persisted to a `DocumentStore` and journaled as they are done. Resources the store already holds
+        (by `resource_key`) are not parsed and enriched again but loaded from the store, so an interrupted run picks up
+        where it stopped and a rerun over a grown or partly changed corpus only processes the new and changed
+        resources. Resources whose enrichment fails are journaled as failed and left out instead of ending the run,
+        they are retried on the next run.
+
+        :param location: Initial resource to run the pipeline on.
+        :param checkpoint: Path or instance of a `DocumentStore` to resume from and persist to.
+        :return: Generator of enriched documents.
+        """
+        self._check_assembled()
+        start, memory = time.perf_counter(), metrics.peak_memory()
+        documents = 0
+        store = self._open_store(checkpoint)
+        try:
+            if store is None:
+                enriched = self._enrich(self._read(self._resources(location)), lazy=True)
+            else:
+                groups = self._grouped(((None, resource) for resource in self._resources(location)), store)
+                enriched = (document for _, documents in groups for document in documents)
+            for document in enriched:
+                documents += 1
+                yield document
+        finally:
+            self._close_store(store, checkpoint)
+        self._record_run(documents, time.perf_counter() - start, memory)
+        self.logger.debug("Stage timings: {}".format(self.format_timings()))
+
+    def watch(self, location, checkpoint: Union[str, DocumentStore] = None, interval=1.0, polls=None) -> Iterator:
+        """
+        Watches a location for new and changed resources (see `WatchableReader.watch`) and yields their enriched
+        documents as they come in, for continuous ingestion. Only pipelines with a `WatchableReader` can watch.
+
+        With a checkpoint (see `stream`), resources stored by earlier runs are loaded instead of enriched, and the store
+        is flushed after every poll, so documents are persisted while the pipeline waits for further resources.
+
+        :param location: Location to watch, such as a folder for a `FileReader`.
+        :param checkpoint: Path or instance of a `DocumentStore`, defaults to the `checkpoint` of the pipeline config.
+        :param interval: Seconds between two polls.
+        :param polls: Number of polls after which to stop, None to watch forever.
+        :return: Generator of (name, enriched documents) pairs, one per new or changed resource. The name identifies
+            the resource across its versions (such as a file path), so the documents of a changed resource replace the
+            ones yielded for its earlier version.
+        """
+        self._check_assembled()
+        if not isinstance(self.source_reader, WatchableReader):
+            raise PipelineException("{} cannot watch locations!".format(self.source_reader.__class__.__name__))
+        store = self._open_store(checkpoint)
+        try:
+            for resources in self.source_reader.watch(location, interval, polls):
+                start, memory = time.perf_counter(), metrics.peak_memory()
+                documents = 0
+                for name, enriched in self._grouped(resources, store):
+                    documents += len(enriched)
+                    yield name, enriched
+                if store is not None:
+                    store.flush()
+                self._record_run(documents, time.perf_counter() - start, memory)
+        finally:
+            self._close_store(store, checkpoint)
+
+    def _open_store(self, checkpoint) -> DocumentStore:
+        checkpoint = self.checkpoint if checkpoint is None else checkpoint
+        return DocumentStore(checkpoint) if isinstance(checkpoint, str) else checkpoint
+
+    @staticmethod
+    def _close_store(store: DocumentStore, checkpoint):
+        # documents of finished resources are persisted also if the run is interrupted, stores opened by the pipeline
+        # are closed
+        if store is not None and store is not checkpoint:
+            store.close()
+        elif store is not None:
+            store.flush()
+
+    def close(self):
+        """
+        Shuts down the executors of the pipeline (see `Executor.shutdown`), including the process pool of the format
+        reader. They start again when the pipeline is run again.
+        """
+        self.executor.shutdown()
+        self.wave_executor.shutdown()
+        if self.format_reader is not None:
+            self.format_reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def format_timings(self) -> str:
+        """
+        Formats the accumulated per-stage timings.
+
+        Enricher timings are summed over all documents, so with a concurrent executor they can add up to more than
+        the wall time of the "enrichment" stage.
+
+        :return: Human readable per-stage timings.
+        """
+        return ", ".join("{}: {:.3f}s".format(stage, seconds) for stage, seconds in self.timings.items())
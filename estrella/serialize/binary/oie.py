@@ -0,0 +1,354 @@
+"""
+Compact binary format for enriched document collections, laid out to be memory-mapped.
+
+A collection is saved to a directory of ``.npy`` arrays plus a small ``meta.json``:
+
+- strings: every distinct string (token texts, span texts, document texts and names) once, as one utf-8 blob with
+  offsets,
+- token table: string ids, pos label codes and embedding rows of all tokens, with sentence and document offsets,
+- fact table: id, sentence, context level, type, subject/predicate/object string ids and embedding rows of all facts,
+  with document offsets,
+- link tables: simple contexts (label, text, embedding row) and fact links (label, target fact) with fact offsets,
+- embedding blocks: one matrix for the distinct word embeddings and one for the distinct span embeddings,
+- ``attributes.json``: further attributes of the documents (such as their language) that are JSON serializable or
+  enum members.
+
+Loading opens the arrays as memory maps and creates documents only when they are accessed. Words are views over the
+token table (see ``estrella.model.columnar``) and facts are created on first access of ``Document.facts``, so only
+the parts of the collection that are actually used are read from disk.
+"""
+import importlib
+import json
+import logging
+import os
+from array import array
+from collections import Sequence
+from enum import Enum
+from typing import Iterable, List, Dict, Tuple
+
+import numpy as np
+
+from estrella.interfaces import Labeled
+from estrella.model.basic import Document
+from estrella.model.columnar import StringTable, TokenStore, ColumnarDocument
+from estrella.model.embedding import EmbeddingTable
+from estrella.model.language import Lang
+from estrella.model.oie import Fact, MaybeSpan, ContextLink
+
+FORMAT_VERSION = 1
+
+_columns = {
+    # document table
+    "doc_sentences": np.int64, "doc_facts": np.int64, "doc_name": np.int64, "doc_id": np.int64, "doc_text": np.int64,
+    # token table
+    "sentence_tokens": np.int64, "token_text": np.int32, "token_normalized": np.int32, "token_pos": np.int16,
+    "token_rows": np.int64,
+    # fact table
+    "fact_id": np.int64, "fact_sentence": np.int64, "fact_level": np.int32, "fact_type": np.int16,
+    "fact_spo": np.int64, "fact_spo_rows": np.int64, "fact_simple": np.int64, "fact_links": np.int64,
+    # link tables
+    "simple_label": np.int16, "simple_text": np.int64, "simple_rows": np.int64,
+    "link_label": np.int16, "link_target": np.int64,
+}
+
+
+# document attributes saved in the tables
+_table_attributes = {"name", "id", "sentences", "facts", "store"}
+
+
+def _encode_attribute(value):
+    if isinstance(value, Enum):
+        cls = type(value)
+        return {"enum": "{}:{}".format(cls.__module__, cls.__qualname__), "name": value.name, "value": value.value,
+                "language": isinstance(value, Lang)}
+    json.dumps(value)  # raises a TypeError if not serializable
+    return {"json": value}
+
+
+def _decode_attribute(encoded):
+    if "json" in encoded:
+        return encoded["json"]
+    module, cls = encoded["enum"].split(":")
+    try:
+        return getattr(getattr(importlib.import_module(module), cls), encoded["name"])
+    except AttributeError:
+        # enums created at runtime (such as languages, see estrella.model.language) are recreated with the member,
+        # languages compare equal by name and value
+        base = Lang if encoded["language"] else Enum
+        return base(cls, [(encoded["name"], encoded["value"])])[encoded["name"]]
+
+
+def _label_name(label) -> str:
+    cls = type(label)
+    return "{}:{}:{}".format(cls.__module__, cls.__qualname__, label.name)
+
+
+def _label_from_name(name: str):
+    module, cls, member = name.split(":")
+    return getattr(getattr(importlib.import_module(module), cls), member)
+
+
+class _Writer:
+    def __init__(self):
+        self.columns: Dict[str, array] = {name: array("q") for name in _columns}
+        self.strings = StringTable()
+        self.labels = StringTable()
+        self.word_embeddings = EmbeddingTable()
+        self.span_embeddings = EmbeddingTable()
+        self._rows: Tuple[Dict, Dict] = (dict(), dict())
+        self.attributes: List[Dict] = []
+        for pointer in ("doc_sentences", "doc_facts", "sentence_tokens", "fact_simple", "fact_links"):
+            self.columns[pointer].append(0)
+
+    def string(self, string) -> int:
+        return -1 if string is None else self.strings.intern(str(string))
+
+    def label(self, label) -> int:
+        return -1 if label is None else self.labels.intern(_label_name(label))
+
+    def row(self, table: EmbeddingTable, rows: Dict, text: str, embedding) -> int:
+        # equal embeddings of equal strings are stored once
+        if embedding is None:
+            return -1
+        embedding = np.asarray(embedding, dtype=np.float32)
+        key = (text, embedding.tobytes())
+        if key not in rows:
+            rows[key] = table.append(embedding)
+        return rows[key]
+
+    def add(self, document: Document):
+        c = self.columns
+        c["doc_name"].append(self.string(document.name))
+        c["doc_id"].append(self.string(document.id))
+        c["doc_text"].append(self.string(document._text))
+        self.attributes.append(self.document_attributes(document))
+        for sentence in document.sentences:
+            for word in sentence:
+                c["token_text"].append(self.string(word.text))
+                c["token_normalized"].append(self.string(word.normalized_text))
+                c["token_pos"].append(self.label(word.pos_tag))
+                c["token_rows"].append(self.row(self.word_embeddings, self._rows[0], word.normalized_text,
+                                                word.embedding))
+            c["sentence_tokens"].append(len(c["token_text"]))
+        c["doc_sentences"].append(len(c["sentence_tokens"]) - 1)
+
+        facts: List[Fact] = getattr(document, "facts", None) or []
+        offset = len(c["fact_id"])
+        positions = {id(fact): offset + i for i, fact in enumerate(facts)}
+        for fact in facts:
+            c["fact_id"].append(fact.id)
+            c["fact_sentence"].append(-1 if fact.sentence is None else fact.sentence.index)
+            c["fact_level"].append(fact.context_level)
+            c["fact_type"].append(self.label(fact.type))
+            for span in (fact.subject, fact.predicate, fact.object):
+                c["fact_spo"].append(self.string(span.text))
+                c["fact_spo_rows"].append(self.span_row(span))
+            for link in fact.simple_links:
+                c["simple_label"].append(self.label(link.label))
+                c["simple_text"].append(self.string(link.target.text))
+                c["simple_rows"].append(self.span_row(link.target))
+            c["fact_simple"].append(len(c["simple_label"]))
+            for link in fact.fact_links:
+                c["link_label"].append(self.label(link.label))
+                # links to facts of other documents are not kept
+                c["link_target"].append(positions.get(id(link.target), -1))
+            c["fact_links"].append(len(c["link_label"]))
+        c["doc_facts"].append(len(c["fact_id"]))
+
+    @staticmethod
+    def document_attributes(document: Document) -> Dict:
+        attributes = dict()
+        for name, value in vars(document).items():
+            if name.startswith("_") or name in _table_attributes or value is None:
+                continue
+            try:
+                attributes[name] = _encode_attribute(value)
+            except TypeError:
+                logging.getLogger(__name__).debug("Not saving attribute {} of type {}.".format(name, type(value)))
+        return attributes
+
+    def span_row(self, span) -> int:
+        return self.row(self.span_embeddings, self._rows[1], span.text, span.embedding)
+
+    def write(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name, dtype in _columns.items():
+            column = np.frombuffer(self.columns[name], dtype=np.int64).astype(dtype)
+            if name in ("fact_spo", "fact_spo_rows"):
+                column = column.reshape(-1, 3)
+            np.save(os.path.join(path, name + ".npy"), column)
+        encoded = [s.encode("utf-8") for s in self.strings.strings]
+        np.save(os.path.join(path, "strings.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(os.path.join(path, "string_offsets.npy"),
+                np.concatenate([[0], np.cumsum([len(e) for e in encoded], dtype=np.int64)]))
+        self.word_embeddings.save(os.path.join(path, "word_embeddings.npy"))
+        self.span_embeddings.save(os.path.join(path, "span_embeddings.npy"))
+        with open(os.path.join(path, "attributes.json"), "w") as f:
+            json.dump(self.attributes, f)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "documents": len(self.columns["doc_name"]),
+                "labels": self.labels.strings,
+            }, f)
+
+
+def save(docs: Iterable[Document], path: str):
+    """
+    Saves documents with their words, facts, links and embeddings to a directory.
+
+    :param docs: Documents to save, e.g. ``Estrella.docs`` or a ``Pipeline.stream``.
+    :param path: Directory to save to, created if it does not exist.
+    """
+    writer = _Writer()
+    for doc in docs:
+        writer.add(doc)
+    writer.write(path)
+
+
+class MappedStrings:
+    """
+    String table read from a saved collection, decodes strings on access.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def get(self, i: int):
+        return None if i < 0 else self[i]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class MappedDocument(ColumnarDocument):
+    """
+    Document of a saved collection. Facts are created on first access.
+    """
+
+    def __init__(self, store: TokenStore, corpus: "MappedCorpus", index: int):
+        super().__init__(store)
+        self._corpus = corpus
+        self._index = index
+        self._facts = None
+
+    @property
+    def facts(self) -> List[Fact]:
+        if self._facts is None:
+            self._facts = self._corpus._create_facts(self, self._index)
+        return self._facts
+
+    @facts.setter
+    def facts(self, facts: List[Fact]):
+        self._facts = facts
+
+    def __getstate__(self):
+        # the memory maps of the corpus are not shipped along
+        state = self.__dict__.copy()
+        state["_facts"], state["_corpus"] = self.facts, None
+        return state
+
+
+class MappedCorpus(Sequence):
+    """
+    Collection saved with `save`, opened with `load`. Documents are created on first access and kept.
+    """
+
+    def __init__(self, path: str, mmap=True):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError("Unsupported format version {} in {}!".format(meta["version"], path))
+        mode = "r" if mmap else None
+        self.path = path
+        self.columns = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mode) for name in _columns}
+        self.strings = MappedStrings(np.load(os.path.join(path, "strings.npy"), mmap_mode=mode),
+                                     np.load(os.path.join(path, "string_offsets.npy"), mmap_mode=mode))
+        self.labels: List[Labeled] = [_label_from_name(name) for name in meta["labels"]]
+        self.word_embeddings = EmbeddingTable.load(os.path.join(path, "word_embeddings.npy"), mmap)
+        self.span_embeddings = EmbeddingTable.load(os.path.join(path, "span_embeddings.npy"), mmap)
+        self._docs: Dict[int, MappedDocument] = dict()
+        self.attributes: List[Dict] = []
+        if os.path.exists(os.path.join(path, "attributes.json")):
+            with open(os.path.join(path, "attributes.json")) as f:
+                self.attributes = json.load(f)
+
+    def __len__(self):
+        return len(self.columns["doc_name"])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Document index out of range!")
+        if i not in self._docs:
+            self._docs[i] = self._create_document(i)
+        return self._docs[i]
+
+    def _create_document(self, i: int) -> MappedDocument:
+        c = self.columns
+        first, last = c["doc_sentences"][i:i + 2]
+        offsets = np.asarray(c["sentence_tokens"][first:last + 1])
+        start, end = offsets[0], offsets[-1]
+        rows = c["token_rows"][start:end]
+        store = TokenStore(c["token_text"][start:end], c["token_normalized"][start:end], offsets - start,
+                           self.strings, pos=c["token_pos"][start:end],
+                           embedding_table=self.word_embeddings if len(self.word_embeddings) else None,
+                           embedding_rows=rows)
+        store.pos_labels = list(self.labels)
+        doc = MappedDocument(store, self, i)
+        doc.name, doc.id, doc._text = (self.strings.get(c[k][i]) for k in ("doc_name", "doc_id", "doc_text"))
+        if self.attributes:
+            for name, value in self.attributes[i].items():
+                setattr(doc, name, _decode_attribute(value))
+        return doc
+
+    def _span(self, text: int, row: int) -> MaybeSpan:
+        span = MaybeSpan(self.strings[text])
+        if row >= 0:
+            span.embedding = self.span_embeddings[row]
+        return span
+
+    def _create_facts(self, document: Document, i: int) -> List[Fact]:
+        c = self.columns
+        first, last = c["doc_facts"][i:i + 2]
+        facts = []
+        for f in range(first, last):
+            sentence = c["fact_sentence"][f]
+            fact_type = c["fact_type"][f]
+            fact = Fact(int(c["fact_id"][f]),
+                        document[sentence] if sentence >= 0 else None,
+                        int(c["fact_level"][f]),
+                        *(self._span(text, row) for text, row in zip(c["fact_spo"][f], c["fact_spo_rows"][f])),
+                        extraction_type=self.labels[fact_type] if fact_type >= 0 else None)
+            simple = range(c["fact_simple"][f], c["fact_simple"][f + 1])
+            fact.simple_links = [
+                ContextLink(fact, self.labels[c["simple_label"][l]], self._span(c["simple_text"][l],
+                                                                                 c["simple_rows"][l]))
+                for l in simple
+            ]
+            facts.append(fact)
+        for f, fact in zip(range(first, last), facts):
+            links = range(c["fact_links"][f], c["fact_links"][f + 1])
+            fact.fact_links = [
+                ContextLink(fact, self.labels[c["link_label"][l]], facts[c["link_target"][l] - first])
+                for l in links if c["link_target"][l] >= 0
+            ]
+        return facts
+
+
+def load(path: str, mmap=True) -> MappedCorpus:
+    """
+    Opens a collection saved with `save`.
+
+    :param path: Directory the collection was saved to.
+    :param mmap: Whether to memory-map the arrays (default) or to read them into memory.
+    :return: The collection, a sequence of documents that are created on first access.
+    """
+    return MappedCorpus(path, mmap)
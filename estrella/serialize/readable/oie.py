@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Iterable, Iterator, Callable
 
 from estrella.model.oie import FactLabel, Fact, ContextLabel
 
@@ -73,3 +73,15 @@ def hierarchic_print(facts_or_doc, as_text=True):
     facts = getattr(facts_or_doc, "facts", facts_or_doc)
     printer = HierarchicPrinter(as_text, facts)
     return printer.print()
+
+
+def print_stream(docs: Iterable, serialize_with: Callable = simple_print, **kwargs) -> Iterator[str]:
+    """
+    Serializes documents one by one as they come, e.g. from `Pipeline.stream`.
+
+    :param docs: (Lazy) iterable of documents.
+    :param serialize_with: Serializer to apply to every document.
+    :param kwargs: Keyword arguments that are supplied to the given serializer.
+    :return: Generator of serialized documents.
+    """
+    return (serialize_with(doc, **kwargs) for doc in docs)
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Dict, Callable, Iterable, Hashable, Any, List
+
+import estrella.interfaces
+from estrella import metrics
+from estrella.exceptions.service import ServiceException
+from estrella.executors import ThreadExecutor
+
+_clients: Dict[tuple, "ServiceClient"] = dict()
+_clients_lock = threading.Lock()
+
+
+def get_client(max_concurrency=8, timeout=60, retries=3, backoff=0.5) -> "ServiceClient":
+    """
+    Returns a client shared by everyone asking with the same settings, so that connections are pooled across all
+    service stubs (such as `Indra` and `GrapheneEnricher`).
+    """
+    key = (max_concurrency, timeout, retries, backoff)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = ServiceClient(*key)
+        return _clients[key]
+
+
+class ServiceClient(estrella.interfaces.Loggable):
+    """
+    Thread-safe JSON-over-HTTP client with a pooled session, a concurrency limit, timeouts and retries with exponential
+    backoff. Concurrent requests for the same payload (or the same keys, see `fetch_keyed`) are merged into one.
+
+    The coroutine variants run the blocking calls in the default executor of the running event loop, so they can be
+    awaited concurrently while still sharing the same pool and limits.
+    """
+    _retry_status = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_concurrency=8, timeout=60, retries=3, backoff=0.5):
+        """
+        :param max_concurrency: Maximal number of requests in flight (and pooled connections per host).
+        :param timeout: Timeout per request in seconds.
+        :param retries: How often to retry a request that timed out, could not connect or failed on the server side.
+        :param backoff: Seconds to wait before the first retry, doubled with every further retry.
+        """
+        super().__init__()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._setup()
+
+    def _setup(self):
+        self._session: "requests.Session" = None
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = dict()
+        self._executor: ThreadExecutor = None
+
+    @property
+    def session(self) -> "requests.Session":
+        # requests is imported on first use, it takes a while to import
+        import requests
+        from requests.adapters import HTTPAdapter
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.max_concurrency)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def post(self, url: str, payload: Dict) -> Dict:
+        """
+        Posts a given payload as JSON and returns the parsed JSON response.
+
+        :param url: URL to post to.
+        :param payload: JSON serializable payload.
+        :return: The parsed response.
+        :raises ServiceException: if the request did not succeed after all retries.
+        """
+        import requests
+        data = json.dumps(payload)
+        headers = {
+            'content-type': "application/json",
+            'Accept': "application/json"
+        }
+        metrics.counter("http.requests", url=url).inc()
+        metrics.histogram("http.request_bytes", url=url).observe(len(data))
+        for attempt in range(self.retries + 1):
+            try:
+                with self._semaphore, metrics.timer("http.seconds", url=url):
+                    response = self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+                if response.status_code not in self._retry_status:
+                    response.raise_for_status()
+                    metrics.histogram("http.response_bytes", url=url).observe(len(response.content))
+                    return response.json()
+                error = ServiceException("{} answered with status {}.".format(url, response.status_code))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            except (requests.HTTPError, ValueError) as e:
+                metrics.counter("http.failures", url=url).inc()
+                raise ServiceException("Request to {} failed: {}".format(url, e)) from e
+            if attempt < self.retries:
+                metrics.counter("http.retries", url=url).inc()
+                wait = self.backoff * 2 ** attempt
+                self.logger.warning("Request to {} failed ({}), retrying in {:.2f}s.".format(url, error, wait))
+                time.sleep(wait)
+        metrics.counter("http.failures", url=url).inc()
+        raise ServiceException("Request to {} failed after {} retries: {}".format(url, self.retries, error)) from error
+
+    def post_many(self, url: str, payloads: Iterable[Dict]) -> List[Dict]:
+        """
+        Posts several payloads concurrently, as many at a time as the concurrency limit allows.
+
+        :param url: URL to post to.
+        :param payloads: JSON serializable payloads.
+        :return: The parsed responses, in order of the payloads.
+        :raises ServiceException: if any of the requests did not succeed after all retries.
+        """
+        payloads = list(payloads)
+        if len(payloads) <= 1:
+            return [self.post(url, payload) for payload in payloads]
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadExecutor(max_workers=self.max_concurrency)
+        return list(self._executor.map(partial(self.post, url), payloads))
+
+    def post_coalesced(self, url: str, payload: Dict) -> Dict:
+        """
+        Same as `post`, but concurrent calls with an identical payload share one request.
+        """
+        key = (url, json.dumps(payload, sort_keys=True))
+        return self.fetch_keyed([key], lambda keys: {key: self.post(url, payload)})[key]
+
+    def fetch_keyed(self, keys: Iterable[Hashable], fetch: Callable[[list], Dict], namespace: Hashable = None) -> Dict:
+        """
+        Fetches values for a collection of keys, merging concurrent requests for the same keys: Keys that are already
+        requested by another thread are waited for, only the remaining keys are handed to `fetch`.
+
+        :param keys: Keys to fetch the values for.
+        :param fetch: Function fetching the values for a list of keys, returning a mapping from keys to values.
+            Keys missing from the mapping get None.
+        :param namespace: Separates keys of different requests (such as different endpoints or vector spaces).
+        :return: Mapping from every given key to its value.
+        """
+        own = dict()
+        others = dict()
+        with self._lock:
+            for key in set(keys):
+                future = self._in_flight.get((namespace, key), None)
+                if future is None:
+                    future = own[key] = Future()
+                    self._in_flight[(namespace, key)] = future
+                else:
+                    others[key] = future
+        try:
+            if own:
+                fetched = fetch(list(own.keys()))
+                for key, future in own.items():
+                    future.set_result(fetched.get(key, None))
+        except BaseException as e:
+            for future in own.values():
+                future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                for key in own:
+                    self._in_flight.pop((namespace, key), None)
+        if others:
+            self.logger.debug("Merged {} keys with requests in flight.".format(len(others)))
+        return {key: future.result() for key, future in dict(own, **others).items()}
+
+    async def apost(self, url: str, payload: Dict) -> Dict:
+        return await asyncio.get_running_loop().run_in_executor(None, self.post, url, payload)
+
+    async def afetch_keyed(self, keys: Iterable[Hashable], fetch: Callable[[list], Dict],
+                           namespace: Hashable = None) -> Dict:
+        return await asyncio.get_running_loop().run_in_executor(None, self.fetch_keyed, list(keys), fetch, namespace)
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items()
+                if k not in ("_session", "_semaphore", "_lock", "_in_flight", "_executor")}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
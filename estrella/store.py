@@ -0,0 +1,190 @@
+"""
+On-disk store of enriched documents with a journal, for runs that can be resumed.
+
+A store is a directory with
+
+- ``journal.jsonl``: one line per finished (or failed) key, later lines win,
+- ``shards/``: the documents, in shards of the binary format (see ``estrella.serialize.binary.oie``).
+
+Documents are buffered and written as a shard every `shard_size` documents. The journal only names a key as done
+after its shard is completely written, so after a crash a key is either done with all its documents or not at all.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from estrella.interfaces import Loggable
+from estrella.model.basic import Document
+
+
+class DocumentStore(Loggable):
+    def __init__(self, path: str, shard_size=100):
+        """
+        :param path: Directory of the store, created if it does not exist.
+        :param shard_size: Number of documents per shard. Smaller shards lose less work on a crash but make for more
+            files.
+        """
+        super().__init__()
+        self.path = path
+        self.shard_size = shard_size
+        self._entries: Dict[str, Dict] = dict()  # latest journal entry of every key
+        self._buffer: List[Tuple[str, List[Document]]] = []
+        self._buffered = 0
+        self._shards = dict()
+        self._lock = threading.RLock()
+        os.makedirs(self.shard_path, exist_ok=True)
+        for name in os.listdir(self.shard_path):
+            if name.startswith("."):  # shard left incomplete by a crash
+                shutil.rmtree(os.path.join(self.shard_path, name))
+        self._read_journal()
+        self._journal = open(self.journal_path, "a")
+
+    @property
+    def shard_path(self) -> str:
+        return os.path.join(self.path, "shards")
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.path, "journal.jsonl")
+
+    @staticmethod
+    def content_key(*parts: str) -> str:
+        """
+        :return: Hash of the given strings, e.g. of the content of a resource.
+        """
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        complete = 0  # bytes up to the end of the last complete line
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                complete += len(line)
+                try:
+                    entry = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    self.logger.warning("Skipping invalid journal line in {}.".format(self.journal_path))
+                    continue
+                self._entries[entry["key"]] = entry
+        if complete < os.path.getsize(self.journal_path):
+            # a line cut off by a crash, later entries must not be appended to it
+            self.logger.warning("Dropping incomplete last journal line in {}.".format(self.journal_path))
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(complete)
+
+    def _write_journal(self, entries: List[Dict]):
+        for entry in entries:
+            self._journal.write(json.dumps(entry) + "\n")
+            self._entries[entry["key"]] = entry
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def status(self, key: str) -> Optional[str]:
+        """
+        :return: "done" or "failed" if the key was journaled, None otherwise.
+        """
+        entry = self._entries.get(key)
+        return entry["status"] if entry else None
+
+    def done(self, key: str) -> bool:
+        return self.status(key) == "done"
+
+    def __contains__(self, key: str) -> bool:
+        return self.done(key)
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._entries.values() if entry["status"] == "done")
+
+    def keys(self) -> List[str]:
+        """
+        :return: All keys that are done, in the order they were finished.
+        """
+        return [key for key, entry in self._entries.items() if entry["status"] == "done"]
+
+    def put(self, key: str, documents: List[Document]):
+        """
+        Adds the documents of a key, e.g. the enriched documents of a resource. They are written with the next shard.
+        """
+        with self._lock:
+            self._buffer.append((key, list(documents)))
+            self._buffered += len(documents)
+            if self._buffered >= self.shard_size:
+                self.flush()
+
+    def fail(self, key: str, error: str):
+        """
+        Journals that the documents of a key could not be enriched, so they are retried on the next run.
+        """
+        with self._lock:
+            self._write_journal([{"key": key, "status": "failed", "error": error, "time": time.time()}])
+
+    def flush(self):
+        """
+        Writes the buffered documents as a shard and journals their keys as done.
+        """
+        from estrella.serialize.binary import oie as binary
+        with self._lock:
+            if not self._buffer:
+                return
+            name = None
+            if self._buffered:
+                name = "shard-{:06d}".format(len(os.listdir(self.shard_path)))
+                tmp = os.path.join(self.shard_path, "." + name)
+                binary.save((doc for _, docs in self._buffer for doc in docs), tmp)
+                os.rename(tmp, os.path.join(self.shard_path, name))
+            entries, start = [], 0
+            for key, docs in self._buffer:
+                entries.append({"key": key, "status": "done", "shard": name if docs else None, "start": start,
+                                "count": len(docs), "time": time.time()})
+                start += len(docs)
+            self._write_journal(entries)
+            self.logger.debug("Stored {} documents of {} keys.".format(self._buffered, len(self._buffer)))
+            self._buffer, self._buffered = [], 0
+
+    def _shard(self, name: str):
+        from estrella.serialize.binary import oie as binary
+        with self._lock:
+            if name not in self._shards:
+                self._shards[name] = binary.load(os.path.join(self.shard_path, name))
+            return self._shards[name]
+
+    def get(self, key: str) -> List[Document]:
+        """
+        :return: The documents stored for a key, memory-mapped from their shard.
+        :raises KeyError: if the key is not done.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry["status"] != "done":
+            raise KeyError(key)
+        if not entry["count"]:
+            return []
+        return self._shard(entry["shard"])[entry["start"]:entry["start"] + entry["count"]]
+
+    def documents(self) -> Iterator[Document]:
+        """
+        :return: All stored documents, in the order their keys were finished.
+        """
+        for key in self.keys():
+            yield from self.get(key)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,16 +1,31 @@
+import copy
+import importlib
 import json
 import logging
 import logging.config
+import sys
+from functools import lru_cache
 from logging.handlers import RotatingFileHandler
 import os
 from collections import Iterable, Mapping
-from typing import List, Union
-
-from pyhocon import ConfigFactory, ConfigTree
+from typing import List, Union, TYPE_CHECKING
 
 from estrella.exceptions.config import MalformattedConfigException
 from estrella.interfaces import Readable
 
+if TYPE_CHECKING:
+    from pyhocon import ConfigTree
+
+# pyhocon (and its parser) is only imported once a config is actually read, to keep imports fast
+
+
+def is_config(obj) -> bool:
+    """
+    Whether the given object is a parsed config. Does not import pyhocon if no config has been read yet.
+    """
+    pyhocon = sys.modules.get("pyhocon", None)
+    return pyhocon is not None and isinstance(obj, pyhocon.ConfigTree)
+
 
 def setup_logging(path=''):
     """
@@ -48,13 +63,22 @@ class FQNFilter(logging.Filter):
         return record
 
 
-def read_config(path="", default="default.conf"):
-    if path is None:
-        path = ""
-    from pkg_resources import resource_string
-    default = resource_string(__name__, '/resources/{}'.format(default))
-    # default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", default)
-    default = default.decode("utf-8")
+def _resource_path(name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", name)
+
+
+def _modification_time(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=32)
+def _parse_config(path: str, default: str, *modification_times):
+    from pyhocon import ConfigFactory
+    with open(_resource_path(default), "r") as f:
+        default = f.read()
     try:
         with open(path, "r") as f:
             cfg_str = f.read()
@@ -67,18 +91,46 @@ def read_config(path="", default="default.conf"):
     return ConfigFactory.parse_string(cfg_str)
 
 
-def load_class(class_string: str, restrict_to: Union[type, List[type]] = None, relative_import: str = ""):
+def read_config(path="", default="default.conf"):
+    """
+    Reads a config file on top of a packaged default config.
+
+    Parsed configs are cached (until either file changes), every call returns a copy that can be changed freely.
+
+    :param path: Path of the config file.
+    :param default: Name of the packaged default config.
+    :return: The parsed config.
+    """
+    if path is None:
+        path = ""
+    cfg = _parse_config(path, default, _modification_time(path), _modification_time(_resource_path(default)))
+    return copy.deepcopy(cfg)
+
+
+@lru_cache(maxsize=None)
+def _resolve_class(class_string: str, relative_import: str):
     try:
         module_name, cls_name = class_string.rsplit(".", 1)
     except ValueError:
         cls_name = class_string
         module_name = ""
     try:
-        x = ".".join((relative_import, module_name)).rstrip(".")
-        mod = __import__(x, fromlist=cls_name)
+        mod = importlib.import_module(".".join((relative_import, module_name)).strip("."))
     except ModuleNotFoundError:
-        mod = __import__(module_name, fromlist=cls_name)
-    cls = getattr(mod, cls_name)
+        mod = importlib.import_module(module_name)
+    return getattr(mod, cls_name)
+
+
+def load_class(class_string: str, restrict_to: Union[type, List[type]] = None, relative_import: str = ""):
+    """
+    Loads a class by name, first relative to a given package, then absolute. Resolved names are cached.
+
+    :param class_string: (Dotted) name of the class.
+    :param restrict_to: Class must be a subclass of this class (or one of these classes).
+    :param relative_import: Package to look for the class in first.
+    :return: The class.
+    """
+    cls = _resolve_class(class_string, relative_import)
 
     if restrict_to:
         check_subclass(cls, restrict_to)
@@ -92,12 +144,12 @@ def get_all_subclasses(cls):
 def check_subclass(cls, restrict_to):
     if not isinstance(restrict_to, Iterable):
         restrict_to = [restrict_to]
-    if not any(cls == target_cls or cls in get_all_subclasses(target_cls) for target_cls in restrict_to):
+    if not (isinstance(cls, type) and issubclass(cls, tuple(restrict_to))):
         raise ValueError("{} is not subclass of any of {}".format(cls, restrict_to))
 
 
 def get_constructor_and_args(config):
-    if not isinstance(config, ConfigTree):
+    if not is_config(config):
         return config, dict()
 
     if len(config) != 2:
@@ -110,14 +162,15 @@ def safe_construct(config_or_instance,
                    restrict_to: Union[type, List[type]] = None,
                    relative_import: str = "",
                    perform_subclass_check=True):
-    if isinstance(config_or_instance, ConfigTree):
+    if is_config(config_or_instance):
         return construct_from_config(config_or_instance, restrict_to, relative_import)
     if perform_subclass_check:
         check_subclass(config_or_instance.__class__, restrict_to)
     return config_or_instance
 
 
-def construct_from_config(config: ConfigTree, restrict_to: Union[type, List[type]] = None, relative_import: str = ""):
+def construct_from_config(config: "ConfigTree", restrict_to: Union[type, List[type]] = None,
+                          relative_import: str = ""):
     """
     Helper function to combine load_class and construct.
 
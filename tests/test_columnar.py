@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+from nose import tools as nt
+
+from estrella.enrich.latent import EmbeddingEnricher
+from estrella.input.format.raw_text import RawTextReader
+from estrella.input.normalizers import DefaultNormalizer
+from estrella.model.columnar import ColumnarDocument, StringTable
+from estrella.model.oie import Fact
+from tests import testutil
+from tests.test_embedding import CountingProvider
+
+cfg = testutil.setup_config_and_logging()
+
+
+class TestColumnarDocument:
+    def setup_method(self):
+        self.doc = RawTextReader(normalizer=DefaultNormalizer(), columnar=True).read_resource(testutil.example)[0]
+        self.plain = RawTextReader(normalizer=DefaultNormalizer()).read_resource(testutil.example)[0]
+
+    def test_successful_same_as_plain(self):
+        nt.assert_is_instance(self.doc, ColumnarDocument)
+        nt.assert_equal(self.doc.pprint(), self.plain.pprint())
+        nt.assert_equal(len(self.doc), len(self.plain))
+        nt.assert_equal([(w.index, w.text, w.normalized_text) for w in self.doc.words],
+                        [(w.index, w.text, w.normalized_text) for w in self.plain.words])
+        nt.assert_equal(repr(self.doc[0][0]), repr(self.plain[0][0]))
+
+    def test_successful_words_are_views(self):
+        nt.assert_is(self.doc.words[3], self.doc[0][3])
+        nt.assert_false(hasattr(self.doc.words[0], "__dict__"))
+        # repeated tokens are stored once
+        nt.assert_less(len(self.doc.store.strings), 2 * len(self.doc.words))
+
+    def test_successful_embeddings_shared_by_equal_words(self):
+        EmbeddingEnricher(CountingProvider()).enrich(self.doc)
+        matrix = self.doc.numerify()
+        nt.assert_equal(matrix.shape, (len(self.doc.words), 2))
+        nt.assert_equal(list(self.doc.words[0].embedding), [float(len("fedex")), 1.0])
+        commas = [w for w in self.doc.words if w.text == ","]
+        nt.assert_equal(len(set(self.doc.store.embedding_rows[w._position] for w in commas)), 1)
+        nt.assert_equal(len(self.doc.store.embedding_table), len(set(w.normalized_text for w in self.doc.words)))
+        # setting a single embedding does not change the other words
+        commas[0].embedding = np.array([0, 0])
+        nt.assert_equal(list(commas[0].embedding), [0, 0])
+        nt.assert_equal(list(commas[1].embedding), [1.0, 1.0])
+
+    def test_successful_pickle(self):
+        EmbeddingEnricher(CountingProvider()).enrich(self.doc)
+        copy = pickle.loads(pickle.dumps(self.doc))
+        nt.assert_equal(copy.pprint(), self.doc.pprint())
+        nt.assert_equal(list(copy.words[-1].embedding), list(self.doc.words[-1].embedding))
+
+    def test_successful_facts(self):
+        doc = testutil.fake_extract_graphene(1, columnar=True)
+        nt.assert_true(doc.facts)
+        nt.assert_true(all(isinstance(f, Fact) for f in doc.facts))
+
+
+class TestStringTable:
+    def test_successful_intern(self):
+        table = StringTable(["a", "b"])
+        nt.assert_equal(table.intern("a"), 0)
+        nt.assert_equal(table.intern("c"), 2)
+        nt.assert_equal(table[1], "b")
+        nt.assert_equal(len(table), 3)
@@ -0,0 +1,306 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+import numpy as np
+from nose import tools as nt
+
+from estrella.enrich.latent import EmbeddingProvider, FactEmbeddingEnricher, EmbeddingEnricher
+from estrella.exceptions.service import ServiceException
+from estrella.model.embedding import EmbeddingTable
+from estrella.operate import local, relatedness
+from estrella.operate.batching import BatchingEmbeddingProvider
+from estrella.operate.cache import CachingEmbeddingProvider
+from estrella.operate.local import LocalEmbeddings
+from estrella.operate.relatedness import VectorComparator
+from tests import testutil
+
+cfg = testutil.setup_config_and_logging()
+
+
+class CountingProvider(EmbeddingProvider):
+    def __init__(self):
+        self.requested = []
+
+    def get_embeddings(self, strings):
+        strings = list(strings)
+        self.requested.extend(strings)
+        return {s: None if s == "unknown" else [float(len(s)), 1.0] for s in strings}
+
+
+class TestCachingEmbeddingProvider:
+    def test_successful_only_misses_requested(self):
+        backend = CountingProvider()
+        cache = CachingEmbeddingProvider(backend)
+        cache.get_embeddings(["a", "bb", "unknown"])
+        result = cache.get_embeddings(["a", "bb", "ccc", "unknown"])
+        nt.assert_equal(sorted(backend.requested), ["a", "bb", "ccc", "unknown"])
+        nt.assert_is_none(result["unknown"])
+        nt.assert_equal(list(result["ccc"]), [3.0, 1.0])
+        nt.assert_equal(cache.hits, 3)
+        nt.assert_equal(cache.misses, 4)
+
+    def test_successful_persistent_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "embeddings.sqlite")
+            first = CachingEmbeddingProvider(CountingProvider(), path=path, namespace="test")
+            first.get_embeddings(["a", "bb", "unknown"])
+            first.close()
+            backend = CountingProvider()
+            second = CachingEmbeddingProvider(backend, path=path, namespace="test", lru_size=1)
+            result = second.get_embeddings(["a", "bb", "unknown"])
+            nt.assert_equal(backend.requested, [])
+            nt.assert_equal(second.persistent_hits, 3)
+            nt.assert_equal(list(result["bb"]), [2.0, 1.0])
+            nt.assert_is_none(result["unknown"])
+            second.close()
+
+    def test_successful_separate_vector_spaces(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "embeddings.sqlite")
+            for i in range(2):
+                write_vectors(os.path.join(tmp, "{}.txt".format(i)))
+            first = CachingEmbeddingProvider(LocalEmbeddings(os.path.join(tmp, "0.txt")), path=path)
+            second = CachingEmbeddingProvider(LocalEmbeddings(os.path.join(tmp, "1.txt")), path=path)
+            nt.assert_not_equal(first.namespace, second.namespace)
+            first.get_embeddings(["the", "road"])
+            second.get_embeddings(["the", "road"])
+            nt.assert_equal(second.persistent_hits, 0)
+            first.close()
+            second.close()
+            again = CachingEmbeddingProvider(LocalEmbeddings(os.path.join(tmp, "0.txt")), path=path)
+            again.get_embeddings(["the", "road"])
+            nt.assert_equal(again.persistent_hits, 2)
+            again.close()
+
+
+def write_vectors(path, binary=False):
+    vectors = {"the": [1.0, 0.0], "chicken": [0.0, 1.0], "road": [0.6, 0.8], "straße": [0.5, 0.5]}
+    if binary:
+        with open(path, "wb") as f:
+            f.write("{} 2\n".format(len(vectors)).encode())
+            for word, vector in vectors.items():
+                f.write(word.encode("utf-8") + b" " + np.array(vector, dtype=np.float32).tobytes() + b"\n")
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines("{} {}\n".format(word, " ".join(str(x) for x in vector)) for word, vector in vectors.items())
+    return vectors
+
+
+class TestLocalEmbeddings:
+    def test_successful_glove_lookup(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "glove.txt")
+            vectors = write_vectors(path)
+            embeddings = LocalEmbeddings(path).get_embeddings(["chicken", "straße", "unknown"])
+            nt.assert_equal(list(embeddings["chicken"]), vectors["chicken"])
+            nt.assert_equal(list(embeddings["straße"]), vectors["straße"])
+            nt.assert_is_none(embeddings["unknown"])
+            # converted files are reused
+            nt.assert_true(os.path.exists(path + ".vectors.npy"))
+            nt.assert_equal(list(LocalEmbeddings(path).get_embeddings(["road"])["road"]), vectors["road"])
+
+    def test_successful_concurrent_first_use(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "glove.txt")
+            vectors = write_vectors(path)
+            embeddings = LocalEmbeddings(path)
+            conversions = []
+            convert = local.convert
+
+            def slow_convert(*args):
+                conversions.append(args)
+                time.sleep(0.1)
+                convert(*args)
+            local.convert = slow_convert
+            try:
+                results = []
+                threads = [threading.Thread(target=lambda: results.append(embeddings.get_embeddings(["road"])))
+                           for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                local.convert = convert
+            nt.assert_equal(len(conversions), 1)
+            nt.assert_true(all(list(result["road"]) == vectors["road"] for result in results))
+            nt.assert_equal(len(results), 4)
+            nt.assert_false([name for name in os.listdir(tmp) if ".tmp" in name])
+
+    def test_successful_binary_lookup(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "w2v.bin")
+            vectors = write_vectors(path, binary=True)
+            embeddings = LocalEmbeddings(path, binary=True).get_embeddings(vectors.keys())
+            for word, vector in vectors.items():
+                nt.assert_true(np.allclose(embeddings[word], vector))
+
+    def test_successful_sort_by_relatedness(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "glove.txt")
+            write_vectors(path)
+            result = LocalEmbeddings(path).sort_by_relatedness("chicken", ["the", "road", "the chicken", "chicken"])
+            nt.assert_equal(result, ["chicken", "road", "the chicken", "the"])
+
+
+class TestVectorComparator:
+    def test_successful_top_k(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+        nt.assert_equal(list(relatedness.top_k(scores, 3)), [1, 3, 2])
+        nt.assert_equal(list(relatedness.top_k(scores)), [1, 3, 2, 4, 0])
+
+    def test_successful_sort_attached_embeddings(self):
+        doc = testutil.fake_extract_graphene(1)
+        FactEmbeddingEnricher(embedding_provider=CountingProvider()).enrich(doc)
+        comparator = VectorComparator(scoring_function="EUCLIDEAN")
+        query = doc.facts[0].subject
+        result = comparator.sort_by_relatedness(query, doc.facts, attr="subject", k=3)
+        nt.assert_equal(len(result), 3)
+        nt.assert_equal(result[0].subject.text, query.text)
+
+    def test_successful_embed_text_of_objects(self):
+        doc = testutil.fake_extract_graphene(1)
+        provider = CountingProvider()
+        VectorComparator(embedding_provider=provider).vectorize([doc.facts[0], doc.facts[0].object])
+        nt.assert_equal(set(provider.requested), set(doc.facts[0].text.split()) | set(doc.facts[0].object.text.split()))
+
+    def test_successful_sort_strings(self):
+        comparator = VectorComparator(embedding_provider=CountingProvider())
+        result = comparator.sort_by_relatedness("a", ["cccc", "bb", "a"])
+        nt.assert_equal(result, ["a", "bb", "cccc"])
+
+
+class TestEmbeddingTable:
+    def test_successful_rows_are_views(self):
+        table = EmbeddingTable(block_size=2)
+        rows = table.add({"a": [1, 2], "b": None, "c": [3, 4]}, default=[0, 0])
+        nt.assert_equal(rows, {"a": 0, "b": 1, "c": 2})
+        nt.assert_equal(table.add({"a": [5, 5]}), {"a": 0})
+        view = table[0]
+        table.append([6, 6])  # grows without moving existing rows
+        nt.assert_true(np.shares_memory(view, table.blocks[0]))
+        nt.assert_equal(table.take([2, 0, 1]).tolist(), [[3, 4], [1, 2], [0, 0]])
+        nt.assert_equal(table.matrix.shape, (4, 2))
+
+
+class TestSharedEmbeddings:
+    def test_successful_words_share_rows(self):
+        doc = testutil.fake_extract_graphene(1)
+        enricher = EmbeddingEnricher(CountingProvider(), shared=True)
+        enricher.enrich(doc)
+        commas = [w for w in doc.words if w.text == ","]
+        nt.assert_true(np.shares_memory(commas[0].embedding, commas[1].embedding))
+        nt.assert_equal(doc.numerify().shape, (len(doc.words), 2))
+        nt.assert_equal(len(enricher.table), len(set(w.normalized_text for w in doc.words)))
+        # a second document only adds words it has not seen yet
+        enricher.enrich(testutil.fake_extract_graphene(1))
+        nt.assert_equal(len(enricher.table), len(set(w.normalized_text for w in doc.words)))
+
+    def test_successful_spans_share_rows(self):
+        doc = testutil.fake_extract_graphene(1)
+        FactEmbeddingEnricher(CountingProvider()).enrich(doc)
+        spans = [s for f in doc.facts for s in (f.subject, f.object)]
+        same = [(a, b) for a in spans for b in spans if a is not b and a.text == b.text]
+        nt.assert_true(same)
+        nt.assert_true(all(np.shares_memory(a.embedding, b.embedding) for a, b in same))
+
+
+    def test_successful_rows_shared_after_pickling(self):
+        words, facts = EmbeddingEnricher(CountingProvider(), shared=True), FactEmbeddingEnricher(CountingProvider(),
+                                                                                                 shared=True)
+        words.enrich(testutil.fake_extract_graphene(0))  # rows of another document in the shared tables
+        doc = testutil.fake_extract_graphene(1)
+        words.enrich(doc)
+        facts.enrich(doc)
+        expected = doc.numerify()
+        copy = pickle.loads(pickle.dumps(doc))
+        distinct = set(w.normalized_text for w in doc.words)
+        nt.assert_equal(len(copy._embedding_table), len(distinct))
+        commas = [w for w in copy.words if w.text == ","]
+        nt.assert_true(np.shares_memory(commas[0].embedding, commas[1].embedding))
+        nt.assert_true(all(np.shares_memory(w.embedding, copy._embedding_table.blocks[0]) for w in copy.words))
+        nt.assert_equal(copy.numerify().tolist(), expected.tolist())
+        spans = [s for f in copy.facts for s in (f.subject, f.object)]
+        same = [(a, b) for a in spans for b in spans if a is not b and a.text == b.text]
+        nt.assert_true(all(np.shares_memory(a.embedding, b.embedding) for a, b in same))
+        nt.assert_equal(spans[0].embedding.tolist(), [float(len(spans[0].text)), 1.0])
+        # the shared tables are not shipped with the enrichers
+        nt.assert_is_none(pickle.loads(pickle.dumps(words)).table)
+
+    def test_successful_assigned_embedding_pickled(self):
+        doc = testutil.fake_extract_graphene(1)
+        EmbeddingEnricher(CountingProvider(), shared=True).enrich(doc)
+        doc.words[0].embedding = np.array([7.0, 7.0])
+        nt.assert_equal(pickle.loads(pickle.dumps(doc)).words[0].embedding.tolist(), [7.0, 7.0])
+
+
+class LimitedProvider(CountingProvider):
+    def __init__(self, limit, delay=0.0):
+        super().__init__()
+        self.limit = limit
+        self.delay = delay
+        self.calls = []
+
+    def get_embeddings(self, strings):
+        strings = list(strings)
+        self.calls.append(len(strings))
+        time.sleep(self.delay)
+        if len(strings) > self.limit:
+            raise ServiceException("Payload too large.")
+        return super().get_embeddings(strings)
+
+
+class TestBatchingEmbeddingProvider:
+    def test_successful_merge_concurrent_calls(self):
+        inner = LimitedProvider(limit=1000)
+        provider = BatchingEmbeddingProvider(inner, window=8, max_wait=5)
+        vocabularies = [["a", "bb", str(i)] for i in range(8)]
+        results = [None] * len(vocabularies)
+
+        def enrich(i):
+            results[i] = provider.get_embeddings(vocabularies[i])
+
+        threads = [threading.Thread(target=enrich, args=(i,)) for i in range(len(vocabularies))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        nt.assert_equal(len(inner.calls), 1)
+        nt.assert_equal(inner.calls[0], 10)
+        for vocabulary, result in zip(vocabularies, results):
+            nt.assert_equal(set(result), set(vocabulary))
+            nt.assert_equal(result["bb"], [2.0, 1.0])
+
+    def test_successful_no_wait_without_window(self):
+        provider = BatchingEmbeddingProvider(LimitedProvider(limit=1000), max_wait=5)
+        start = time.perf_counter()
+        provider.get_embeddings(["a"])
+        nt.assert_less(time.perf_counter() - start, 1)
+
+    def test_successful_split_into_batches(self):
+        inner = LimitedProvider(limit=1000)
+        provider = BatchingEmbeddingProvider(inner, batch_size=100, min_batch_size=10, max_wait=0)
+        terms = [str(i) for i in range(250)]
+        nt.assert_equal(set(provider.get_embeddings(terms)), set(terms))
+        nt.assert_equal(sorted(inner.calls), [50, 100, 100])
+        nt.assert_equal(provider.batch_size, 130)  # grew after every fast batch
+
+    def test_successful_adapt_to_payload_limit(self):
+        inner = LimitedProvider(limit=60)
+        provider = BatchingEmbeddingProvider(inner, batch_size=200, min_batch_size=10, max_wait=0)
+        terms = [str(i) for i in range(200)]
+        nt.assert_equal(set(provider.get_embeddings(terms)), set(terms))
+        nt.assert_less_equal(provider.batch_size, 60)
+        inner.calls = []
+        terms = [str(i) for i in range(200, 400)]
+        nt.assert_equal(set(provider.get_embeddings(terms)), set(terms))
+        nt.assert_true(all(calls <= 60 for calls in inner.calls))  # no more requests above the limit
+
+    def test_successful_shrink_on_slow_requests(self):
+        provider = BatchingEmbeddingProvider(LimitedProvider(limit=1000, delay=0.05), batch_size=400,
+                                             min_batch_size=50, target_latency=0.01, max_wait=0)
+        provider.get_embeddings(["a"])
+        nt.assert_equal(provider.batch_size, 200)
@@ -1,6 +1,9 @@
 import json
+import os
+import tempfile
 
 from nose import tools as nt
+from pyhocon import ConfigFactory
 
 from estrella.model.oie import Fact, ContextLabel
 from tests import testutil
@@ -9,6 +12,9 @@ from tests.testutil import setup_config_and_logging
 from estrella.enrich.latent import EmbeddingEnricher, FactEmbeddingEnricher
 from estrella.input.format.raw_text import RawTextReader
 from estrella.input.normalizers import DefaultNormalizer
+from estrella.enrich.semantic import GrapheneEnricher
+from estrella.exceptions.service import ServiceException
+from estrella.operate.cache import ExtractionCache
 
 import numpy as np
 
@@ -25,6 +31,127 @@ class TestGrapheneEnricher:
         nt.assert_equal(len(second_fact.fact_links), 0)
 
 
+class TestGrapheneCache:
+    def setup_method(self):
+        self.reader = RawTextReader(normalizer=DefaultNormalizer())
+        self.doc = self.reader.read_resource(["Alice sleeps . Bob runs . Alice sleeps . Carol reads ."])[0]
+
+    def enricher(self, cache):
+        enricher = GrapheneEnricher(cache=cache)
+        enricher.client = testutil.FakeGrapheneClient()
+        return enricher
+
+    def test_successful_only_uncached_sent(self):
+        enricher = self.enricher(ExtractionCache())
+        enricher.enrich(self.doc)
+        nt.assert_equal(enricher.client.texts, ["Alice sleeps . Bob runs . Carol reads ."])
+        nt.assert_equal(len(self.doc.facts), 8)
+        nt.assert_equal([f.sentence.index for f in self.doc.facts], [0, 0, 1, 1, 2, 2, 3, 3])
+        # the repeated sentence has facts of its own
+        for main, context in zip(self.doc.facts[::2], self.doc.facts[1::2]):
+            nt.assert_equal([l.target for l in main.fact_links], [context])
+            nt.assert_equal(main.fact_links[0].label, ContextLabel.Background)
+        nt.assert_equal(self.doc.facts[4].object.text, "Alice sleeps .")
+
+        other = self.reader.read_resource(["Carol reads . Dave writes ."])[0]
+        enricher.enrich(other)
+        nt.assert_equal(enricher.client.texts[1:], ["Dave writes ."])
+        nt.assert_equal([f.object.text for f in other.facts], ["Carol reads ."] * 2 + ["Dave writes ."] * 2)
+        nt.assert_equal(enricher.cache.hits, 1)
+
+    def test_successful_original_text_sent(self):
+        doc = self.reader.read_resource(["Alice, who sleeps .\nBob runs ."])[0]
+        nt.assert_equal(doc[0].pprint(), "Alice , who sleeps .")
+        enricher = self.enricher(ExtractionCache())
+        enricher.enrich(doc)
+        nt.assert_equal(enricher.client.texts, ["Alice, who sleeps . Bob runs ."])
+        key = enricher._key("Alice, who sleeps .", isolated=True)
+        nt.assert_equal(enricher.cache.get_many([key]).keys(), {key})
+
+    def test_successful_sentences_isolated(self):
+        enricher = self.enricher(None)
+        enricher.client.link_across = True
+        enricher.enrich(self.doc)
+        nt.assert_equal([l.target for l in self.doc.facts[2].fact_links], [self.doc.facts[3], self.doc.facts[0]])
+
+        enricher = self.enricher(ExtractionCache())
+        enricher.client.link_across = True
+        enricher.enrich(self.doc)
+        nt.assert_true(all(payload["isolateSentences"] for payload in enricher.client.payloads))
+        for main, context in zip(self.doc.facts[::2], self.doc.facts[1::2]):
+            nt.assert_equal([l.target for l in main.fact_links], [context])
+        nt.assert_not_equal(enricher._key("Bob runs .", isolated=True), enricher._key("Bob runs ."))
+
+    def test_successful_persistent(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "graphene.sqlite")
+            self.enricher(ExtractionCache(path)).enrich(self.doc)
+            enricher = self.enricher(ConfigFactory.from_dict({"class": "ExtractionCache", "args": {"path": path}}))
+            doc = self.reader.read_resource(["Alice sleeps . Bob runs . Alice sleeps . Carol reads ."])[0]
+            enricher.enrich(doc)
+            nt.assert_equal(enricher.client.texts, [])
+            nt.assert_equal(enricher.cache.persistent_hits, 3)
+            nt.assert_equal(len(doc.facts), 8)
+            enricher.cache.close()
+
+    def test_successful_coreference_caches_documents(self):
+        enricher = self.enricher(ExtractionCache())
+        enricher.do_coreference = True
+        enricher.enrich(self.doc)
+        enricher.enrich(self.doc)
+        nt.assert_equal(len(enricher.client.texts), 1)
+        nt.assert_equal(len(self.doc.facts), 8)
+
+    def test_successful_dangling_links_skipped(self):
+        enricher = self.enricher(None)
+        extractions = [testutil.fake_extraction("a", 0, 0, "Alice sleeps .", ["b", "missing"]),
+                       testutil.fake_extraction("b", 0, 1, "Alice sleeps .", [])]
+        facts = enricher.build_facts(self.doc, extractions)
+        nt.assert_equal([l.target for l in facts[0].fact_links], [facts[1]])
+
+
+class TestGrapheneWindows:
+    def setup_method(self):
+        reader = RawTextReader(normalizer=DefaultNormalizer())
+        self.doc = reader.read_resource(["Alice sleeps . Bob runs . Carol reads . Dave writes . Eve sings ."])[0]
+
+    def enricher(self, **kwargs):
+        enricher = GrapheneEnricher(window_size=2, **kwargs)
+        enricher.client = testutil.FakeGrapheneClient()
+        return enricher
+
+    def assert_consistent(self):
+        nt.assert_equal([f.sentence.index for f in self.doc.facts], [0, 0, 1, 1, 2, 2, 3, 3, 4, 4])
+        nt.assert_equal([f.object.text for f in self.doc.facts[::2]], [s.pprint() for s in self.doc])
+        for main, context in zip(self.doc.facts[::2], self.doc.facts[1::2]):
+            nt.assert_equal([l.target for l in main.fact_links], [context])
+
+    def test_successful_windows(self):
+        enricher = self.enricher()
+        enricher.enrich(self.doc)
+        nt.assert_equal(enricher.client.texts, ["Alice sleeps . Bob runs .", "Carol reads . Dave writes .",
+                                                "Eve sings ."])
+        self.assert_consistent()
+
+    def test_successful_coreference_context(self):
+        enricher = self.enricher(do_coreference=True, window_overlap=1)
+        enricher.enrich(self.doc)
+        nt.assert_equal(enricher.client.texts, ["Alice sleeps . Bob runs .", "Bob runs . Carol reads . Dave writes .",
+                                                "Dave writes . Eve sings ."])
+        self.assert_consistent()
+
+    def test_successful_cached_windows(self):
+        enricher = self.enricher(cache=ExtractionCache())
+        enricher.enrich(self.doc)
+        nt.assert_equal(len(enricher.client.texts), 3)
+        self.assert_consistent()
+
+    def test_failure_no_response(self):
+        enricher = GrapheneEnricher()
+        enricher.get_graphene_output = lambda document: None
+        nt.assert_raises(ServiceException, enricher.enrich, self.doc)
+
+
 class TestIndraEnricher:
     def test_successful_embedding_enrich(self):
         enricher = EmbeddingEnricher(embedding_provider=cfg.indra_cfg)
@@ -0,0 +1,71 @@
+import pickle
+
+from nose import tools as nt
+from pyhocon import ConfigFactory
+
+from estrella.input.format.raw_text import RawTextReader
+from estrella.input.normalizers import DefaultNormalizer, CachingNormalizer, SlightlyBetterNormalizer
+from estrella.input.tokenizers import RegexTokenizer
+from estrella.model.columnar import ColumnarDocument
+from tests import testutil
+
+cfg = testutil.setup_config_and_logging()
+
+
+class TestRegexTokenizer:
+    def test_successful_tokenize(self):
+        tokenizer = RegexTokenizer()
+        nt.assert_equal(tokenizer.tokenize('He said "hi." She paid 3.50 dollars, didn\'t she? (Yes.) Fine'), [
+            ["He", "said", '"', "hi", ".", '"'],
+            ["She", "paid", "3.50", "dollars", ",", "didn't", "she", "?"],
+            ["(", "Yes", ".", ")"],
+            ["Fine"],
+        ])
+
+    def test_successful_same_as_nltk_on_simple_text(self):
+        nltk_doc = RawTextReader(normalizer=DefaultNormalizer()).read_resource(testutil.example)[0]
+        regex_doc = RawTextReader(normalizer=DefaultNormalizer(), tokenizer="RegexTokenizer").read_resource(
+            testutil.example)[0]
+        nt.assert_equal(regex_doc.pprint(), nltk_doc.pprint())
+
+
+class TestProcessReader:
+    def test_successful_read_in_processes(self):
+        resources = ["Document number {} . It has two sentences .".format(i) for i in range(20)]
+        serial = RawTextReader(normalizer=DefaultNormalizer(), tokenizer=RegexTokenizer())
+        parallel = RawTextReader(normalizer=DefaultNormalizer(), tokenizer=RegexTokenizer(), columnar=True,
+                                 processes=2, batch_size=4)
+        try:
+            docs = parallel.read_resource(resources)
+            nt.assert_equal([d.pprint() for d in docs], [d.pprint() for d in serial.read_resource(resources)])
+            nt.assert_true(all(isinstance(d, ColumnarDocument) for d in docs))
+            nt.assert_equal([d.pprint() for d in parallel.iterate_resource(iter(resources))],
+                            [d.pprint() for d in docs])
+        finally:
+            parallel.close()
+        nt.assert_is_none(parallel._executor)
+
+
+class TestNormalizers:
+    def test_successful_caching_normalizer(self):
+        normalizer = CachingNormalizer(ConfigFactory.from_dict({"class": "DefaultNormalizer", "args": {}}))
+        reader = RawTextReader(normalizer=normalizer)
+        doc = reader.read_resource(["The cat saw the dog . The dog saw the cat ."])[0]
+        nt.assert_equal([w.normalized_text for w in doc.words[:3]], ["the", "cat", "saw"])
+        # every distinct token is normalized once and stored once
+        nt.assert_equal(normalizer.stats()["misses"], 6)
+        nt.assert_equal(normalizer.stats()["hits"], 6)
+        nt.assert_almost_equal(normalizer.hit_rate, 0.5)
+        nt.assert_is(doc.words[1].text, doc.words[-2].text)
+        nt.assert_is(doc.words[0].normalized_text, doc.words[3].normalized_text)
+        copy = pickle.loads(pickle.dumps(normalizer))
+        nt.assert_equal(copy.normalize_word("Cat"), "cat")
+
+    def test_successful_slightly_better_normalizer(self):
+        normalizer = SlightlyBetterNormalizer()
+        nt.assert_equal(normalizer.normalize("Café  au\tlait\n"), "Cafe au lait")
+        nt.assert_equal([normalizer.normalize_word(w) for w in ["``", "Hello", "'s", "...", "U.S."]],
+                        ['"', "hello", "s", "...", "u.s"])
+        doc = RawTextReader(normalizer=normalizer, tokenizer=RegexTokenizer(), keep_original_text=False)\
+            .read_resource(['He said ( quietly ) : "Yes , 5 % ."'])[0]
+        nt.assert_equal(doc.plaintext, 'He said (quietly): "Yes, 5%."')
@@ -1,3 +1,7 @@
+import subprocess
+import sys
+
+from estrella import util
 from estrella.main import Estrella
 from estrella.model.oie import ContextLabel
 from tests import testutil
@@ -28,3 +32,22 @@ class MainTester:
         l = main.dist_service.sort_by_relatedness("intel", doc.words, attr="normalized_text")
         nt.assert_equal(l[0].text, "Intel")
         nt.assert_equal(l[-1].text, "found")
+
+
+class TestStartup:
+    def test_import_is_lazy(self):
+        code = "import sys, estrella.main; print(sorted({'numpy', 'requests', 'pyhocon'} & set(sys.modules)))"
+        output = subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        nt.assert_equal(output.strip(), "[]")
+
+    def test_read_config_returns_copies(self):
+        first = util.read_config("tests/config/testing.conf")
+        first.put("main.changed", True)
+        nt.assert_not_in("changed", util.read_config("tests/config/testing.conf")["main"])
+
+    def test_load_class_is_cached(self):
+        util.load_class("Estrella", relative_import="estrella.main")
+        hits = util._resolve_class.cache_info().hits
+        nt.assert_is(util.load_class("Estrella", relative_import="estrella.main"), Estrella)
+        nt.assert_equal(util._resolve_class.cache_info().hits, hits + 1)
@@ -0,0 +1,48 @@
+import json
+
+from nose import tools as nt
+
+from estrella import metrics, pipeline
+from tests import testutil
+
+
+class TestMetrics:
+    def setup_method(self):
+        self.cfg = testutil.setup_config_and_logging()
+        metrics.disable()
+
+    def teardown_method(self):
+        metrics.disable()
+
+    def test_disabled_records_nothing(self):
+        metrics.counter("a").inc()
+        with metrics.timer("b"):
+            pass
+        nt.assert_false(metrics.get_registry().enabled)
+        nt.assert_equal(metrics.get_registry().snapshot(), {"counters": {}, "gauges": {}, "histograms": {}})
+
+    def test_successful_snapshot(self):
+        registry = metrics.enable()
+        metrics.counter("requests", url="x").inc(2)
+        metrics.gauge("rate").set(0.5)
+        for value in range(1, 101):
+            metrics.histogram("latency").observe(value)
+        snapshot = json.loads(registry.to_json())
+        nt.assert_equal(snapshot["counters"], {"requests{url=x}": 2})
+        nt.assert_equal(snapshot["gauges"], {"rate": 0.5})
+        nt.assert_equal(snapshot["histograms"]["latency"]["count"], 100)
+        nt.assert_equal(snapshot["histograms"]["latency"]["p50"], 51)
+        nt.assert_in("requests{url=x} 2", registry.format_text())
+
+    def test_successful_pipeline_metrics(self):
+        snapshots = []
+        metrics.enable(callback=snapshots.append)
+        p = pipeline.from_config(self.cfg.threaded_pipeline)
+        p.assemble(ending=".txt")
+        docs = list(p.stream("tests/resources"))
+        p.executor.shutdown()
+        nt.assert_equal(len(snapshots), 1)
+        nt.assert_equal(snapshots[0]["counters"]["pipeline.documents"], len(docs))
+        nt.assert_equal(snapshots[0]["counters"]["source_reader.resources"], len(docs))
+        nt.assert_equal(snapshots[0]["counters"]["format_reader.documents"], len(docs))
+        nt.assert_greater(snapshots[0]["gauges"]["pipeline.documents_per_second"], 0)
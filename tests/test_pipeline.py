@@ -1,6 +1,17 @@
+import os
+import tempfile
+import time
+
 from estrella import pipeline, util
 from nose import tools as nt
 
+from estrella.enrich import Enricher
+from estrella.exceptions.pipeline import PipelineException
+from estrella.executors import ThreadExecutor
+from estrella.input.source.file import SingleFileReader
+from estrella.main import Estrella
+from estrella.store import DocumentStore
+
 from tests import testutil
 
 cfg = testutil.setup_config_and_logging()
@@ -31,3 +42,214 @@ class TestPipeline:
         nt.assert_equal(len(doc.sentences), 3)
 
         nt.assert_equal(doc.sentences[0].words[1].normalized_text, "corporation")
+
+    def test_successful_setup_executor_from_config(self):
+        p = pipeline.from_config(self.cfg.threaded_pipeline)
+        p.assemble()
+        nt.assert_is_instance(p.executor, ThreadExecutor)
+        nt.assert_equal(p.executor.max_workers, 4)
+        nt.assert_is_instance(p.wave_executor, ThreadExecutor)
+        nt.assert_equal(p.wave_executor.max_workers, 2)
+        nt.assert_is_not(p.wave_executor._pool_lock, p.executor._pool_lock)
+
+    def test_successful_parse_raw_text_threaded(self):
+        p = pipeline.from_config(self.cfg.threaded_pipeline)
+        p.assemble()
+        docs = p.load("tests/resources/test.txt")
+        nt.assert_equal(len(docs), 1)
+        nt.assert_equal(len(docs[0].sentences), 3)
+        nt.assert_in("format_reader", p.timings)
+        p.executor.shutdown()
+
+    def test_successful_close_executors(self):
+        p = pipeline.from_config(self.cfg.threaded_pipeline)
+        p.assemble()
+        with p:
+            nt.assert_equal(len(p.load("tests/resources/test.txt")), 1)
+            nt.assert_is_not_none(p.executor._pool)
+        nt.assert_is_none(p.executor._pool)
+        # executors start again on the next run
+        p.format_reader.processes = 2
+        nt.assert_equal(len(p.load("tests/resources/test.txt")), 1)
+        nt.assert_is_not_none(p.format_reader._executor)
+        p.close()
+        nt.assert_is_none(p.executor._pool)
+        nt.assert_is_none(p.format_reader._executor)
+
+    def test_successful_stream_raw_text(self):
+        p = pipeline.from_config(self.cfg.threaded_pipeline)
+        p.assemble(ending=".txt")
+        streamed = p.stream("tests/resources")
+        nt.assert_false(isinstance(streamed, list))
+        docs = list(streamed)
+        nt.assert_equal([d.pprint() for d in docs], [d.pprint() for d in p.load("tests/resources")])
+        nt.assert_equal(len(docs), 2)
+        p.executor.shutdown()
+
+
+class SleepingEnricher(Enricher):
+    def __init__(self, reads=(), produces=(), delay=0.0):
+        super().__init__()
+        self.reads = reads
+        self.produces = produces
+        self.delay = delay
+
+    def enrich(self, document):
+        time.sleep(self.delay)
+        for attribute in self.produces:
+            setattr(document, attribute, True)
+
+
+class FailingEnricher(Enricher):
+    reads = ("sentences",)
+    produces = ("checked",)
+
+    def __init__(self, fail_on="", calls=None):
+        super().__init__()
+        self.fail_on = fail_on
+        self.calls = [] if calls is None else calls
+
+    def enrich(self, document):
+        self.calls.append(document.plaintext)
+        if self.fail_on and self.fail_on in document.plaintext:
+            raise ConnectionError("service down")
+        document.checked = True
+
+
+class TestCheckpoint:
+    def setup_method(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.corpus = os.path.join(self.tmp.name, "corpus")
+        self.checkpoint = os.path.join(self.tmp.name, "checkpoint")
+        os.makedirs(self.corpus)
+        for i, text in enumerate(["First text.", "Second text.", "Third text."]):
+            with open(os.path.join(self.corpus, "{}.txt".format(i)), "w") as f:
+                f.write(text)
+
+    def teardown_method(self):
+        self.tmp.cleanup()
+
+    def write(self, name, text):
+        with open(os.path.join(self.corpus, name), "w") as f:
+            f.write(text)
+
+    def assembled(self, enricher):
+        p = pipeline.from_config(util.read_config("tests/config/testing.conf").threaded_pipeline)
+        p.assemble(ending=".txt")
+        p.enrichers.append(enricher)
+        p.waves = p.plan()
+        return p
+
+    def run(self, enricher):
+        p = self.assembled(enricher)
+        docs = p.load(self.corpus, checkpoint=self.checkpoint)
+        p.executor.shutdown()
+        return docs
+
+    def test_successful_resume(self):
+        failing = FailingEnricher(fail_on="Second")
+        docs = self.run(failing)
+        nt.assert_equal(len(failing.calls), 3)
+        nt.assert_equal(sorted(d.plaintext for d in docs), ["First text.", "Third text."])
+        p = self.assembled(FailingEnricher())
+        with DocumentStore(self.checkpoint) as store:
+            nt.assert_equal([store.status(p.resource_key(t)) for t in ["First text.", "Second text.", "Third text."]],
+                            ["done", "failed", "done"])
+
+        fixed = FailingEnricher()
+        docs = self.run(fixed)
+        nt.assert_equal(fixed.calls, ["Second text."])
+        nt.assert_equal(sorted(d.plaintext for d in docs), ["First text.", "Second text.", "Third text."])
+
+        again = FailingEnricher()
+        nt.assert_equal(len(self.run(again)), 3)
+        nt.assert_equal(again.calls, [])
+
+    def test_successful_only_changes_enriched(self):
+        self.run(FailingEnricher())
+        self.write("1.txt", "Second text, changed.")
+        self.write("3.txt", "Fourth text.")
+        enricher = FailingEnricher()
+        docs = self.run(enricher)
+        nt.assert_equal(sorted(enricher.calls), ["Fourth text.", "Second text, changed."])
+        nt.assert_equal(len(docs), 4)
+
+    def test_successful_new_version_enriched_again(self):
+        self.run(FailingEnricher())
+        enricher = FailingEnricher()
+        enricher.version = 2
+        self.run(enricher)
+        nt.assert_equal(len(enricher.calls), 3)
+        nt.assert_not_equal(self.assembled(FailingEnricher()).config_key(), self.assembled(enricher).config_key())
+
+    def test_successful_watch(self):
+        enricher = FailingEnricher()
+        p = self.assembled(enricher)
+        watched = p.watch(self.corpus, checkpoint=self.checkpoint, interval=0, polls=3)
+        groups = [next(watched) for _ in range(3)]
+        self.write("3.txt", "Fourth text.")
+        groups.extend(watched)
+        nt.assert_equal(sorted(os.path.basename(name) for name, _ in groups), ["0.txt", "1.txt", "2.txt", "3.txt"])
+        nt.assert_equal(sorted(d.plaintext for _, docs in groups for d in docs),
+                        ["First text.", "Fourth text.", "Second text.", "Third text."])
+        nt.assert_equal(len(enricher.calls), 4)
+        with DocumentStore(self.checkpoint) as store:
+            nt.assert_true(store.done(p.resource_key("Fourth text.")))
+        p.close()
+
+    def test_successful_watch_replaces_changed(self):
+        main = Estrella(cfg_or_path=cfg["main"])
+        p = self.assembled(FailingEnricher())
+        main.watch_pipeline(p, self.corpus, interval=0, polls=1)
+        self.write("1.txt", "Second text, changed.")
+        main.watch_pipeline(p, self.corpus, interval=0, polls=1)
+        nt.assert_equal(sorted(d.plaintext for d in main.docs),
+                        ["First text.", "Second text, changed.", "Third text."])
+
+    def test_failure_watch_unwatchable(self):
+        p = self.assembled(FailingEnricher())
+        p.source_reader = SingleFileReader()
+        nt.assert_raises(PipelineException, next, p.watch(self.corpus, polls=1))
+
+
+class TestEnricherPlan:
+    def test_successful_waves(self):
+        graphene = SleepingEnricher(("sentences",), ("facts",))
+        words = SleepingEnricher(("words",), ("word_embeddings",))
+        facts = SleepingEnricher(("facts",), ("fact_embeddings",))
+        nt.assert_equal(pipeline.plan_enrichers([graphene, words, facts], ("sentences", "words")),
+                        [[graphene, words], [facts]])
+        nt.assert_equal(pipeline.plan_enrichers([facts, words, graphene], ("sentences", "words")),
+                        [[words, graphene], [facts]])
+
+    def test_undeclared_enrichers_keep_order(self):
+        first, second = SleepingEnricher(), SleepingEnricher()
+        undeclared = SleepingEnricher(None, None)
+        nt.assert_equal(pipeline.plan_enrichers([first, undeclared, second]), [[first], [undeclared], [second]])
+
+    def test_failure_missing_input(self):
+        nt.assert_raises(PipelineException, pipeline.plan_enrichers, [SleepingEnricher(("facts",))], ("words",))
+
+    def test_failure_cycle(self):
+        enrichers = [SleepingEnricher(("a",), ("b",)), SleepingEnricher(("b",), ("a",))]
+        with nt.assert_raises_regex(PipelineException, "cyclically"):
+            pipeline.plan_enrichers(enrichers)
+
+    def test_successful_concurrent_enrichers(self):
+        waves = pipeline.plan_enrichers([SleepingEnricher((), ("a",), 0.2), SleepingEnricher((), ("b",), 0.2)])
+        document = testutil.fake_extract_graphene(0)
+        executor = ThreadExecutor(max_workers=2)
+        start = time.perf_counter()
+        _, timings = pipeline.enrich_document(waves, document, executor)
+        nt.assert_less(time.perf_counter() - start, 0.35)
+        nt.assert_equal(len(timings), 2)
+        nt.assert_true(document.a and document.b)
+        executor.shutdown()
+
+    def test_successful_serial_without_wave_executor(self):
+        waves = pipeline.plan_enrichers([SleepingEnricher((), ("a",), 0.1), SleepingEnricher((), ("b",), 0.1)])
+        document = testutil.fake_extract_graphene(0)
+        start = time.perf_counter()
+        _, timings = pipeline.enrich_document(waves, document)
+        nt.assert_greater_equal(time.perf_counter() - start, 0.2)
+        nt.assert_equal(len(timings), 2)
@@ -0,0 +1,85 @@
+import tempfile
+
+import numpy as np
+from nose import tools as nt
+
+from estrella.enrich.latent import EmbeddingEnricher, FactEmbeddingEnricher
+from estrella.main import Estrella
+from estrella.model import language
+from estrella.model.oie import ContextLabel
+from estrella.serialize.binary import oie as binary
+from estrella.serialize.readable import oie as oie_serialize
+from tests import testutil
+from tests.test_embedding import CountingProvider
+
+cfg = testutil.setup_config_and_logging()
+
+
+def enriched(columnar=False):
+    doc = testutil.fake_extract_graphene(1, columnar=columnar)
+    EmbeddingEnricher(CountingProvider()).enrich(doc)
+    FactEmbeddingEnricher(CountingProvider()).enrich(doc)
+    doc.name = "example"
+    doc.language = language.from_config({"English": "en"}).English
+    doc.genre = ContextLabel.Background  # any label
+    doc.tags = {"marco": "polo"}
+    return doc
+
+
+class TestBinarySerialization:
+    def setup_method(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = [enriched(), enriched(columnar=True)]
+        binary.save(self.docs, self.tmp.name)
+
+    def teardown_method(self):
+        self.tmp.cleanup()
+
+    def test_successful_round_trip(self):
+        corpus = binary.load(self.tmp.name)
+        nt.assert_equal(len(corpus), 2)
+        for original, loaded in zip(self.docs, corpus):
+            nt.assert_equal(loaded.name, "example")
+            nt.assert_equal(loaded.language, original.language)
+            nt.assert_is(loaded.genre, ContextLabel.Background)
+            nt.assert_equal(loaded.tags, {"marco": "polo"})
+            nt.assert_equal(loaded.plaintext, original.plaintext)
+            nt.assert_equal(loaded.pprint(), original.pprint())
+            nt.assert_true(np.allclose(loaded.numerify(), original.numerify()))
+            nt.assert_equal(oie_serialize.hierarchic_print(loaded), oie_serialize.hierarchic_print(original))
+            for f, g in zip(original.facts, loaded.facts):
+                nt.assert_equal(f.type, g.type)
+                nt.assert_equal(f.sentence.index, g.sentence.index)
+                nt.assert_equal([l.label for l in f.links], [l.label for l in g.links])
+                nt.assert_true(np.allclose(f.embedding, g.embedding))
+
+    def test_successful_lazy(self):
+        corpus = binary.load(self.tmp.name)
+        nt.assert_is_instance(corpus.word_embeddings.blocks[0], np.memmap)
+        nt.assert_equal(corpus._docs, {})
+        doc = corpus[1]
+        nt.assert_is_none(doc._facts)
+        nt.assert_true(doc.facts)
+        nt.assert_is(corpus[1], doc)
+        # equal embeddings are stored once
+        nt.assert_equal(len(corpus.word_embeddings), len(set(w.normalized_text for w in doc.words)))
+
+    def test_successful_modify_loaded(self):
+        doc = binary.load(self.tmp.name)[0]
+        doc.words[0].pos_tag = ContextLabel.List
+        doc.words[0].embedding = np.zeros(2)
+        nt.assert_equal(doc.words[0].pos_tag, ContextLabel.List)
+        nt.assert_equal(list(doc.words[0].embedding), [0, 0])
+        nt.assert_not_equal(list(binary.load(self.tmp.name)[0].words[0].embedding), [0, 0])
+
+    def test_successful_estrella_load_is_lazy(self):
+        main = Estrella(cfg_or_path=cfg["main"])
+        main.add_docs([enriched()])
+        main.load(self.tmp.name)
+        corpus = main._docs.parts[-1]
+        nt.assert_equal(corpus._docs, {})
+        nt.assert_equal(len(main._docs), 3)
+        nt.assert_is(main._docs[2], corpus[1])
+        nt.assert_equal(list(corpus._docs), [1])
+        main.add_docs([enriched()])
+        nt.assert_equal([d.name for d in main.docs], ["example"] * 4)
@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from nose import tools as nt
+
+from estrella import metrics
+from estrella.exceptions.service import ServiceException
+from estrella.operate.embedding import Indra
+from estrella.service import ServiceClient
+from tests import testutil
+
+cfg = testutil.setup_config_and_logging()
+
+
+class FlakyIndraHandler(BaseHTTPRequestHandler):
+    requests = []
+    fail_next = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        FlakyIndraHandler.requests.append(payload)
+        if FlakyIndraHandler.fail_next:
+            FlakyIndraHandler.fail_next -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"terms": {t: [1.0, float(len(t))] for t in payload['terms']}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestServiceClient:
+    @classmethod
+    def setup_class(cls):
+        cls.server = HTTPServer(("localhost", 0), FlakyIndraHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def teardown_class(cls):
+        cls.server.shutdown()
+
+    def setup_method(self):
+        FlakyIndraHandler.requests = []
+        FlakyIndraHandler.fail_next = 0
+
+    def test_successful_retry(self):
+        FlakyIndraHandler.fail_next = 1
+        indra = Indra(server="localhost", port=self.server.server_port, backoff=0.01)
+        embeddings = indra.get_embeddings(["a", "bb"])
+        nt.assert_equal(embeddings["bb"], [1.0, 2.0])
+        nt.assert_equal(len(FlakyIndraHandler.requests), 2)
+
+    def test_successful_post_many(self):
+        client = ServiceClient(max_concurrency=4, backoff=0.01)
+        url = "http://localhost:{}/vectors".format(self.server.server_port)
+        responses = client.post_many(url, ({"terms": [str(i) * i]} for i in range(1, 6)))
+        nt.assert_equal([r["terms"][str(i) * i] for i, r in zip(range(1, 6), responses)],
+                        [[1.0, float(i)] for i in range(1, 6)])
+
+    def test_failure_after_retries(self):
+        FlakyIndraHandler.fail_next = 3
+        client = ServiceClient(retries=2, backoff=0.01)
+        url = "http://localhost:{}/vectors".format(self.server.server_port)
+        nt.assert_raises(ServiceException, client.post, url, {"terms": []})
+
+    def test_successful_request_metrics(self):
+        FlakyIndraHandler.fail_next = 1
+        registry = metrics.enable()
+        try:
+            client = ServiceClient(backoff=0.01)
+            url = "http://localhost:{}/vectors".format(self.server.server_port)
+            client.post(url, {"terms": ["a"]})
+            snapshot = registry.snapshot()
+        finally:
+            metrics.disable()
+        key = "{{url={}}}".format(url)
+        nt.assert_equal(snapshot["counters"]["http.requests" + key], 1)
+        nt.assert_equal(snapshot["counters"]["http.retries" + key], 1)
+        nt.assert_equal(snapshot["histograms"]["http.seconds" + key]["count"], 2)
+        nt.assert_greater(snapshot["histograms"]["http.response_bytes" + key]["sum"], 0)
+
+    def test_successful_coalesce_keys(self):
+        client = ServiceClient()
+        fetched = []
+
+        def slow_fetch(keys):
+            fetched.extend(keys)
+            time.sleep(0.2)
+            return {k: k.upper() for k in keys}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.fetch_keyed(["a", "b"], slow_fetch)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        nt.assert_equal(sorted(fetched), ["a", "b"])
+        nt.assert_true(all(r == {"a": "A", "b": "B"} for r in results))
@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+
+from nose import tools as nt
+
+from estrella.store import DocumentStore
+from tests import testutil
+
+cfg = testutil.setup_config_and_logging()
+
+
+class TestDocumentStore:
+    def setup_method(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = [testutil.fake_extract_graphene(i % 2) for i in range(3)]
+
+    def teardown_method(self):
+        self.tmp.cleanup()
+
+    def journal(self):
+        with open(os.path.join(self.tmp.name, "journal.jsonl")) as f:
+            return [json.loads(line) for line in f]
+
+    def test_successful_round_trip(self):
+        with DocumentStore(self.tmp.name, shard_size=2) as store:
+            store.put("a", self.docs[:2])
+            store.put("empty", [])
+            store.put("b", self.docs[2:])
+            nt.assert_true(store.done("a"))
+            nt.assert_false(store.done("b"))  # buffered, not written yet
+        store = DocumentStore(self.tmp.name)
+        nt.assert_equal(len(store), 3)
+        nt.assert_equal([d.pprint() for d in store.get("a")], [d.pprint() for d in self.docs[:2]])
+        nt.assert_equal(store.get("empty"), [])
+        nt.assert_equal([d.pprint() for d in store.documents()], [d.pprint() for d in self.docs])
+        nt.assert_equal(len(os.listdir(store.shard_path)), 2)
+        store.close()
+
+    def test_successful_later_entries_win(self):
+        with DocumentStore(self.tmp.name) as store:
+            store.fail("a", "ServiceException: down")
+            nt.assert_equal(store.status("a"), "failed")
+            store.put("a", self.docs[:1])
+        store = DocumentStore(self.tmp.name)
+        nt.assert_true(store.done("a"))
+        nt.assert_equal([e["status"] for e in self.journal()], ["failed", "done"])
+        store.close()
+
+    def test_successful_recover_from_crash(self):
+        with DocumentStore(self.tmp.name) as store:
+            store.put("a", self.docs[:1])
+        # a shard and a journal line cut off mid-write
+        os.makedirs(os.path.join(self.tmp.name, "shards", ".shard-000001"))
+        with open(os.path.join(self.tmp.name, "journal.jsonl"), "a") as f:
+            f.write('{"key": "b", "sta')
+        store = DocumentStore(self.tmp.name)
+        nt.assert_equal(store.keys(), ["a"])
+        nt.assert_equal(os.listdir(store.shard_path), ["shard-000000"])
+        store.put("c", [])
+        store.close()
+        store = DocumentStore(self.tmp.name)
+        nt.assert_equal(store.keys(), ["a", "c"])
+        nt.assert_equal(len(self.journal()), 2)
+        store.close()
@@ -0,0 +1,217 @@
+import os
+import tempfile
+
+import numpy as np
+from nose import tools as nt
+
+from estrella.enrich.latent import FactEmbeddingEnricher
+from estrella.model import language
+from estrella.model.oie import FactLabel, ContextLabel, Fact
+from estrella.operate import batch, relatedness
+from estrella.operate.graph import FactGraph
+from estrella.operate.index import IndexRegistry
+from estrella.operate.nearest import IVFIndex
+from estrella.operate.view import View
+from tests import testutil
+from tests.test_embedding import CountingProvider
+
+cfg = testutil.setup_config_and_logging()
+
+
+class Embedded:
+    def __init__(self, embedding):
+        self.embedding = embedding
+
+
+class TestNearest:
+    @classmethod
+    def setup_class(cls):
+        cls.vectors = np.random.RandomState(42).normal(size=(2000, 16)).astype(np.float32)
+
+    def test_successful_exact_when_probing_everything(self):
+        index = IVFIndex(n_lists=20).build(self.vectors)
+        query = self.vectors[7]
+        ids, scores = index.search(query, k=5, n_probe=20)
+        nt.assert_equal(list(ids), list(relatedness.rank(query, self.vectors, k=5)))
+        nt.assert_equal(ids[0], 7)
+
+    def test_successful_recall(self):
+        index = IVFIndex(n_lists=20, n_probe=5).build(self.vectors)
+        hits = sum(index.search(self.vectors[i], k=1)[0][0] == i for i in range(100))
+        nt.assert_greater_equal(hits, 95)
+
+    def test_successful_euclidean_assignment(self):
+        index = IVFIndex(n_lists=20, scoring_function="EUCLIDEAN")
+        centroids = self.vectors[:20]
+        distances = ((self.vectors[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=-1)
+        nt.assert_equal(list(index._assign(self.vectors, centroids, batch_size=300)), list(distances.argmin(axis=1)))
+
+    def test_successful_save_load(self):
+        index = IVFIndex(n_lists=10).build(self.vectors)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.npz")
+            index.save(path)
+            loaded = IVFIndex.load(path)
+        nt.assert_equal(list(loaded.search(self.vectors[3], k=3)[0]), list(index.search(self.vectors[3], k=3)[0]))
+
+    def test_successful_view_nearest(self):
+        view = View([Embedded(v) for v in self.vectors])
+        target = view[11]
+        result = view.nearest(target, k=3)
+        nt.assert_equal(len(result), 3)
+        nt.assert_is(result[0], target)
+
+    def test_successful_index_reused(self):
+        registry = IndexRegistry()
+        view = View([Embedded(v) for v in self.vectors[:500]], registry)
+        built = []
+        build_index = View.build_index
+
+        def counted(v, **kwargs):
+            built.append(len(v))
+            return build_index(v, **kwargs)
+
+        View.build_index = counted
+        try:
+            first = view.copy().nearest(view[3], k=1)
+            second = view.copy().nearest(view[4], k=1)
+        finally:
+            View.build_index = build_index
+        nt.assert_equal(built, [500])
+        nt.assert_is(first[0], view[3])
+        nt.assert_is(second[0], view[4])
+
+    def test_successful_view_nearest_facts(self):
+        doc = testutil.fake_extract_graphene(1)
+        FactEmbeddingEnricher(embedding_provider=CountingProvider()).enrich(doc)
+        facts = View(doc.facts)
+        index = facts.build_index()
+        result = facts.copy().nearest(doc.facts[2], k=1, index=index)
+        nt.assert_true(np.allclose(result[0].embedding, doc.facts[2].embedding))
+
+
+class TestIndexedFilter:
+    def test_successful_same_as_scan(self):
+        doc = testutil.fake_extract_graphene(1)
+        queries = [dict(context_level=1), dict(type=FactLabel.VerbBased, context_level=0),
+                   dict(**{"subject.text": doc.facts[0].subject.text}), dict(context_level=0, sentence=doc[0]),
+                   dict(**{"subject.text": "nothing"})]
+        registry = IndexRegistry()
+        for query in queries:
+            scanned = View(doc.facts).filter(**query)
+            indexed = View(doc.facts, registry).filter(**query)
+            nt.assert_equal(list(map(id, indexed)), list(map(id, scanned)))
+        nt.assert_equal(len(registry.collections), 1)
+        nt.assert_in("context_level", registry.collection(doc.facts).attributes)
+
+    def test_successful_languages_indexed(self):
+        english = language.from_config({"English": "en", "German": "de"}).English
+        docs = [testutil.fake_extract_graphene(i % 2) for i in range(3)]
+        docs[1].language = english
+        registry = IndexRegistry()
+        nt.assert_equal(View(docs, registry).filter(language=english), [docs[1]])
+        nt.assert_equal(registry.collection(docs).attribute("language").unhashable, [])
+
+    def test_successful_bounded(self):
+        doc = testutil.fake_extract_graphene(1)
+        registry = IndexRegistry(max_collections=2)
+        for i in range(4):
+            View(doc.facts[i:], registry).filter(context_level=0)
+        nt.assert_equal(len(registry.collections), 2)
+
+    def test_successful_shared_with_derived_views(self):
+        doc = testutil.fake_extract_graphene(1)
+        registry = IndexRegistry()
+        linked = View(doc.facts, registry).hop("fact_links").filter(context_level=1)
+        nt.assert_equal(list(map(id, linked)), list(map(id, View(doc.facts).hop("fact_links").filter(context_level=1))))
+        nt.assert_is(linked.copy().indexes, registry)
+        nt.assert_equal(len(registry.collections), 1)
+
+
+class TestLazyQuery:
+    def test_successful_same_as_eager(self):
+        doc = testutil.fake_extract_graphene(1)
+        chains = [
+            lambda v: v.filter(context_level=0).filter(lambda f: f.id > 0),
+            lambda v: v.hop("links").filter(lambda t: getattr(t, "context_level", 0) == 1),
+            lambda v: v.hop("fact_links", keep=True).filter(context_level=1).rank(lambda f: f.id, reverse=True),
+            lambda v: v.filter(type=FactLabel.VerbBased).hop("fact_links").expand(context_level=1),
+        ]
+        for make_chain in chains:
+            eager = make_chain(View(doc.facts, IndexRegistry()))
+            lazy = make_chain(View(doc.facts, IndexRegistry()).lazy()).collect()
+            nt.assert_equal(list(map(id, lazy)), list(map(id, eager)))
+
+    def test_successful_optimize(self):
+        doc = testutil.fake_extract_graphene(1)
+        view = View(doc.facts)
+        query = view.lazy().filter(context_level=0).filter(lambda f: True).hop("fact_links").filter(lambda f: True)
+        nt.assert_equal(query.explain(), "View -> Filter(2) -> Hop(fact_links, Filter(1))")
+        nt.assert_equal(len(view), len(doc.facts))
+
+
+class TestFactGraph:
+    @classmethod
+    def setup_class(cls):
+        cls.doc = testutil.fake_extract_graphene(1)
+        cls.graph = FactGraph(cls.doc.facts)
+
+    def test_successful_same_as_hop(self):
+        constraints = [(None, None), ([ContextLabel.Elaboration], lambda l: l.label == ContextLabel.Elaboration)]
+        for labels, constraint in constraints:
+            hopped = View(self.doc.facts).hop("links", constraint=constraint)
+            traversed = View(self.doc.facts).traverse(self.graph, labels=labels)
+            nt.assert_equal(list(map(id, traversed)), list(map(id, hopped)))
+        two_hops = View(self.doc.facts).hop("links").hop("links")
+        nt.assert_equal(list(map(id, View(self.doc.facts).traverse(self.graph, depth=2))), list(map(id, two_hops)))
+
+    def test_successful_inverse(self):
+        for fact in self.doc.facts:
+            for link in fact.fact_links:
+                label = link.label.inverse or link.label
+                sources = View([link.target]).traverse(self.graph, labels=[label], inverse=True)
+                nt.assert_in(fact, sources)
+
+    def test_successful_distinct(self):
+        reached = View(self.doc.facts[:1]).traverse(self.graph, depth=5, simple=False, distinct=True)
+        nt.assert_equal(len(set(map(id, reached))), len(reached))
+        nt.assert_true(all(isinstance(f, Fact) for f in reached))
+
+
+class TestNumerifyBatch:
+    @classmethod
+    def setup_class(cls):
+        cls.doc = testutil.fake_extract_graphene(1)
+        FactEmbeddingEnricher(CountingProvider()).enrich(cls.doc)
+
+    def check_same_as_numerify(self, arrays):
+        facts = self.doc.facts
+        for i, (fact_id, s, p, o, simple, links) in enumerate(f.numerify() for f in facts):
+            nt.assert_equal(arrays["ids"][i], fact_id)
+            for name, embedding in zip(("subject", "predicate", "object"), (s, p, o)):
+                np.testing.assert_allclose(arrays[name][i], embedding)
+            start, end = arrays["simple_offsets"][i:i + 2]
+            nt.assert_equal(list(arrays["simple_labels"][start:end]), [label for label, _ in simple])
+            for row, (_, embedding) in zip(range(start, end), simple):
+                np.testing.assert_allclose(arrays["simple_embeddings"][row], embedding)
+            start, end = arrays["link_offsets"][i:i + 2]
+            nt.assert_equal(list(arrays["link_labels"][start:end]), [label for label, _ in links])
+            nt.assert_equal([facts[t].id for t in arrays["link_targets"][start:end]], [t for _, t in links])
+
+    def test_successful_numerify_batch(self):
+        arrays = View(self.doc.facts).numerify_batch()
+        nt.assert_equal(arrays["subject"].shape, (len(self.doc.facts), 2))
+        nt.assert_true(arrays["embedded"].all())
+        self.check_same_as_numerify(arrays)
+
+    def test_successful_numerify_batch_to_memmap(self):
+        with tempfile.TemporaryDirectory() as path:
+            View(self.doc.facts).numerify_batch(out_dir=path)
+            self.check_same_as_numerify({name[:-4]: np.load(os.path.join(path, name), mmap_mode="r")
+                                         for name in os.listdir(path) if name.endswith(".npy")})
+
+    def test_successful_pad(self):
+        arrays = View(self.doc.facts).numerify_batch()
+        padded = batch.pad(arrays["link_labels"], arrays["link_offsets"])
+        for i, fact in enumerate(self.doc.facts):
+            nt.assert_equal([l for l in padded[i] if l >= 0], [int(link.label) for link in fact.fact_links])
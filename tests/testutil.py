@@ -1,5 +1,7 @@
 import json
 import os
+import re
+from uuid import uuid4
 
 from estrella import util
 from estrella.enrich.semantic import GrapheneEnricher
@@ -26,9 +28,9 @@ example_map = {
 }
 
 
-def fake_extract_graphene(idx):
+def fake_extract_graphene(idx, columnar=False):
     enricher = GrapheneEnricher()
-    reader = RawTextReader(normalizer=DefaultNormalizer())
+    reader = RawTextReader(normalizer=DefaultNormalizer(), columnar=columnar)
 
     def dummy(*args, **kwargs):
         with open(os.path.join("tests", "resources", example_map[idx]), "r") as f:
@@ -38,3 +40,42 @@ def fake_extract_graphene(idx):
     enricher.get_graphene_output = dummy
     enricher.enrich(doc)
     return doc
+
+
+class FakeGrapheneClient:
+    """
+    Stands in for the service client of a `GrapheneEnricher`: every sentence ending with " ." yields a fact with a
+    linked context fact. With `link_across`, the fact of every sentence is also linked to the fact of the previous
+    sentence, unless sentences are isolated.
+    """
+
+    def __init__(self, link_across=False):
+        self.texts = []
+        self.payloads = []
+        self.link_across = link_across
+
+    def post(self, url, payload):
+        self.texts.append(payload["text"])
+        self.payloads.append(payload)
+        sentences = [s for s in re.split(r"(?<= \.) ", payload["text"]) if s]
+        extractions = []
+        previous = None
+        for idx, sentence in enumerate(sentences):
+            main, context = uuid4().hex, uuid4().hex
+            targets = [context]
+            if self.link_across and previous is not None and not payload["isolateSentences"]:
+                targets.append(previous)
+            extractions.append(fake_extraction(main, idx, 0, sentence, targets))
+            extractions.append(fake_extraction(context, idx, 1, sentence, []))
+            previous = main
+        return {"sentences": [{"originalSentence": s, "sentenceIdx": i} for i, s in enumerate(sentences)],
+                "extractions": extractions}
+
+    def post_many(self, url, payloads):
+        return [self.post(url, payload) for payload in payloads]
+
+
+def fake_extraction(id, sentence_idx, context_layer, text, targets):
+    return {"id": id, "type": "VERB_BASED", "sentenceIdx": sentence_idx, "contextLayer": context_layer,
+            "arg1": text.split(" ")[0], "relation": "is", "arg2": text,
+            "simpleContexts": [], "linkedContexts": [{"targetID": t, "classification": "BACKGROUND"} for t in targets]}